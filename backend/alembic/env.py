@@ -21,6 +21,9 @@ from app.settings import settings  # loads DATABASE_URL from .env
 # --- Import ALL model modules so autogenerate can discover tables ---
 # If you add more models, import them here (or import app.models to pull them all in)
 from app.models import user  # e.g., app/models/user.py defines class User(Base)...
+from app.models import generation_cache
+from app.models import job
+from app.models import presentation
 
 # This is the Alembic Config object, which provides access to .ini values
 config = context.config
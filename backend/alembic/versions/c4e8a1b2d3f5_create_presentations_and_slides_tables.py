@@ -0,0 +1,57 @@
+"""create presentations and slides tables
+
+Revision ID: c4e8a1b2d3f5
+Revises: b7d2e9f1c3a4
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1b2d3f5'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e9f1c3a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'presentations',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('title', sa.String(length=512), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('slide_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('options', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_presentations_user_id_created_at_id',
+        'presentations',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+    op.create_table(
+        'slides',
+        sa.Column('presentation_id', sa.UUID(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('content', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.ForeignKeyConstraint(['presentation_id'], ['presentations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('presentation_id', 'position'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('slides')
+    op.drop_index('ix_presentations_user_id_created_at_id', table_name='presentations')
+    op.drop_table('presentations')
@@ -1,12 +1,43 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from app.lib.db_metrics import DbMetrics, InstrumentedAsyncQueuePool, InstrumentedQueuePool
 from app.settings import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+db_metrics = DbMetrics(slow_query_ms=settings.DB_SLOW_QUERY_MS)
+InstrumentedQueuePool.metrics = db_metrics
+InstrumentedAsyncQueuePool.metrics = db_metrics
+
+POOL_OPTIONS = dict(
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+)
+
+engine = create_engine(settings.DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+db_metrics.instrument(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_database_url(url: str):
+    # psycopg 3 serves both sync and async engines; psycopg2 has no async mode
+    return make_url(url).set(drivername="postgresql+psycopg")
+
+
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL), poolclass=InstrumentedAsyncQueuePool, **POOL_OPTIONS
+)
+db_metrics.instrument(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -16,3 +47,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,40 @@
+import math
+
+
+class ServiceBusyError(Exception):
+    """
+    Base for fast rejections the client should retry later; the app maps
+    them to `status_code` with a Retry-After header.
+    """
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after_seconds: float = 1):
+        super().__init__(message)
+        self.retry_after_seconds = max(1, math.ceil(retry_after_seconds))
+
+
+class HashingOverloadedError(ServiceBusyError):
+    """Raised when the password hashing executor has no capacity left."""
+
+    status_code = 503
+
+
+class RateLimitedError(ServiceBusyError):
+    """Raised when a model call is over its per-user or global budget."""
+
+    status_code = 429
+
+
+class CircuitOpenError(ServiceBusyError):
+    """Raised while an upstream provider's circuit breaker is open."""
+
+    status_code = 503
+
+
+class UpstreamStatusError(ValueError):
+    """An upstream HTTP call answered with an error status."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
@@ -0,0 +1,163 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger("app")
+
+# upper bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+# cap on distinct normalized statements so ad-hoc SQL cannot grow memory unbounded
+MAX_TRACKED_STATEMENTS = 500
+
+_CAST_RE = re.compile(r"::\w+(?: WITH(?:OUT)? TIME ZONE)?(?:\[\])?")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+|\?")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_ROWS_RE = re.compile(r"(\(\?\))(?:\s*,\s*\(\?\))+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse literals and bind parameters so equivalent queries share one key."""
+    sql = _CAST_RE.sub("", statement)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _PARAM_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?)", sql)
+    sql = _VALUES_ROWS_RE.sub(r"\1", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value_ms <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value_ms
+        self.max = max(self.max, value_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 3),
+            "max_ms": round(self.max, 3),
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(self.buckets, self.counts)
+            },
+        }
+
+
+class DbMetrics:
+    """
+    Pool and query instrumentation built on SQLAlchemy events: per-statement
+    latency histograms (keyed by normalized SQL), a slow-query log, pool
+    checkout-wait histograms and checked-out/overflow gauges per engine.
+    """
+
+    def __init__(self, slow_query_ms: float):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._engines: Dict[str, Engine] = {}
+        self._pool_wait: Dict[str, Histogram] = {}
+        self._statements: Dict[str, Histogram] = {}
+        self.slow_queries = 0
+
+    def instrument(self, engine: Engine, name: str) -> None:
+        self._engines[name] = engine
+        self._pool_wait[name] = Histogram()
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def observe_pool_wait(self, pool, seconds: float) -> None:
+        # looked up on every call because engine.dispose() swaps in a new pool
+        for name, engine in self._engines.items():
+            if engine.pool is pool:
+                with self._lock:
+                    self._pool_wait[name].observe(seconds * 1000)
+                return
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start_time")
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        normalized = normalize_sql(statement)
+        with self._lock:
+            histogram = self._statements.get(normalized)
+            if histogram is None:
+                if len(self._statements) >= MAX_TRACKED_STATEMENTS:
+                    histogram = self._statements.setdefault("<other>", Histogram())
+                else:
+                    histogram = self._statements[normalized] = Histogram()
+            histogram.observe(elapsed_ms)
+            if elapsed_ms >= self.slow_query_ms:
+                self.slow_queries += 1
+        if elapsed_ms >= self.slow_query_ms:
+            logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {normalized}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        pools = {}
+        for name, engine in self._engines.items():
+            pool = engine.pool
+            pools[name] = {
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                # QueuePool reports negative overflow until pool_size is reached
+                "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            }
+        with self._lock:
+            return {
+                "pools": pools,
+                "pool_wait": {name: h.snapshot() for name, h in self._pool_wait.items()},
+                "statements": {sql: h.snapshot() for sql, h in self._statements.items()},
+                "slow_queries": self.slow_queries,
+                "slow_query_threshold_ms": self.slow_query_ms,
+            }
+
+
+class _TimedCheckoutMixin:
+    """
+    Times how long a caller waits for a connection. SQLAlchemy has no event
+    for the wait itself (`checkout` fires after it), so the pool's `_do_get`
+    is wrapped instead.
+    """
+
+    metrics: DbMetrics | None = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_pool_wait(self, time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
@@ -0,0 +1,155 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+# how many earlier cut points to try when closing a truncated document fails
+MAX_CUT_ATTEMPTS = 8
+
+
+@dataclass
+class RepairResult:
+    value: Any
+    repairs: list[str] = field(default_factory=list)
+    # the document ended before its top-level value was closed
+    truncated: bool = False
+    # ...and it was closed where it stopped, so its last element may be cut short
+    partial_tail: bool = False
+
+
+def _strip_fences(text: str) -> tuple[str, bool]:
+    stripped = text.strip()
+    if not stripped.startswith("```"):
+        return text, False
+    # drop the opening fence line (```json) and a closing fence if present
+    _, _, body = stripped.partition("\n")
+    body = body.rstrip()
+    if body.endswith("```"):
+        body = body[:-3]
+    return body, True
+
+
+def _close(out: str, stack: list[str]) -> str:
+    return out + "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+
+def repair_json(text: str) -> RepairResult:
+    """
+    Repair the usual defects of LLM-written JSON and parse it: code fences,
+    prose around the value, // and /* */ comments, trailing commas, raw
+    newlines inside strings, and truncation (an unterminated string and
+    unclosed containers, as left behind when max_output_tokens is hit).
+
+    Truncated documents are first closed where they stop; if that does not
+    parse (cut inside a key or a literal), the incomplete trailing element is
+    dropped by cutting back to an earlier comma. Raises ValueError when
+    nothing parses.
+    """
+    repairs: list[str] = []
+    text, fenced = _strip_fences(text)
+    if fenced:
+        repairs.append("code_fence")
+
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        raise ValueError("no JSON value found")
+    if text[:start].strip():
+        repairs.append("leading_text")
+
+    out: list[str] = []
+    stack: list[str] = []
+    # (length of `out` before a comma, containers open at that point)
+    cut_points: list[tuple[int, tuple[str, ...]]] = []
+    in_string = escaped = False
+    i, n = start, len(text)
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch in "\n\r\t":
+                ch = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}[ch]
+                if "control_character" not in repairs:
+                    repairs.append("control_character")
+            out.append(ch)
+            i += 1
+            continue
+
+        if ch == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            repairs.append("comment")
+            continue
+        if ch == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            repairs.append("comment")
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            # trailing comma before the closer
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+                repairs.append("trailing_comma")
+            if not stack:
+                break
+            ch = _CLOSERS[stack.pop()]
+            out.append(ch)
+            i += 1
+            if not stack:
+                if text[i:].strip():
+                    repairs.append("trailing_text")
+                break
+            continue
+        elif ch == ",":
+            cut_points.append((len(out), tuple(stack)))
+        out.append(ch)
+        i += 1
+
+    body = "".join(out)
+    if not stack:
+        try:
+            return RepairResult(json.loads(body), _dedupe(repairs))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"unrepairable JSON: {e}")
+
+    repairs.append("truncated")
+    tail = body + ('"' if in_string else "")
+    tail = tail.rstrip()
+    if tail.endswith(","):
+        tail = tail[:-1]
+    candidates = [_close(tail, stack)]
+    candidates += [
+        _close(body[:length], list(open_stack))
+        for length, open_stack in reversed(cut_points[-MAX_CUT_ATTEMPTS:])
+    ]
+    for attempt, candidate in enumerate(candidates):
+        try:
+            return RepairResult(json.loads(candidate), _dedupe(repairs), truncated=True, partial_tail=attempt == 0)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("unrepairable JSON: truncated document")
+
+
+def loads_lenient(text: str) -> RepairResult:
+    """`json.loads`, falling back to `repair_json` only when strict parsing fails."""
+    try:
+        return RepairResult(json.loads(text))
+    except json.JSONDecodeError:
+        return repair_json(text)
+
+
+def _dedupe(repairs: list[str]) -> list[str]:
+    return list(dict.fromkeys(repairs))
@@ -0,0 +1,80 @@
+from typing import Any
+
+from app.lib.json_repair import loads_lenient
+
+
+class SlideStreamParser:
+    """
+    Incremental parser for a streamed presentation JSON document.
+
+    Feed it text chunks as they arrive from the model; every time an object
+    inside the top-level "slides" array is closed, it is returned from `feed`
+    (None in its place if it cannot be parsed even after repair, so positions
+    stay aligned with the outline).
+    The scanner only tracks string/escape state and bracket depth, so each
+    character is looked at once regardless of how the text is chunked.
+    """
+
+    def __init__(self, array_key: str = "slides"):
+        self.array_key = array_key
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = -1
+        self._last_string = None
+        self._in_array = False
+        self._array_depth = -1
+        self._item_start = -1
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        self.buffer += chunk
+        items = []
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buf[self._string_start + 1 : i]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                if (
+                    ch == "["
+                    and self._depth == 1
+                    and self._last_string == self.array_key
+                ):
+                    self._in_array = True
+                    self._array_depth = self._depth + 1
+                elif (
+                    ch == "{"
+                    and self._in_array
+                    and self._depth == self._array_depth
+                ):
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._in_array and self._depth == self._array_depth and ch == "}":
+                    items.append(self._parse_item(buf[self._item_start : i + 1]))
+                    self._item_start = -1
+                elif self._in_array and self._depth == self._array_depth - 1:
+                    self._in_array = False
+        self._pos = len(buf)
+        return items
+
+    @staticmethod
+    def _parse_item(text: str) -> Any:
+        try:
+            return loads_lenient(text).value
+        except ValueError:
+            return None
@@ -1,19 +1,31 @@
 # app/security.py
 from __future__ import annotations
+import asyncio
 import hmac
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import sha256
 from passlib.context import CryptContext
 from app.settings import settings
+from app.errors import HashingOverloadedError
 
 
-pwd_context = CryptContext(
-    schemes=["argon2"],
-    deprecated="auto",
-    # You can tune these based on your server capacity:
-    # "argon2__time_cost": 3,
-    # "argon2__memory_cost": 102400,  # ~100 MB
-    # "argon2__parallelism": 8,
+def build_context(time_cost: int, memory_cost: int, parallelism: int) -> CryptContext:
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        # Tune with `python -m benchmarks.password_hashing` on the target host
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,  # KiB
+        argon2__parallelism=parallelism,
+    )
+
+
+pwd_context = build_context(
+    settings.PASSWORD_ARGON2_TIME_COST,
+    settings.PASSWORD_ARGON2_MEMORY_COST,
+    settings.PASSWORD_ARGON2_PARALLELISM,
 )
 
 # If you must use bcrypt (fallback):
@@ -52,3 +64,60 @@ def needs_rehash(stored_hash: str) -> bool:
     Rehash on next successful login.
     """
     return pwd_context.needs_update(stored_hash)
+
+
+class HashingExecutor:
+    """
+    Dedicated, bounded executor for argon2 work. argon2-cffi releases the GIL,
+    so a small thread pool gives real parallelism without sharing the AnyIO
+    threadpool that every sync endpoint depends on. Admission control rejects
+    new work with `HashingOverloadedError` once `max_workers + max_queue`
+    operations are pending, instead of letting a login burst queue unbounded.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0}
+
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise HashingOverloadedError("password hashing is saturated, retry shortly")
+            self._pending += 1
+        outcome = "failed"
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, fn, *args)
+            outcome = "completed"
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.stats[outcome] += 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+hashing_executor = HashingExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+
+async def ahash_password(raw_password: str) -> str:
+    return await hashing_executor.run(hash_password, raw_password)
+
+
+async def averify_password(raw_password: str, stored_hash: str) -> bool:
+    return await hashing_executor.run(verify_password, raw_password, stored_hash)
@@ -0,0 +1,64 @@
+class StreamingPdfWriter:
+    """
+    Minimal PDF writer that emits the document incrementally: one full-page
+    JPEG image per page, each page's objects written as soon as it is added.
+    The page tree, catalog and xref table are written by `close()`.
+
+    Object 1 is the catalog and object 2 the page tree; pages reference
+    object 2 as their parent before it is written, which PDF allows.
+    """
+
+    def __init__(self, page_width: float, page_height: float):
+        self.page_width = page_width
+        self.page_height = page_height
+        self._offset = 0
+        self._offsets: dict[int, int] = {}
+        self._page_ids: list[int] = []
+        self._next_id = 3
+
+    def _emit(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+    def _object(self, obj_id: int, body: bytes) -> bytes:
+        self._offsets[obj_id] = self._offset
+        return self._emit(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def header(self) -> bytes:
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def add_jpeg_page(self, jpeg: bytes, pixel_width: int, pixel_height: int) -> bytes:
+        image_id, content_id, page_id = self._next_id, self._next_id + 1, self._next_id + 2
+        self._next_id += 3
+        self._page_ids.append(page_id)
+
+        image = (
+            f"<< /Type /XObject /Subtype /Image /Width {pixel_width} /Height {pixel_height} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode /Length {len(jpeg)} >>\n"
+            "stream\n"
+        ).encode() + jpeg + b"\nendstream"
+        draw = f"q {self.page_width} 0 0 {self.page_height} 0 0 cm /Im0 Do Q".encode()
+        content = f"<< /Length {len(draw)} >>\nstream\n".encode() + draw + b"\nendstream"
+        page = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.page_width} {self.page_height}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()
+        return (
+            self._object(image_id, image)
+            + self._object(content_id, content)
+            + self._object(page_id, page)
+        )
+
+    def close(self) -> bytes:
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        data = self._object(
+            2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode()
+        )
+        data += self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self._offset
+        size = self._next_id
+        xref = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        xref += [f"{self._offsets[obj_id]:010d} 00000 n \n" for obj_id in range(1, size)]
+        trailer = f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+        return data + self._emit(("".join(xref) + trailer).encode())
@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+from google.genai import errors as genai_errors
+
+from app.errors import CircuitOpenError, ServiceBusyError, UpstreamStatusError
+
+logger = logging.getLogger("app")
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(error: BaseException) -> bool:
+    """Upstream failures worth retrying: throttling, 5xx, timeouts, dropped connections."""
+    if isinstance(error, ServiceBusyError):
+        # our own admission control / breaker: retrying here only adds load
+        return False
+    if isinstance(error, genai_errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    if isinstance(error, (httpx.HTTPStatusError,)):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, UpstreamStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError, TimeoutError, ConnectionError))
+
+
+def _retry_after_hint(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies (seconds)."""
+
+    def __init__(self, window: int):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    Failure-ratio breaker over the last `window` outcomes. Opens once at least
+    `min_calls` were seen and `failure_ratio` of them failed; after
+    `open_seconds` one probe call is let through (half-open) and its outcome
+    closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, window: int, min_calls: int, failure_ratio: float, open_seconds: float):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probe_inflight = False
+        self.stats = {"opened": 0, "rejected": 0}
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError when open; returns True if this call is the probe."""
+        if self.state == "closed":
+            return False
+        elapsed = time.monotonic() - self._opened_at
+        if self.state == "open" and elapsed >= self.open_seconds:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_inflight:
+            self._probe_inflight = True
+            return True
+        self.stats["rejected"] += 1
+        raise CircuitOpenError(
+            f"{self.name} is unavailable",
+            retry_after_seconds=max(self.open_seconds - elapsed, 1),
+        )
+
+    def record(self, success: bool) -> None:
+        if self.state == "half_open" and self._probe_inflight:
+            self._probe_inflight = False
+            if success:
+                self.state = "closed"
+                self._outcomes.clear()
+                logger.info(f"Circuit for {self.name} closed")
+            else:
+                self._open()
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if (
+            self.state == "closed"
+            and len(self._outcomes) >= self.min_calls
+            and failures / len(self._outcomes) >= self.failure_ratio
+        ):
+            self._open()
+
+    def abandon(self) -> None:
+        """The caller went away mid-call; let the next call be the probe."""
+        self._probe_inflight = False
+
+    def _open(self) -> None:
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self.stats["opened"] += 1
+        logger.warning(f"Circuit for {self.name} opened")
+
+
+class Upstream:
+    """
+    Resilience wrapper for one upstream provider (Gemini, the image worker).
+
+    `call(op, fn)` runs `fn` (a zero-argument coroutine factory, called once
+    per attempt) behind the provider's circuit breaker, retries transient
+    failures with full-jitter exponential backoff, and, once `op` has enough
+    history, sends a hedged duplicate when the first attempt outlives the
+    learned HEDGE percentile of that operation's latency. Hedges are capped
+    at a fraction of recent calls so a slow provider is not hit twice as hard.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        hedge_percentile: float,
+        hedge_min_samples: int,
+        hedge_max_ratio: float,
+        breaker: CircuitBreaker,
+        latency_window: int = 500,
+    ):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_max_ratio = hedge_max_ratio
+        self.breaker = breaker
+        self._latency_window = latency_window
+        self._latency: Dict[str, LatencyTracker] = {}
+        self._recent_hedges: Deque[bool] = deque(maxlen=200)
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0}
+
+    def _tracker(self, op: str) -> LatencyTracker:
+        tracker = self._latency.get(op)
+        if tracker is None:
+            tracker = self._latency[op] = LatencyTracker(self._latency_window)
+        return tracker
+
+    def hedge_delay(self, op: str) -> Optional[float]:
+        return self._tracker(op).percentile(self.hedge_percentile, self.hedge_min_samples)
+
+    def _hedge_allowed(self) -> bool:
+        if not self._recent_hedges:
+            return True
+        return sum(self._recent_hedges) / len(self._recent_hedges) < self.hedge_max_ratio
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        hint = _retry_after_hint(error)
+        return min(max(delay, hint), self.backoff_max) if hint else delay
+
+    async def call(self, op: str, fn: Callable[[], Awaitable[Any]], *, hedge: bool = True) -> Any:
+        self.stats["calls"] += 1
+        for attempt in range(1, self.max_attempts + 1):
+            probe = self.breaker.before_call()
+            try:
+                result = await (self._hedged(op, fn) if hedge else self._timed(op, fn))
+            except (asyncio.CancelledError, ServiceBusyError):
+                # never reached the provider (or the caller left): no verdict
+                if probe:
+                    self.breaker.abandon()
+                raise
+            except Exception as e:
+                transient = is_transient(e)
+                # a non-transient error (bad request, unparsable output) still
+                # means the provider answered, so it counts as healthy
+                self.breaker.record(not transient)
+                if not transient or attempt == self.max_attempts:
+                    self.stats["failures"] += 1
+                    raise
+                delay = self._backoff(attempt, e)
+                self.stats["retries"] += 1
+                logger.warning(f"{self.name} {op} failed (attempt {attempt}), retrying in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record(True)
+            return result
+
+    async def _timed(self, op: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        result = await fn()
+        self._tracker(op).observe(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, op: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        delay = self.hedge_delay(op)
+        if delay is None:
+            self._recent_hedges.append(False)
+            return await self._timed(op, fn)
+
+        primary = asyncio.ensure_future(self._timed(op, fn))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done or not self._hedge_allowed():
+                self._recent_hedges.append(False)
+                return await primary
+
+            self._recent_hedges.append(True)
+            self.stats["hedges"] += 1
+            hedge_task = asyncio.ensure_future(self._timed(op, fn))
+            pending.add(hedge_task)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # the losing attempt (or both, if the caller went away)
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "circuit": self.breaker.state,
+            "circuit_stats": self.breaker.stats,
+            "hedge_after_seconds": {
+                op: (round(d, 3) if (d := self.hedge_delay(op)) is not None else None)
+                for op in self._latency
+            },
+        }
@@ -0,0 +1,30 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller starts the
+    upstream call, later callers await the same task and receive its result
+    or its exception. The key is released as soon as the call settles, so this
+    only covers the in-flight window (results are cached elsewhere).
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+        # shield so one caller disconnecting does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def inflight_count(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,202 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.settings import settings
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+class InvalidTokenError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class TokenUser:
+    """
+    Caller identity taken straight from a verified access token. Background
+    jobs run as their submitter, known by id only, so `email` may be None.
+    """
+
+    id: UUID
+    email: Optional[str] = None
+
+
+# set by the auth dependencies so services can attribute work to the caller
+current_user: ContextVar[Optional[TokenUser]] = ContextVar("current_user", default=None)
+# client address of an anonymous caller, so its rate limits are its own; run
+# uvicorn with --proxy-headers behind a proxy or every caller shares its address
+current_client: ContextVar[Optional[str]] = ContextVar("current_client", default=None)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signing_keys() -> tuple[Dict[str, bytes], str]:
+    keys = {kid: secret.encode("utf-8") for kid, secret in settings.TOKEN_SIGNING_KEYS.items()}
+    if not keys:
+        # no dedicated keys configured: derive one from the app secret so the
+        # raw password pepper is never used as a signing key
+        derived = hmac.new(
+            settings.PASSWORD_HASH_SECRET_KEY.encode("utf-8"), b"token-signing", hashlib.sha256
+        ).digest()
+        return {"default": derived}, "default"
+    active = settings.TOKEN_ACTIVE_KEY_ID or next(iter(keys))
+    if active not in keys:
+        raise ValueError(f"TOKEN_ACTIVE_KEY_ID '{active}' is not in TOKEN_SIGNING_KEYS")
+    return keys, active
+
+
+class TokenSigner:
+    """
+    Compact HS256 JWTs signed with the active key. Every configured key stays
+    valid for verification, so rotation is: add the new key, make it active,
+    and drop the old one once REFRESH_TOKEN_TTL_SECONDS has passed. Verifying
+    is one HMAC and a JSON decode, with no database access.
+    """
+
+    def __init__(self, keys: Dict[str, bytes], active_kid: str, issuer: str):
+        self.keys = keys
+        self.active_kid = active_kid
+        self.issuer = issuer
+
+    def _sign(self, signing_input: bytes, kid: str) -> str:
+        return _b64encode(hmac.new(self.keys[kid], signing_input, hashlib.sha256).digest())
+
+    def issue(self, user_id: UUID, email: str, token_type: str, ttl_seconds: int) -> str:
+        now = int(time.time())
+        header = {"alg": "HS256", "typ": "JWT", "kid": self.active_kid}
+        payload = {
+            "iss": self.issuer,
+            "sub": str(user_id),
+            "email": email,
+            "typ": token_type,
+            "iat": now,
+            "exp": now + ttl_seconds,
+            "jti": uuid.uuid4().hex,
+        }
+        signing_input = (
+            _b64encode(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+            + "."
+            + _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        )
+        return signing_input + "." + self._sign(signing_input.encode("ascii"), self.active_kid)
+
+    def verify(self, token: str, token_type: str) -> Dict[str, Any]:
+        """
+        Check signature, issuer, type and expiry. Anything malformed (wrong
+        segment count, non-object header or payload, non-numeric `exp`, a
+        non-string `sub`) raises InvalidTokenError, never another exception.
+        """
+        if not token.isascii():
+            raise InvalidTokenError("malformed token")
+        try:
+            header_b64, payload_b64, signature = token.split(".")
+            header = json.loads(_b64decode(header_b64))
+        except (ValueError, TypeError):
+            raise InvalidTokenError("malformed token")
+        if not isinstance(header, dict):
+            raise InvalidTokenError("malformed token")
+        kid = header.get("kid")
+        if header.get("alg") != "HS256" or not isinstance(kid, str) or kid not in self.keys:
+            raise InvalidTokenError("unknown signing key")
+        expected = self._sign(f"{header_b64}.{payload_b64}".encode("ascii"), kid)
+        if not hmac.compare_digest(expected, signature):
+            raise InvalidTokenError("invalid signature")
+        try:
+            payload = json.loads(_b64decode(payload_b64))
+        except (ValueError, TypeError):
+            raise InvalidTokenError("malformed token")
+        if not isinstance(payload, dict):
+            raise InvalidTokenError("malformed token")
+        if payload.get("iss") != self.issuer or payload.get("typ") != token_type:
+            raise InvalidTokenError("wrong token type")
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+            raise InvalidTokenError("malformed token")
+        if exp <= time.time():
+            raise InvalidTokenError("token expired")
+        if not isinstance(payload.get("sub"), str):
+            raise InvalidTokenError("malformed token")
+        return payload
+
+
+_keys, _active_kid = _signing_keys()
+token_signer = TokenSigner(keys=_keys, active_kid=_active_kid, issuer=settings.TOKEN_ISSUER)
+
+
+def issue_token_pair(user_id: UUID, email: str) -> Dict[str, Any]:
+    return {
+        "access_token": token_signer.issue(user_id, email, ACCESS, settings.ACCESS_TOKEN_TTL_SECONDS),
+        "refresh_token": token_signer.issue(user_id, email, REFRESH, settings.REFRESH_TOKEN_TTL_SECONDS),
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_TTL_SECONDS,
+    }
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def _user_from_credentials(credentials: HTTPAuthorizationCredentials | None) -> Optional[TokenUser]:
+    if credentials is None:
+        return None
+    try:
+        payload = token_signer.verify(credentials.credentials, ACCESS)
+        return TokenUser(id=UUID(payload["sub"]), email=payload["email"])
+    except (InvalidTokenError, KeyError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e) or "invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def get_optional_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+) -> Optional[TokenUser]:
+    """Identify the caller when a bearer token is sent; anonymous otherwise."""
+    user = _user_from_credentials(credentials)
+    current_user.set(user)
+    current_client.set(request.client.host if request.client else None)
+    return user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+) -> TokenUser:
+    user = _user_from_credentials(credentials)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    current_user.set(user)
+    return user
+
+
+def is_admin(user: TokenUser) -> bool:
+    return user.id in settings.ADMIN_USER_IDS
+
+
+async def get_admin_user(user: TokenUser = Depends(get_current_user)) -> TokenUser:
+    if not is_admin(user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="admin only")
+    return user
@@ -0,0 +1,145 @@
+import copy
+import threading
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from cachetools import TTLCache
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.models.user import User
+from app.settings import settings
+
+# left out of user snapshots: another worker would keep accepting an old
+# password hash for up to USER_CACHE_TTL_SECONDS. Credential checks read them
+# through the much shorter-lived credential entries instead
+UNCACHED_COLUMNS = frozenset({"password"})
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class UserCache:
+    """
+    Read-through cache of user rows keyed by id, with a secondary index by
+    normalized email. Entries are column snapshots, not ORM instances: every
+    hit builds a fresh detached User so concurrent requests never share (or
+    mutate) one object, and `db.add()` on it behaves like a loaded row.
+
+    Writes go through `invalidate`. Each invalidation bumps a generation
+    counter, and `put` drops snapshots read before the latest invalidation,
+    so a slow reader cannot re-cache a row that a concurrent write replaced.
+    Invalidation is per process; USER_CACHE_TTL_SECONDS bounds how long
+    another worker can serve a stale row. Snapshots leave out the password
+    hash, so cached users have it unloaded.
+
+    Sign-in reads full rows, hash included, from separate credential entries
+    keyed by exact email. They follow the same invalidation, but live only
+    `credentials_ttl` seconds, which is how long another worker may still
+    accept a password that was just changed; 0 disables them.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, credentials_ttl: int):
+        self._by_id: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._by_email: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.credentials_ttl = credentials_ttl
+        self._credentials: TTLCache = TTLCache(maxsize=maxsize, ttl=max(credentials_ttl, 1))
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "credential_hits": 0,
+            "credential_misses": 0,
+            "invalidations": 0,
+            "stale_puts_dropped": 0,
+        }
+
+    def generation(self) -> int:
+        """Take before the database read; pass to `put` afterwards."""
+        return self._generation
+
+    def get(self, user_id: UUID) -> Optional[User]:
+        with self._lock:
+            snapshot = self._by_id.get(user_id)
+            self.stats["hits" if snapshot is not None else "misses"] += 1
+        return self._materialize(snapshot) if snapshot is not None else None
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        with self._lock:
+            user_id = self._by_email.get(normalize_email(email))
+            snapshot = self._by_id.get(user_id) if user_id is not None else None
+            # emails are unique case-sensitively in the table, so only an
+            # exact match may be answered from the normalized key
+            if snapshot is not None and snapshot["email"] != email:
+                snapshot = None
+            self.stats["hits" if snapshot is not None else "misses"] += 1
+        return self._materialize(snapshot) if snapshot is not None else None
+
+    def get_credentials(self, email: str) -> Optional[User]:
+        """A user with the password hash loaded, for credential checks."""
+        with self._lock:
+            snapshot = self._credentials.get(email)
+            self.stats["credential_hits" if snapshot is not None else "credential_misses"] += 1
+        return self._materialize(snapshot) if snapshot is not None else None
+
+    def put(self, user: User, generation: int) -> None:
+        snapshot = self._snapshot(user, exclude=UNCACHED_COLUMNS)
+        with self._lock:
+            if generation != self._generation:
+                self.stats["stale_puts_dropped"] += 1
+                return
+            self._by_id[user.id] = snapshot
+            self._by_email[normalize_email(user.email)] = user.id
+
+    def put_credentials(self, user: User, generation: int) -> None:
+        if self.credentials_ttl <= 0:
+            return
+        snapshot = self._snapshot(user)
+        with self._lock:
+            if generation != self._generation:
+                self.stats["stale_puts_dropped"] += 1
+                return
+            self._credentials[user.email] = snapshot
+
+    def invalidate(self, user_id: UUID | None = None, *emails: str | None) -> None:
+        with self._lock:
+            self._generation += 1
+            self.stats["invalidations"] += 1
+            if user_id is not None:
+                self._by_id.pop(user_id, None)
+            for email in emails:
+                if email:
+                    self._by_email.pop(normalize_email(email), None)
+                    self._credentials.pop(email, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._by_id)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    @staticmethod
+    def _snapshot(user: User, exclude: frozenset = frozenset()) -> Dict[str, Any]:
+        return copy.deepcopy(
+            {
+                column.key: getattr(user, column.key)
+                for column in User.__table__.columns
+                if column.key not in exclude
+            }
+        )
+
+    @staticmethod
+    def _materialize(snapshot: Dict[str, Any]) -> User:
+        user = User(**copy.deepcopy(snapshot))
+        make_transient_to_detached(user)
+        return user
+
+
+user_cache = UserCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    credentials_ttl=settings.USER_CREDENTIAL_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,41 @@
+import io
+import zipfile
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target that hands back whatever was written so far."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class StreamingZipWriter:
+    """
+    Builds a zip archive incrementally. Because the sink is unseekable,
+    `zipfile` writes data descriptors after each entry instead of seeking back,
+    so every `add()` returns bytes that can be sent to the client immediately.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_STORED):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, mode="w", compression=compression)
+
+    def add(self, name: str, data: bytes) -> bytes:
+        self._zip.writestr(name, data)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._sink.drain()
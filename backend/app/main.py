@@ -1,8 +1,20 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse
 from app.settings import settings
 from app.routers.user import router as user_router
 from app.routers.content_generation import router as content_generation_router
-from app.db import Base, engine
+from app.routers.jobs import router as jobs_router
+from app.routers.presentations import router as presentations_router
+from app.queues.worker import job_worker_pool
+from app.lib.http_client import close_http_client
+from app.services.image_derivatives import derivative_builder
+from app.services.export import presentation_exporter
+from app.lib.password import hashing_executor
+from app.errors import ServiceBusyError
+from app.lib.tokens import TokenUser, get_admin_user
+from app.services.model_usage import ModelUsageMiddleware
+from app.db import Base, engine, async_engine, db_metrics
 from logging.config import dictConfig
 from app.config.logging_conf import LOGGING_CONFIG
 
@@ -12,17 +24,39 @@ dictConfig(LOGGING_CONFIG)
 #     print("⚙️  Creating tables (development mode only)...")
 #     Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title=settings.APP_NAME, version=settings.APP_VERSION)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.JOB_RUN_IN_API:
+        job_worker_pool.start()
+    yield
+    if settings.JOB_RUN_IN_API:
+        await job_worker_pool.stop()
+    await close_http_client()
+    derivative_builder.shutdown()
+    presentation_exporter.shutdown()
+    hashing_executor.shutdown()
+    await async_engine.dispose()
+
+app = FastAPI(title=settings.APP_NAME, version=settings.APP_VERSION, lifespan=lifespan)
+app.add_middleware(ModelUsageMiddleware)
+
+@app.exception_handler(ServiceBusyError)
+async def service_busy_handler(request: Request, exc: ServiceBusyError):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after_seconds)},
+    )
 
 app.include_router(user_router)
 app.include_router(content_generation_router)
+app.include_router(jobs_router)
+app.include_router(presentations_router)
 
 @app.get("/")
 async def root():
     return {"message": "Server is up and running"}
 
-
-
-
-
-
+@app.get("/db-stats")
+async def db_stats(user: TokenUser = Depends(get_admin_user)):
+    return db_metrics.snapshot()
@@ -0,0 +1,39 @@
+from app.db import Base
+from sqlalchemy import Column, String, DateTime, Integer, Text, Index, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+import uuid
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    kind = Column(String(64), nullable=False)
+    # queued -> running -> succeeded | failed; a transient failure puts the
+    # job back to queued until `run_after`
+    status = Column(String(16), nullable=False, server_default="queued")
+    payload = Column(JSONB, nullable=False)
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    created_by = Column(UUID(as_uuid=True), nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    # renewed by the running worker; a job whose heartbeat is older than the
+    # lease is considered abandoned
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # earliest time a requeued job may be claimed again (retry backoff)
+    run_after = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # dequeue scans the oldest queued/running jobs first
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+    )
@@ -0,0 +1,59 @@
+from app.db import Base
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+import uuid
+
+
+class Presentation(Base):
+    __tablename__ = "presentations"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        nullable=False,
+    )
+    user_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    title = Column(String(512), nullable=False)
+    description = Column(Text, nullable=True)
+    slide_count = Column(Integer, nullable=False, server_default="0")
+    # generation options (prompt, tone, aspect ratio, ...) kept for regeneration
+    options = Column(JSONB, nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        # "my recent decks": equality on user_id, then walk (created_at, id)
+        # newest first, so keyset pages are a single index range scan
+        Index(
+            "ix_presentations_user_id_created_at_id",
+            "user_id",
+            created_at.desc(),
+            id.desc(),
+        ),
+    )
+
+
+class Slide(Base):
+    __tablename__ = "slides"
+
+    # (presentation_id, position) is both the key and the read order
+    presentation_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("presentations.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    position = Column(Integer, primary_key=True)
+    # the slide as generated: title, points, image_gen_prompt, image_url, ...
+    content = Column(JSONB, nullable=False)
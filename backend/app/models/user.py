@@ -1,5 +1,5 @@
 from app.db import Base
-from sqlalchemy import Column, String, DateTime, func, JSON, ARRAY, text
+from sqlalchemy import Column, String, DateTime, Index, func, JSON, ARRAY, text
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
@@ -34,3 +34,8 @@ class User(Base):
     )
     created_by = Column(UUID(as_uuid=True), nullable=True)
     updated_by = Column(UUID(as_uuid=True), nullable=True)
+
+    __table_args__ = (
+        # keyset pagination / exports walk users in (created_at, id) order
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
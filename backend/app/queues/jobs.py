@@ -0,0 +1,25 @@
+from typing import Any, Awaitable, Callable, Dict
+from uuid import UUID
+
+from app.services.content_generation import OutlineClass
+from app.services.image_store import image_store
+
+JobHandler = Callable[[UUID, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+async def run_image_job(job_id: UUID, payload: Dict[str, Any]) -> Dict[str, Any]:
+    image_name = await OutlineClass.generate_image_to_store(payload["prompt"])
+    return {"image_name": image_name, "file_path": image_store.path_for(image_name)}
+
+
+async def run_deck_job(job_id: UUID, payload: Dict[str, Any]) -> Dict[str, Any]:
+    outline = await OutlineClass.agenerate_outline(payload["user_prompt"])
+    if payload.get("parallel"):
+        return await OutlineClass.agenerate_outline_with_details_parallel(outline)
+    return await OutlineClass.agenerate_outline_with_details(outline)
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    "image": run_image_job,
+    "deck": run_deck_job,
+}
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from app.db import SessionLocal
+from app.errors import ServiceBusyError
+from app.lib.resilience import is_transient
+from app.lib.tokens import TokenUser, current_user
+from app.queues.jobs import JOB_HANDLERS
+from app.repositories.job import JobRepo
+from app.services.model_usage import model_usage
+from app.settings import settings
+
+logger = logging.getLogger("app")
+
+
+class JobWorkerPool:
+    """
+    A pool of asyncio workers that dequeue jobs from the `jobs` table with
+    `SKIP LOCKED` and run them. It can run inside the API process or on its own
+    (`python -m app.queues.worker`) so workers scale independently of the API.
+
+    A running job renews its lease every `lease_seconds / 3`; if another worker
+    has taken the job over, the run is cancelled and its result discarded.
+    Each job runs as the user who submitted it, so its model calls draw on
+    that user's scheduler budget and usage accounting.
+
+    A run that fails transiently (upstream 429/5xx, timeouts, our own
+    admission control) is requeued with full-jitter exponential backoff until
+    `max_attempts`; any other error fails the job at once.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        poll_interval: float,
+        lease_seconds: int,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._stopping = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(worker_id))
+            for worker_id in range(self.concurrency)
+        ]
+        logger.info(f"Started {self.concurrency} job workers")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Stopped job workers")
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(seconds=self.lease_seconds)
+        with SessionLocal() as db:
+            abandoned = JobRepo.fail_abandoned(
+                db, now=now, stale_before=stale_before, max_attempts=self.max_attempts
+            )
+            if abandoned:
+                logger.warning(f"Failed {abandoned} job(s) whose lease expired on their last attempt")
+            job = JobRepo.claim_next(
+                db,
+                now=now,
+                stale_before=stale_before,
+                max_attempts=self.max_attempts,
+            )
+            if job is None:
+                return None
+            return {
+                "id": job.id,
+                "kind": job.kind,
+                "payload": job.payload,
+                "attempt": job.attempts,
+                "created_by": job.created_by,
+            }
+
+    def _heartbeat(self, job: Dict[str, Any]) -> bool:
+        with SessionLocal() as db:
+            return JobRepo.heartbeat(
+                db, job["id"], attempt=job["attempt"], now=datetime.now(timezone.utc)
+            )
+
+    def _finish(self, job: Dict[str, Any], **kwargs) -> bool:
+        with SessionLocal() as db:
+            return JobRepo.finish(
+                db, job["id"], attempt=job["attempt"], now=datetime.now(timezone.utc), **kwargs
+            )
+
+    def _requeue(self, job: Dict[str, Any], delay: float, error: str) -> bool:
+        run_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        with SessionLocal() as db:
+            return JobRepo.requeue(
+                db, job["id"], attempt=job["attempt"], run_after=run_after, error=error
+            )
+
+    def _retry_delay(self, job: Dict[str, Any], error: BaseException) -> Optional[float]:
+        """Backoff before the next attempt, or None when the job should fail now."""
+        if job["attempt"] >= self.max_attempts:
+            return None
+        if not (isinstance(error, ServiceBusyError) or is_transient(error)):
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (job["attempt"] - 1)))
+        if isinstance(error, ServiceBusyError):
+            delay = max(delay, error.retry_after_seconds)
+        return delay
+
+    async def _worker_loop(self, worker_id: int) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} failed to dequeue: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job)
+
+    async def _keep_lease(self, job: Dict[str, Any], run: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                owned = await asyncio.to_thread(self._heartbeat, job)
+            except Exception as e:
+                logger.error(f"Failed to renew lease of job {job['id']}: {e}")
+                continue
+            if not owned:
+                logger.warning(f"Job {job['id']} lost its lease; cancelling attempt {job['attempt']}")
+                job["lease_lost"] = True
+                run.cancel()
+                return
+
+    async def _execute(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        handler = JOB_HANDLERS.get(job["kind"])
+        if handler is None:
+            raise ValueError(f"Unknown job kind '{job['kind']}'")
+        user = TokenUser(id=job["created_by"]) if job["created_by"] else None
+        token = current_user.set(user)
+        try:
+            with model_usage.track(f"job:{job['kind']}"):
+                return await handler(job["id"], job["payload"])
+        finally:
+            current_user.reset(token)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        run = asyncio.create_task(self._execute(job))
+        lease = asyncio.create_task(self._keep_lease(job, run))
+        try:
+            result = await run
+            outcome = {"status": "succeeded", "result": result}
+            logger.info(f"Job {job['id']} ({job['kind']}) succeeded")
+        except asyncio.CancelledError:
+            if not job.get("lease_lost"):
+                raise
+            # cancelled by `_keep_lease`: another worker owns the job now
+            return
+        except Exception as e:
+            delay = self._retry_delay(job, e)
+            if delay is None:
+                outcome = {"status": "failed", "error": str(e)}
+                logger.error(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            else:
+                outcome = {"status": "queued", "error": str(e)}
+                logger.warning(
+                    f"Job {job['id']} ({job['kind']}) attempt {job['attempt']} failed transiently: {e}; "
+                    f"retrying in {delay:.1f}s"
+                )
+        finally:
+            lease.cancel()
+
+        try:
+            if outcome["status"] == "queued":
+                recorded = await asyncio.to_thread(self._requeue, job, delay, outcome["error"])
+            else:
+                recorded = await asyncio.to_thread(self._finish, job, **outcome)
+        except Exception as e:
+            logger.error(f"Failed to record outcome of job {job['id']}: {e}")
+            return
+        if not recorded:
+            logger.warning(
+                f"Job {job['id']} attempt {job['attempt']} finished after losing its lease; result discarded"
+            )
+
+
+job_worker_pool = JobWorkerPool(
+    concurrency=settings.JOB_WORKER_CONCURRENCY,
+    poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    backoff_base=settings.JOB_RETRY_BACKOFF_SECONDS,
+    backoff_max=settings.JOB_RETRY_BACKOFF_MAX_SECONDS,
+)
+
+
+async def main() -> None:
+    job_worker_pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await job_worker_pool.stop()
+
+
+if __name__ == "__main__":
+    from logging.config import dictConfig
+    from app.config.logging_conf import LOGGING_CONFIG
+
+    dictConfig(LOGGING_CONFIG)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,53 @@
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from app.models.generation_cache import GenerationCacheEntry
+from datetime import datetime
+from typing import Optional
+
+
+class GenerationCacheRepo:
+    @staticmethod
+    def get(db: Session, key: str, now: datetime) -> Optional[GenerationCacheEntry]:
+        return (
+            db.query(GenerationCacheEntry)
+            .filter(
+                GenerationCacheEntry.key == key,
+                GenerationCacheEntry.expires_at > now,
+            )
+            .first()
+        )
+
+    @staticmethod
+    def upsert(
+        db: Session,
+        *,
+        key: str,
+        model: str,
+        response: dict,
+        expires_at: datetime,
+    ) -> None:
+        stmt = insert(GenerationCacheEntry).values(
+            key=key, model=model, response=response, expires_at=expires_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GenerationCacheEntry.key],
+            set_={"response": stmt.excluded.response, "expires_at": stmt.excluded.expires_at},
+        )
+        db.execute(stmt)
+        db.commit()
+
+    @staticmethod
+    def delete_expired(db: Session, now: datetime, limit: int) -> int:
+        """Delete up to `limit` expired rows (via the expires_at index); returns the count."""
+        expired = (
+            select(GenerationCacheEntry.key)
+            .where(GenerationCacheEntry.expires_at <= now)
+            .limit(limit)
+            .scalar_subquery()
+        )
+        result = db.execute(
+            delete(GenerationCacheEntry).where(GenerationCacheEntry.key.in_(expired))
+        )
+        db.commit()
+        return result.rowcount
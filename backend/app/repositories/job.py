@@ -0,0 +1,146 @@
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+from app.models.job import Job
+from datetime import datetime
+from uuid import UUID
+from typing import Optional
+
+
+class JobRepo:
+    @staticmethod
+    def create(
+        db: Session,
+        *,
+        kind: str,
+        payload: dict,
+        created_by: UUID | None = None,
+    ) -> Job:
+        job = Job(kind=kind, status="queued", payload=payload, created_by=created_by)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def get(db: Session, job_id: UUID) -> Optional[Job]:
+        return db.get(Job, job_id)
+
+    @staticmethod
+    def claim_next(
+        db: Session, *, now: datetime, stale_before: datetime, max_attempts: int
+    ) -> Optional[Job]:
+        """
+        Atomically claim the oldest runnable job. `FOR UPDATE SKIP LOCKED` lets
+        many workers dequeue concurrently without blocking on each other's rows.
+        Jobs left `running` past their lease (crashed worker) are picked up again;
+        requeued jobs wait until their `run_after`.
+        The new `attempts` value identifies this run to `heartbeat` and `finish`.
+        """
+        job = (
+            db.query(Job)
+            .filter(
+                or_(
+                    and_(
+                        Job.status == "queued",
+                        or_(Job.run_after.is_(None), Job.run_after <= now),
+                    ),
+                    and_(Job.status == "running", Job.heartbeat_at < stale_before),
+                ),
+                Job.attempts < max_attempts,
+            )
+            .order_by(Job.created_at)
+            .with_for_update(skip_locked=True)
+            .limit(1)
+            .first()
+        )
+        if job is None:
+            db.rollback()
+            return None
+        job.status = "running"
+        job.started_at = now
+        job.heartbeat_at = now
+        job.attempts = job.attempts + 1
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def fail_abandoned(
+        db: Session, *, now: datetime, stale_before: datetime, max_attempts: int
+    ) -> int:
+        """
+        Fail jobs whose lease expired on their last attempt; `claim_next` will
+        not pick them up again, so they would otherwise stay `running` forever.
+        """
+        result = db.execute(
+            update(Job)
+            .where(
+                Job.status == "running",
+                Job.heartbeat_at < stale_before,
+                Job.attempts >= max_attempts,
+            )
+            .values(
+                status="failed",
+                error=f"lease expired after {max_attempts} attempts",
+                finished_at=now,
+            )
+        )
+        db.commit()
+        return result.rowcount
+
+    @staticmethod
+    def heartbeat(db: Session, job_id: UUID, *, attempt: int, now: datetime) -> bool:
+        """Extend the lease of the given run; False if the job is no longer ours."""
+        result = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.attempts == attempt, Job.status == "running")
+            .values(heartbeat_at=now)
+        )
+        db.commit()
+        return result.rowcount == 1
+
+    @staticmethod
+    def finish(
+        db: Session,
+        job_id: UUID,
+        *,
+        attempt: int,
+        status: str,
+        now: datetime,
+        result: dict | None = None,
+        error: str | None = None,
+    ) -> bool:
+        """
+        Record the outcome of the given run. Conditional on `attempt`, so a run
+        whose lease was taken over cannot overwrite the newer run's result;
+        returns False when nothing was updated.
+        """
+        updated = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.attempts == attempt, Job.status == "running")
+            .values(status=status, result=result, error=error, finished_at=now)
+        )
+        db.commit()
+        return updated.rowcount == 1
+
+    @staticmethod
+    def requeue(
+        db: Session,
+        job_id: UUID,
+        *,
+        attempt: int,
+        run_after: datetime,
+        error: str,
+    ) -> bool:
+        """
+        Put the given run back in the queue after a transient failure; it is
+        claimed again no earlier than `run_after`. Conditional on `attempt`
+        like `finish`.
+        """
+        updated = db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.attempts == attempt, Job.status == "running")
+            .values(status="queued", error=error, run_after=run_after, heartbeat_at=None)
+        )
+        db.commit()
+        return updated.rowcount == 1
@@ -0,0 +1,79 @@
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.presentation import Presentation, Slide
+from datetime import datetime
+from uuid import UUID
+from typing import Any, Optional
+import uuid
+
+
+class PresentationRepo:
+    @staticmethod
+    async def acreate(
+        db: AsyncSession,
+        *,
+        user_id: UUID,
+        title: str,
+        description: str | None,
+        slides: list[dict[str, Any]],
+        options: dict | None = None,
+    ) -> Presentation:
+        """
+        Insert the deck row, then all of its slides with a single multi-row
+        INSERT (executemany through insertmanyvalues), in one transaction.
+        """
+        presentation = Presentation(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            title=title,
+            description=description,
+            slide_count=len(slides),
+            options=options,
+        )
+        db.add(presentation)
+        await db.flush()
+        if slides:
+            await db.execute(
+                insert(Slide),
+                [
+                    {"presentation_id": presentation.id, "position": position, "content": content}
+                    for position, content in enumerate(slides)
+                ],
+            )
+        await db.commit()
+        await db.refresh(presentation)
+        return presentation
+
+    @staticmethod
+    async def aget(db: AsyncSession, presentation_id: UUID) -> Optional[Presentation]:
+        return await db.get(Presentation, presentation_id)
+
+    @staticmethod
+    async def aget_slides(db: AsyncSession, presentation_id: UUID) -> list[dict[str, Any]]:
+        result = await db.execute(
+            select(Slide.content)
+            .where(Slide.presentation_id == presentation_id)
+            .order_by(Slide.position)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def alist_for_user(
+        db: AsyncSession,
+        user_id: UUID,
+        *,
+        limit: int = 20,
+        after: tuple[datetime, UUID] | None = None,
+    ) -> list[Presentation]:
+        """
+        Newest-first decks for a user. `after` is the (created_at, id) of the
+        last row of the previous page; the row-value comparison matches
+        ix_presentations_user_id_created_at_id, so every page costs the same
+        regardless of how deep it is.
+        """
+        query = select(Presentation).where(Presentation.user_id == user_id)
+        if after is not None:
+            query = query.where(tuple_(Presentation.created_at, Presentation.id) < tuple_(*after))
+        query = query.order_by(Presentation.created_at.desc(), Presentation.id.desc()).limit(limit)
+        result = await db.execute(query)
+        return list(result.scalars().all())
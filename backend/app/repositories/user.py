@@ -1,8 +1,12 @@
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
+from app.lib.user_cache import user_cache
 from uuid import UUID
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, Iterable
+from datetime import datetime
+from typing import Optional, Iterable, AsyncIterator
 
 
 class UserRepo:
@@ -33,20 +37,61 @@ class UserRepo:
         except IntegrityError:
             db.rollback()
             raise ValueError("email already exist")
+        user_cache.invalidate(user.id, email)
         db.refresh(user)
         return user
 
     @staticmethod
     def get(db: Session, user_id: UUID) -> Optional[User]:
-        return db.get(User, user_id)
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return cached
+        generation = user_cache.generation()
+        user = db.get(User, user_id)
+        if user is not None:
+            user_cache.put(user, generation)
+        return user
 
     @staticmethod
     def get_by_email(db: Session, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+        cached = user_cache.get_by_email(email)
+        if cached is not None:
+            return cached
+        generation = user_cache.generation()
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None:
+            user_cache.put(user, generation)
+        return user
+
+    @staticmethod
+    def get_credentials_by_email(db: Session, email: str) -> Optional[User]:
+        """Lookup for credential checks, from the short-lived credential cache."""
+        cached = user_cache.get_credentials(email)
+        if cached is not None:
+            return cached
+        generation = user_cache.generation()
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None:
+            user_cache.put_credentials(user, generation)
+        return user
 
     @staticmethod
-    def list_users(db: Session, skip: int = 0, limit: int = 100) -> Iterable[User]:
-        return db.query(User).offset(skip).limit(limit).all()
+    def _page_query(limit: int, after: tuple[datetime, UUID] | None):
+        """
+        Keyset page in (created_at, id) order. `after` is the last row of the
+        previous page, so the cost does not grow with the page number the way
+        OFFSET does; served by ix_users_created_at_id.
+        """
+        query = select(User)
+        if after is not None:
+            query = query.where(tuple_(User.created_at, User.id) > tuple_(*after))
+        return query.order_by(User.created_at, User.id).limit(limit)
+
+    @staticmethod
+    def list_users(
+        db: Session, limit: int = 100, after: tuple[datetime, UUID] | None = None
+    ) -> Iterable[User]:
+        return db.execute(UserRepo._page_query(limit, after)).scalars().all()
 
     @staticmethod
     def update(
@@ -62,6 +107,7 @@ class UserRepo:
         last_signin_at=None,
         updated_by=None,
     ) -> User:
+        previous_email = user.email
         if email is not None:
             user.email = email
         if full_name is not None:
@@ -79,6 +125,134 @@ class UserRepo:
         if updated_by is not None:
             user.updated_by = updated_by
         db.add(user)
-        db.commit(user)
+        db.commit()
+        user_cache.invalidate(user.id, previous_email, user.email)
         db.refresh(user)
         return user
+
+    # ---- async counterparts (AsyncSession), used by the async request path ----
+
+    @staticmethod
+    async def acreate(
+        db: AsyncSession,
+        *,
+        email: str,
+        full_name: str,
+        hashed_password: str,
+        providers: list[str] | None = None,
+        picture_url: str | None = None,
+        user_metadata: dict | None = None,
+        created_by: UUID | None = None,
+    ) -> User:
+        user = User(
+            email=email,
+            full_name=full_name,
+            password=hashed_password,
+            providers=providers,
+            picture_url=picture_url,
+            user_metadata=user_metadata,
+            created_by=created_by,
+        )
+        try:
+            db.add(user)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise ValueError("email already exist")
+        user_cache.invalidate(user.id, email)
+        await db.refresh(user)
+        return user
+
+    @staticmethod
+    async def aget(db: AsyncSession, user_id: UUID) -> Optional[User]:
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return cached
+        generation = user_cache.generation()
+        user = await db.get(User, user_id)
+        if user is not None:
+            user_cache.put(user, generation)
+        return user
+
+    @staticmethod
+    async def aget_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        cached = user_cache.get_by_email(email)
+        if cached is not None:
+            return cached
+        generation = user_cache.generation()
+        result = await db.execute(select(User).where(User.email == email).limit(1))
+        user = result.scalars().first()
+        if user is not None:
+            user_cache.put(user, generation)
+        return user
+
+    @staticmethod
+    async def aget_credentials_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        """Lookup for credential checks, from the short-lived credential cache."""
+        cached = user_cache.get_credentials(email)
+        if cached is not None:
+            return cached
+        generation = user_cache.generation()
+        result = await db.execute(select(User).where(User.email == email).limit(1))
+        user = result.scalars().first()
+        if user is not None:
+            user_cache.put_credentials(user, generation)
+        return user
+
+    @staticmethod
+    async def alist_users(
+        db: AsyncSession, limit: int = 100, after: tuple[datetime, UUID] | None = None
+    ) -> Iterable[User]:
+        result = await db.execute(UserRepo._page_query(limit, after))
+        return result.scalars().all()
+
+    @staticmethod
+    async def astream_users(db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[User]:
+        """
+        Iterate every user through a server-side cursor, fetching `batch_size`
+        rows at a time, so memory stays flat regardless of table size.
+        """
+        result = await db.stream(
+            select(User)
+            .order_by(User.created_at, User.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for user in result.scalars():
+            yield user
+
+    @staticmethod
+    async def aupdate(
+        db: AsyncSession,
+        user: User,
+        *,
+        email: str | None = None,
+        full_name: str | None = None,
+        hashed_password: str | None = None,
+        providers: list[str] | None = None,
+        picture_url: str | None = None,
+        user_metadata: dict | None = None,
+        last_signin_at=None,
+        updated_by=None,
+    ) -> User:
+        previous_email = user.email
+        if email is not None:
+            user.email = email
+        if full_name is not None:
+            user.full_name = full_name
+        if hashed_password is not None:
+            user.password = hashed_password
+        if providers is not None:
+            user.providers = providers
+        if picture_url is not None:
+            user.picture_url = picture_url
+        if user_metadata is not None:
+            user.user_metadata = user_metadata
+        if last_signin_at is not None:
+            user.last_signin_at = last_signin_at
+        if updated_by is not None:
+            user.updated_by = updated_by
+        db.add(user)
+        await db.commit()
+        user_cache.invalidate(user.id, previous_email, user.email)
+        await db.refresh(user)
+        return user
@@ -1,32 +1,111 @@
-from app.services.content_generation import OutlineClass
-from fastapi import APIRouter, status, Request
-from fastapi.responses import FileResponse, JSONResponse
+from app.services.content_generation import (
+    OutlineClass,
+    inflight,
+    gemini_upstream,
+    image_worker_upstream,
+    output_stats,
+    prompt_cache,
+)
+from fastapi import APIRouter, status, Request, Body, Depends
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from app.lib.utils import sse_event
+from app.services.generation_cache import generation_cache
+from app.services.image_store import image_store
+from app.services.image_serving import serve_image, hot_images
+from app.schemas.content_generation import AspectRatio
+from app.lib.tokens import TokenUser, get_admin_user, get_optional_user
+from app.services.model_scheduler import model_scheduler
+from app.services.model_usage import model_usage
+from app.errors import ServiceBusyError
+from typing import Literal
 import logging
 
+# anonymous calls still work; a bearer token identifies the caller through
+# the `current_user` context variable without touching the database
 router = APIRouter(
     prefix="/generate",
     tags=["content-generation"],
+    dependencies=[Depends(get_optional_user)],
 )
 
 logger = logging.getLogger("app")
 
 @router.post("/outlines", response_model=dict, status_code=status.HTTP_200_OK)
-def generate_outline(user_prompt: str):
+async def generate_outline(user_prompt: str, no_cache: bool = False):
     try:
-        outline_response = OutlineClass.generate_outline(user_prompt)
+        outline_response = await OutlineClass.agenerate_outline(user_prompt, use_cache=not no_cache)
         return outline_response
+    except ServiceBusyError:
+        raise
     except Exception as e:
         return {"error": str(e)}
     
 @router.post("/outlines-with-details", response_model=dict, status_code=status.HTTP_200_OK)
-def generate_outline(user_prompt: str):
+async def generate_outline_with_details(user_prompt: str, parallel: bool = False, no_cache: bool = False):
     try:
-        outline_response = OutlineClass.generate_outline(user_prompt)
-        outline_with_details_response = OutlineClass.generate_outline_with_details(outline_response)
+        outline_response = await OutlineClass.agenerate_outline(user_prompt, use_cache=not no_cache)
+        if parallel:
+            outline_with_details_response = await OutlineClass.agenerate_outline_with_details_parallel(outline_response)
+        else:
+            outline_with_details_response = await OutlineClass.agenerate_outline_with_details(
+                outline_response, use_cache=not no_cache
+            )
         return outline_with_details_response
+    except ServiceBusyError:
+        raise
     except Exception as e:
         return {"error": str(e)}
     
+@router.post("/outlines-with-details/stream")
+async def stream_outline_with_details(user_prompt: str):
+    # the outline is generated before the response starts, so admission
+    # control can still answer with a real 429 instead of an in-stream error
+    outline_response, outline_error = None, None
+    try:
+        outline_response = await OutlineClass.agenerate_outline(user_prompt)
+    except ServiceBusyError:
+        raise
+    except Exception as e:
+        outline_error = e
+
+    async def event_stream():
+        if outline_error is not None:
+            yield sse_event("error", {"error": str(outline_error)})
+            return
+        try:
+            yield sse_event("outline", outline_response)
+            async for message in OutlineClass.astream_outline_with_details(outline_response):
+                yield sse_event(message["event"], message["data"])
+        except ServiceBusyError as e:
+            yield sse_event("error", {"error": str(e), "retry_after_seconds": e.retry_after_seconds})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/cache-stats", response_model=dict, status_code=status.HTTP_200_OK)
+async def get_cache_stats(user: TokenUser = Depends(get_admin_user)):
+    return {
+        **generation_cache.get_stats(),
+        "inflight": inflight.inflight_count(),
+        "coalesced": inflight.stats,
+        "model_output": output_stats,
+        "hot_images": hot_images.stats,
+        "scheduler": model_scheduler.get_stats(),
+        "prompt_cache": prompt_cache.get_stats(),
+        "upstreams": {
+            gemini_upstream.name: gemini_upstream.get_stats(),
+            image_worker_upstream.name: image_worker_upstream.get_stats(),
+        },
+    }
+
+@router.get("/usage-stats", response_model=dict, status_code=status.HTTP_200_OK)
+async def get_usage_stats(user: TokenUser = Depends(get_admin_user)):
+    return model_usage.snapshot()
 
 # @router.get("/image", response_model=dict, status_code=status.HTTP_200_OK)
 # async def generate_image(user_prompt: str):
@@ -35,23 +114,73 @@ def generate_outline(user_prompt: str):
 
 @router.post("/image", response_model=dict)
 async def generate_image(user_prompt: str, request: Request):
-    file_path = await OutlineClass.generate_image_and_save(user_prompt, "generated_images/image.jpg")
-    file_url = str(request.base_url) + file_path
+    image_name = await OutlineClass.generate_image_to_store(user_prompt)
+    file_url = str(request.url_for("get_generated_image").include_query_params(image_name=image_name))
     return {
-        "file_path": file_path,
+        "image_name": image_name,
+        "file_path": image_store.path_for(image_name),
         "file_url": file_url
     }
 
+@router.post("/images/batch", response_model=dict, status_code=status.HTTP_200_OK)
+async def generate_deck_images(presentation: dict = Body(...)):
+    try:
+        return await OutlineClass.generate_deck_images(presentation)
+    except ServiceBusyError:
+        raise
+    except Exception as e:
+        return {"error": str(e)}
+
+EXPORT_MEDIA_TYPES = {
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "pdf": "application/pdf",
+    "images_zip": "application/zip",
+}
+
+EXPORT_FILENAMES = {
+    "pptx": "presentation.pptx",
+    "pdf": "presentation.pdf",
+    "images_zip": "presentation_slides.zip",
+}
+
+@router.post("/export")
+async def export_presentation(
+    presentation: dict = Body(...),
+    export_format: Literal["pptx", "pdf", "images_zip"] = "pptx",
+    aspect_ratio: AspectRatio = "16:9",
+):
+    try:
+        stream = await OutlineClass.generate_presentation(presentation, export_format, aspect_ratio)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{EXPORT_FILENAMES[export_format]}"'},
+    )
+
 @router.get("/get-generated-image")
-async def get_generated_image(image_name: str):
+async def get_generated_image(
+    image_name: str,
+    request: Request,
+    size: Literal["thumb", "small", "medium", "original"] | None = None,
+    format: Literal["auto", "avif", "webp", "png", "jpg"] | None = None,
+):
     try:
-        return OutlineClass.get_generated_image(image_name)
+        return await serve_image(image_name, request, size=size, fmt=format)
     except FileNotFoundError:
         return JSONResponse(
             status_code=404,
             content={"error": f"Image '{image_name}' not found"}
         )
 
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"error": str(e)}
+        )
+
     except Exception as e:
         logger.error(f"Error fetching image: {e}")
         return JSONResponse(
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, status, Depends, HTTPException
+from sqlalchemy.orm import Session
+from uuid import UUID
+from app.db import get_db
+from app.repositories.job import JobRepo
+from app.schemas.job import ImageJobCreate, DeckJobCreate, JobSubmitted, JobOut
+from app.lib.tokens import TokenUser, get_optional_user
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+)
+
+
+@router.post("/image", response_model=JobSubmitted, status_code=status.HTTP_202_ACCEPTED)
+def submit_image_job(
+    request: ImageJobCreate,
+    db: Session = Depends(get_db),
+    user: TokenUser | None = Depends(get_optional_user),
+):
+    return JobRepo.create(
+        db, kind="image", payload=request.model_dump(), created_by=user.id if user else None
+    )
+
+
+@router.post("/deck", response_model=JobSubmitted, status_code=status.HTTP_202_ACCEPTED)
+def submit_deck_job(
+    request: DeckJobCreate,
+    db: Session = Depends(get_db),
+    user: TokenUser | None = Depends(get_optional_user),
+):
+    return JobRepo.create(
+        db, kind="deck", payload=request.model_dump(), created_by=user.id if user else None
+    )
+
+
+@router.get("/{job_id}", response_model=JobOut, status_code=status.HTTP_200_OK)
+def get_job(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    user: TokenUser | None = Depends(get_optional_user),
+):
+    job = JobRepo.get(db, job_id)
+    # jobs submitted with a token are only visible to their owner; 404 rather
+    # than 403 so job ids cannot be probed
+    if job is None or (job.created_by is not None and (user is None or user.id != job.created_by)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="job not found")
+    return job
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, status, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from app.db import get_async_db
+from app.lib.pagination import encode_cursor, decode_cursor
+from app.lib.tokens import TokenUser, get_current_user
+from app.models.presentation import Presentation
+from app.repositories.presentation import PresentationRepo
+from app.schemas.presentation import (
+    PresentationCreate,
+    PresentationOut,
+    PresentationPage,
+    PresentationSummary,
+)
+
+router = APIRouter(
+    prefix="/presentations",
+    tags=["presentations"],
+)
+
+
+def _presentation_out(presentation: Presentation, slides: list[dict]) -> PresentationOut:
+    summary = PresentationSummary.model_validate(presentation)
+    return PresentationOut(**summary.model_dump(), options=presentation.options, slides=slides)
+
+
+@router.post("", response_model=PresentationOut, status_code=status.HTTP_201_CREATED)
+async def create_presentation(
+    request: PresentationCreate,
+    user: TokenUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    presentation = await PresentationRepo.acreate(
+        db,
+        user_id=user.id,
+        title=request.title,
+        description=request.description,
+        slides=request.slides,
+        options=request.options,
+    )
+    return _presentation_out(presentation, request.slides)
+
+
+@router.get("", response_model=PresentationPage, status_code=status.HTTP_200_OK)
+async def list_presentations(
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    user: TokenUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    presentations = await PresentationRepo.alist_for_user(db, user.id, limit=limit, after=after)
+    next_cursor = None
+    if len(presentations) == limit:
+        last = presentations[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return PresentationPage(items=presentations, next_cursor=next_cursor)
+
+
+@router.get("/{presentation_id}", response_model=PresentationOut, status_code=status.HTTP_200_OK)
+async def get_presentation(
+    presentation_id: UUID,
+    user: TokenUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    presentation = await PresentationRepo.aget(db, presentation_id)
+    if presentation is None or presentation.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="presentation not found")
+    slides = await PresentationRepo.aget_slides(db, presentation_id)
+    return _presentation_out(presentation, slides)
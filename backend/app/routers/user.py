@@ -1,8 +1,14 @@
-from fastapi import APIRouter, status, Depends, HTTPException
-from app.schemas.user import UserOut, UserSignin, UserCreate
-from sqlalchemy.orm import Session
-from app.db import get_db
+from fastapi import APIRouter, status, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.schemas.user import UserOut, UserSignin, UserCreate, UserPage, UserSignedIn, TokenRefresh, TokenPair
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from app.db import get_async_db, AsyncSessionLocal
+from app.lib.pagination import encode_cursor, decode_cursor
+from app.repositories.user import UserRepo
+from app.lib.user_cache import user_cache
 from app.services.user import UserService
+from app.lib.tokens import InvalidTokenError, TokenUser, get_admin_user, get_current_user, is_admin
 
 router = APIRouter(
     prefix="/users",
@@ -10,18 +16,86 @@ router = APIRouter(
 )
 
 # create user api
-@router.post("/sign-in", response_model=UserOut, status_code=status.HTTP_200_OK)
-def signin_user(request: UserSignin, db: Session=Depends(get_db)):
+@router.post("/sign-in", response_model=UserSignedIn, status_code=status.HTTP_200_OK)
+async def signin_user(request: UserSignin, db: AsyncSession=Depends(get_async_db)):
     try:
-        user = UserService.signin_user(db, email=request.email, raw_password=request.password)
-        return user
+        return await UserService.signin_with_tokens(db, email=request.email, raw_password=request.password)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
 @router.post("/sign-up", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def signup_user(request: UserCreate, db: Session=Depends(get_db)):
+async def signup_user(request: UserCreate, db: AsyncSession=Depends(get_async_db)):
     try:
-        user = UserService.signup_user(db, request)
+        user = await UserService.signup_user(db, request)
         return user
     except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/refresh", response_model=TokenPair, status_code=status.HTTP_200_OK)
+async def refresh_tokens(request: TokenRefresh, db: AsyncSession=Depends(get_async_db)):
+    try:
+        return await UserService.refresh_tokens(db, request.refresh_token)
+    except InvalidTokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+@router.get("/me", response_model=UserOut, status_code=status.HTTP_200_OK)
+async def get_me(user: TokenUser = Depends(get_current_user), db: AsyncSession=Depends(get_async_db)):
+    found = await UserRepo.aget(db, user.id)
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="user not found")
+    return found
+
+
+@router.get("", response_model=UserPage, status_code=status.HTTP_200_OK)
+async def list_users(
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: str | None = None,
+    user: TokenUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not is_admin(user):
+        # everyone else only ever sees their own row
+        own = await UserRepo.aget(db, user.id) if after is None else None
+        return UserPage(items=[own] if own is not None else [], next_cursor=None)
+    users = await UserRepo.alist_users(db, limit=limit, after=after)
+    next_cursor = None
+    if len(users) == limit:
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id)
+    return UserPage(items=users, next_cursor=next_cursor)
+
+
+async def _export_users_ndjson(only_user_id: UUID | None = None):
+    # own session: the request-scoped one must not be held open for the
+    # whole download, and the cursor has to live as long as the stream
+    async with AsyncSessionLocal() as db:
+        if only_user_id is not None:
+            user = await UserRepo.aget(db, only_user_id)
+            if user is not None:
+                yield UserOut.model_validate(user).model_dump_json() + "\n"
+            return
+        async for user in UserRepo.astream_users(db):
+            yield UserOut.model_validate(user).model_dump_json() + "\n"
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_users(user: TokenUser = Depends(get_current_user)):
+    return StreamingResponse(
+        _export_users_ndjson(None if is_admin(user) else user.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'},
+    )
+
+
+@router.get("/cache-stats", response_model=dict, status_code=status.HTTP_200_OK)
+async def get_user_cache_stats(user: TokenUser = Depends(get_admin_user)):
+    return user_cache.get_stats()
@@ -1,5 +1,7 @@
 from typing import Literal, Optional
 
+from jsonschema import Draft202012Validator
+
 PresentationType = Literal[
     "pitch_deck", "sales_deck", "report", "training",
     "lecture", "marketing", "internal_update",
@@ -65,8 +67,48 @@ class Slide:
 class PresentationResponse:
     title: str
     description: str
-    slides: list[Slide] 
-
-
-
-
+    slides: list[Slide]
+
+# JSON Schemas for model output, compiled once. Slides are validated one by
+# one so a deck with a few bad slides can be kept and only those re-requested.
+OUTLINE_SCHEMA = {
+    "type": "object",
+    "required": ["title", "outlines"],
+    "properties": {
+        "title": {"type": "string", "minLength": 1},
+        "outlines": {
+            "type": "array",
+            "minItems": 1,
+            "items": {"type": "string", "minLength": 1},
+        },
+    },
+}
+
+SLIDE_SCHEMA = {
+    "type": "object",
+    "required": ["title", "points"],
+    "properties": {
+        "title": {"type": "string", "pattern": r"\S"},
+        "points": {
+            "type": "array",
+            "minItems": 1,
+            "items": {"type": "string", "minLength": 1},
+        },
+        "image_required": {"type": ["boolean", "null"]},
+        "image_gen_prompt": {"type": ["string", "null"]},
+    },
+}
+
+PRESENTATION_SCHEMA = {
+    "type": "object",
+    "required": ["slides"],
+    "properties": {
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "slides": {"type": "array"},
+    },
+}
+
+outline_validator = Draft202012Validator(OUTLINE_SCHEMA)
+slide_validator = Draft202012Validator(SLIDE_SCHEMA)
+presentation_validator = Draft202012Validator(PRESENTATION_SCHEMA)
@@ -0,0 +1,35 @@
+from typing import Any, Literal
+from uuid import UUID
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class ImageJobCreate(BaseModel):
+    prompt: str = Field(min_length=1)
+
+
+class DeckJobCreate(BaseModel):
+    user_prompt: str = Field(min_length=1)
+    parallel: bool = False
+
+
+class JobSubmitted(BaseModel):
+    id: UUID
+    status: JobStatus
+
+
+class JobOut(BaseModel):
+    id: UUID
+    kind: str
+    status: JobStatus
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    attempts: int
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,34 @@
+from typing import Any
+from uuid import UUID
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+class PresentationCreate(BaseModel):
+    title: str = Field(min_length=1, max_length=512)
+    description: str | None = None
+    slides: list[dict[str, Any]] = Field(default_factory=list)
+    options: dict[str, Any] | None = None
+
+
+class PresentationSummary(BaseModel):
+    id: UUID
+    user_id: UUID
+    title: str
+    description: str | None = None
+    slide_count: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PresentationOut(PresentationSummary):
+    options: dict[str, Any] | None = None
+    slides: list[dict[str, Any]]
+
+
+class PresentationPage(BaseModel):
+    items: list[PresentationSummary]
+    next_cursor: str | None = None
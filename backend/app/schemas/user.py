@@ -23,6 +23,29 @@ class UserOut(UserBase):
         from_attributes = True  # Pydantic v2 "ORM mode"
 
 
+class UserSignedIn(UserOut):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
+
+class TokenPair(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
+class UserPage(BaseModel):
+    items: list[UserOut]
+    next_cursor: str | None = None
+
+
 class UserCreate(UserBase):
     password: str = Field(min_length=8, max_length=255)
 
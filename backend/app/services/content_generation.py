@@ -1,6 +1,14 @@
 from google import genai
 from app.settings import settings
-from app.prompts.outline import PROMPT_TEMPLATE, SYSTEM_INSTRUCTION, SYSTEM_INSTRUCTION_DETAIL
+from app.prompts.outline import (
+    PROMPT_TEMPLATE,
+    SYSTEM_INSTRUCTION,
+    SYSTEM_INSTRUCTION_DETAIL,
+    SYSTEM_INSTRUCTION_SLIDE,
+    SLIDE_PROMPT_TEMPLATE,
+    SYSTEM_INSTRUCTION_DESCRIPTION,
+    DESCRIPTION_PROMPT_TEMPLATE,
+)
 import json
 import logging
 import base64
@@ -10,99 +18,726 @@ import os
 from app.schemas.content_generation import (
     GeneratePresentationRequest,
     GenerateOutlineResponse,
+    PresentationResponse,
+    Slide,
+    ExportFormat,
+    AspectRatio,
+    outline_validator,
+    presentation_validator,
+    slide_validator,
 )
-from typing import Dict, Any
+from app.lib.json_repair import RepairResult, loads_lenient
+from app.lib.json_stream import SlideStreamParser
+from app.services.generation_cache import generation_cache, make_cache_key
+from app.lib.single_flight import SingleFlight
+from app.lib.http_client import get_http_client
+from app.services.image_store import image_store, prompt_hash
+from app.services.image_derivatives import derivative_builder
+from app.services.export import presentation_exporter
+from app.services.model_scheduler import model_scheduler, estimate_tokens
+from app.services.prompt_cache import PromptCache, is_cache_miss
+from app.services.model_usage import model_usage, call_outcome
+from app.errors import ServiceBusyError, UpstreamStatusError
+from app.lib.resilience import CircuitBreaker, Upstream, is_transient
+import hashlib
+import time
+from jsonschema.protocols import Validator
+from jsonschema.exceptions import best_match
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Optional
+import asyncio
 
 client = genai.Client(api_key=settings.GEMINI_API_KEY)
 
 logger = logging.getLogger("app")
 
+# Identical concurrent generations share a single upstream call.
+inflight = SingleFlight()
+
+
+def build_upstream(name: str) -> Upstream:
+    return Upstream(
+        name,
+        max_attempts=settings.UPSTREAM_MAX_ATTEMPTS,
+        backoff_base=settings.UPSTREAM_BACKOFF_BASE_SECONDS,
+        backoff_max=settings.UPSTREAM_BACKOFF_MAX_SECONDS,
+        hedge_percentile=settings.UPSTREAM_HEDGE_PERCENTILE,
+        hedge_min_samples=settings.UPSTREAM_HEDGE_MIN_SAMPLES,
+        hedge_max_ratio=settings.UPSTREAM_HEDGE_MAX_RATIO,
+        breaker=CircuitBreaker(
+            name,
+            window=settings.CIRCUIT_WINDOW,
+            min_calls=settings.CIRCUIT_MIN_CALLS,
+            failure_ratio=settings.CIRCUIT_FAILURE_RATIO,
+            open_seconds=settings.CIRCUIT_OPEN_SECONDS,
+        ),
+    )
+
+
+# retries, hedging and circuit breaking per upstream provider
+gemini_upstream = build_upstream("gemini")
+image_worker_upstream = build_upstream("image-worker")
+
+# static system instructions served from Gemini context caching
+prompt_cache = PromptCache(
+    client,
+    enabled=settings.PROMPT_CACHE_ENABLED,
+    min_tokens=settings.PROMPT_CACHE_MIN_TOKENS,
+    default_min_tokens=settings.PROMPT_CACHE_DEFAULT_MIN_TOKENS,
+    ttl_seconds=settings.PROMPT_CACHE_TTL_SECONDS,
+    refresh_margin_seconds=settings.PROMPT_CACHE_REFRESH_MARGIN_SECONDS,
+    retry_seconds=settings.PROMPT_CACHE_RETRY_SECONDS,
+)
+
+# how often model output needed local repair or partial re-generation
+output_stats = {
+    "parsed": 0,
+    "repaired": 0,
+    "unrepairable": 0,
+    "invalid": 0,
+    "slides_rerequested": 0,
+    "decks_completed": 0,
+}
+
+# keeps fire-and-forget tasks (derivative prewarm) referenced until they finish
+background_tasks: set[asyncio.Task] = set()
+
+OUTLINE_MODEL = "gemini-2.5-flash"
+
+
+def output_budget(items: int, tokens_per_item: int) -> int:
+    """
+    max_output_tokens sized to the expected response: the thinking budget
+    (2.5 models count thinking against the cap), a fixed part for titles and
+    JSON framing, and a share per outline point or slide. A runaway generation
+    is cut off here and its partial output repaired rather than paid for.
+    """
+    return min(
+        settings.OUTPUT_TOKENS_MAX,
+        settings.GEMINI_THINKING_BUDGET + settings.OUTPUT_TOKENS_BASE + items * tokens_per_item,
+    )
+
+
+THINKING_CONFIG = {"thinking_budget": settings.GEMINI_THINKING_BUDGET}
+
+OUTLINE_CONFIG = {
+    "system_instruction": SYSTEM_INSTRUCTION,
+    "temperature": 0.0,
+    "max_output_tokens": output_budget(settings.OUTLINE_MAX_POINTS, settings.OUTPUT_TOKENS_PER_OUTLINE_POINT),
+    "thinking_config": THINKING_CONFIG,
+    "response_mime_type": "application/json",
+}
+
+# max_output_tokens is set per deck by `detail_config`
+DETAIL_CONFIG = {
+    "system_instruction": SYSTEM_INSTRUCTION_DETAIL,
+    "temperature": 0.0,
+    "thinking_config": THINKING_CONFIG,
+    "response_mime_type": "application/json",
+}
+
+SLIDE_CONFIG = {
+    "system_instruction": SYSTEM_INSTRUCTION_SLIDE,
+    "temperature": 0.0,
+    "max_output_tokens": output_budget(1, settings.OUTPUT_TOKENS_PER_SLIDE),
+    "thinking_config": THINKING_CONFIG,
+    "response_mime_type": "application/json",
+}
+
+DESCRIPTION_CONFIG = {
+    "system_instruction": SYSTEM_INSTRUCTION_DESCRIPTION,
+    "temperature": 0.0,
+    "max_output_tokens": output_budget(0, 0),
+    "thinking_config": THINKING_CONFIG,
+    "response_mime_type": "application/json",
+}
+
+
+def detail_config(outline: GenerateOutlineResponse) -> Dict[str, Any]:
+    return {
+        **DETAIL_CONFIG,
+        "max_output_tokens": output_budget(len(outline["outlines"]), settings.OUTPUT_TOKENS_PER_SLIDE),
+    }
+
+
+def build_outline_prompt(user_prompt: str) -> str:
+    return PROMPT_TEMPLATE.format(user_prompt=user_prompt.strip())
+
+
+def build_detail_prompt(outline: GenerateOutlineResponse) -> str:
+    outline_title = outline["title"]
+    outline_points = outline["outlines"]
+    return (
+        f"Original Presentation Topic: '{outline_title}'.\n\n"
+        f"Use the following high-level outline points to generate a detailed presentation structure. "
+        f"For each outline point, create a concise, professional slide title and generate 3-5 relevant bullet points ('points').\n"
+        f"Outline Points: {json.dumps(outline_points)}"
+    )
+
+
+def build_slide_prompt(outline: GenerateOutlineResponse, index: int) -> str:
+    return SLIDE_PROMPT_TEMPLATE.format(
+        outline_title=outline["title"],
+        outline_points=json.dumps(outline["outlines"]),
+        slide_id=f"slide_{index + 1}",
+        outline_point=outline["outlines"][index],
+    )
+
+
+def build_description_prompt(outline: GenerateOutlineResponse) -> str:
+    return DESCRIPTION_PROMPT_TEMPLATE.format(
+        outline_title=outline["title"],
+        outline_points=json.dumps(outline["outlines"]),
+    )
+
+
+def check_schema(data: Any, validator: Validator, what: str) -> Any:
+    error = best_match(validator.iter_errors(data))
+    if error is not None:
+        output_stats["invalid"] += 1
+        raise ValueError(f"{what}: {error.message}")
+    return data
+
+
+def validate_slide(slide: Any, slide_id: str) -> Slide:
+    check_schema(slide, slide_validator, slide_id)
+    slide["id"] = slide_id
+    slide["image_required"] = bool(slide.get("image_required", False))
+    slide["image_gen_prompt"] = slide.get("image_gen_prompt") or ""
+    slide["image_url"] = ""
+    return slide
+
+
+def user_contents(text: str) -> list[dict]:
+    return [{"role": "user", "parts": [{"text": text}]}]
+
+
+def usage_tokens(response) -> int | None:
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) if usage is not None else None
+
+
+async def agenerate_content(model: str, config: Dict[str, Any], prompt: str, op: str = "json"):
+    """
+    One async generate_content call. The system instruction is referenced
+    through the context cache when possible; if the cached handle is gone the
+    call is repeated once with the instruction inline. Tokens, latency and
+    outcome are recorded in `model_usage` under `op`.
+    """
+    start = time.monotonic()
+    try:
+        call_config = await prompt_cache.aconfig(model, config)
+        try:
+            response = await client.aio.models.generate_content(
+                model=model, contents=user_contents(prompt), config=call_config
+            )
+        except Exception as e:
+            if call_config is config or not is_cache_miss(e):
+                raise
+            prompt_cache.invalidate(model, config)
+            call_config = config
+            response = await client.aio.models.generate_content(
+                model=model, contents=user_contents(prompt), config=config
+            )
+    except BaseException as e:
+        model_usage.record_call(
+            model=model, op=op, outcome=call_outcome(error=e), latency_seconds=time.monotonic() - start
+        )
+        raise
+    model_usage.record_call(
+        model=model,
+        op=op,
+        outcome=call_outcome(response),
+        latency_seconds=time.monotonic() - start,
+        usage=response.usage_metadata,
+    )
+    prompt_cache.record_usage(model, call_config, response)
+    return response
+
+
+async def aopen_content_stream(
+    model: str, config: Dict[str, Any], prompt: str, op: str = "stream"
+) -> AsyncIterator[Any]:
+    """
+    Streaming counterpart of `agenerate_content`; resolves once the stream is
+    open. The call is recorded, with its time to first token, when the stream
+    ends or is abandoned.
+    """
+    start = time.monotonic()
+    try:
+        call_config = await prompt_cache.aconfig(model, config)
+        try:
+            stream = await client.aio.models.generate_content_stream(
+                model=model, contents=user_contents(prompt), config=call_config
+            )
+        except Exception as e:
+            if call_config is config or not is_cache_miss(e):
+                raise
+            prompt_cache.invalidate(model, config)
+            call_config = config
+            stream = await client.aio.models.generate_content_stream(
+                model=model, contents=user_contents(prompt), config=config
+            )
+    except BaseException as e:
+        model_usage.record_call(
+            model=model, op=op, outcome=call_outcome(error=e), latency_seconds=time.monotonic() - start
+        )
+        raise
+
+    async def chunks():
+        first_chunk_at = None
+        last = usage_chunk = None
+        error = None
+        try:
+            async for chunk in stream:
+                if first_chunk_at is None:
+                    first_chunk_at = time.monotonic()
+                last = chunk
+                if getattr(chunk, "usage_metadata", None) is not None:
+                    usage_chunk = chunk
+                yield chunk
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            model_usage.record_call(
+                model=model,
+                op=op,
+                outcome=call_outcome(last, error),
+                latency_seconds=time.monotonic() - start,
+                ttft_seconds=first_chunk_at - start if first_chunk_at is not None else None,
+                usage=usage_chunk.usage_metadata if usage_chunk is not None else None,
+            )
+            if usage_chunk is not None:
+                prompt_cache.record_usage(model, call_config, usage_chunk)
+
+    return chunks()
+
+
+def parse_model_output(text: str) -> RepairResult:
+    """
+    Parse model output, repairing fences, comments, trailing commas and
+    truncation locally instead of paying for another generation.
+    """
+    output_stats["parsed"] += 1
+    try:
+        result = loads_lenient(text)
+    except ValueError as json_err:
+        output_stats["unrepairable"] += 1
+        logger.error(f"JSON decoding error: {json_err}")
+        raise ValueError(f"Failed to parse JSON: {json_err}\nResponse Text: {text}")
+    if result.repairs:
+        output_stats["repaired"] += 1
+        logger.warning(f"Repaired model JSON locally: {', '.join(result.repairs)}")
+    return result
+
+
+def parse_json_response(text: str) -> Dict[str, Any]:
+    return parse_model_output(text).value
+
+
+def parse_outline(text: str) -> GenerateOutlineResponse:
+    result = parse_model_output(text)
+    outline = check_schema(result.value, outline_validator, "outline")
+    if result.partial_tail and len(outline["outlines"]) > 1:
+        # the last point was still being written when the output was cut off
+        outline["outlines"].pop()
+    return outline
+
+
+def parse_presentation(text: str) -> PresentationResponse:
+    """
+    Parse a full deck. Only the top-level shape is enforced here; slides are
+    checked one by one in `split_slides` so bad ones can be re-requested.
+    """
+    result = parse_model_output(text)
+    presentation = check_schema(result.value, presentation_validator, "presentation")
+    if result.partial_tail and presentation["slides"]:
+        # slides come last, so a cut-off output ends in a partial slide
+        presentation["slides"].pop()
+    return presentation
+
+
+def split_slides(outline: GenerateOutlineResponse, slides: list) -> tuple[list, list[int]]:
+    """
+    Line generated slides up with the outline points. Returns the validated
+    slides (None where one is missing or invalid) and the indices to re-request.
+    """
+    validated = []
+    for index in range(len(outline["outlines"])):
+        slide_id = f"slide_{index + 1}"
+        try:
+            validated.append(validate_slide(slides[index] if index < len(slides) else None, slide_id))
+        except ValueError as e:
+            logger.warning(f"Discarding {e}")
+            validated.append(None)
+    missing = [index for index, slide in enumerate(validated) if slide is None]
+    return validated, missing
+
+
+def needs_description(presentation: Dict[str, Any]) -> bool:
+    description = presentation.get("description")
+    return not isinstance(description, str) or not description.strip()
+
+
+async def gather_fanout(*coros):
+    """`asyncio.gather` with at most DETAIL_FANOUT_CONCURRENCY calls in flight."""
+    fanout = asyncio.Semaphore(settings.DETAIL_FANOUT_CONCURRENCY)
+
+    async def bounded(coro):
+        async with fanout:
+            return await coro
+
+    return await asyncio.gather(*(bounded(coro) for coro in coros))
+
+
+def generate_json(
+    model: str,
+    config: Dict[str, Any],
+    prompt: str,
+    use_cache: bool = True,
+    parse: Callable[[str], Dict[str, Any]] = parse_json_response,
+    finalize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Blocking JSON generation, served from the generation cache when possible.
+    `finalize` completes the parsed output before it is cached.
+    """
+    key = make_cache_key(model, config, prompt)
+    if use_cache:
+        cached = generation_cache.get(key)
+        if cached is not None:
+            return cached
+    else:
+        generation_cache.record_bypass()
+
+    start = time.monotonic()
+    try:
+        response = client.models.generate_content(
+            model=model, contents=user_contents(prompt), config=config
+        )
+    except Exception as e:
+        model_usage.record_call(
+            model=model, op="json", outcome=call_outcome(error=e), latency_seconds=time.monotonic() - start
+        )
+        raise
+    model_usage.record_call(
+        model=model,
+        op="json",
+        outcome=call_outcome(response),
+        latency_seconds=time.monotonic() - start,
+        usage=response.usage_metadata,
+    )
+    data = parse(response.text)
+    if finalize is not None:
+        data = finalize(data)
+    generation_cache.set(key, model, data)
+    return data
+
+
+async def agenerate_json(
+    model: str,
+    config: Dict[str, Any],
+    prompt: str,
+    use_cache: bool = True,
+    op: str = "json",
+    hedge: bool = True,
+    parse: Callable[[str], Dict[str, Any]] = parse_json_response,
+    finalize: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None,
+) -> Dict[str, Any]:
+    """
+    Async JSON generation, served from the generation cache when possible.
+    `op` names the call for latency tracking; `hedge=False` for calls too
+    expensive to duplicate. `finalize` completes the parsed output (e.g.
+    re-requests bad slides) before it is cached and shared.
+    """
+    key = make_cache_key(model, config, prompt)
+    if use_cache:
+        cached = await generation_cache.aget(key)
+        if cached is not None:
+            return cached
+    else:
+        generation_cache.record_bypass()
+
+    async def attempt():
+        async with model_scheduler.slot(model, estimate_tokens(prompt, config)) as ticket:
+            response = await agenerate_content(model, config, prompt, op=op)
+            ticket.record_usage(usage_tokens(response))
+        return response
+
+    async def call_upstream():
+        response = await gemini_upstream.call(op, attempt, hedge=hedge)
+        data = parse(response.text)
+        if finalize is not None:
+            data = await finalize(data)
+        await generation_cache.aset(key, model, data)
+        return data
+
+    return await inflight.do(f"gemini:{key}", call_upstream)
+
 
 class OutlineClass:
     @staticmethod
-    def generate_outline(user_prompt: str) -> GenerateOutlineResponse:
+    def generate_outline(user_prompt: str, use_cache: bool = True) -> GenerateOutlineResponse:
+        try:
+            outline_data = generate_json(
+                OUTLINE_MODEL, OUTLINE_CONFIG, build_outline_prompt(user_prompt), use_cache,
+                parse=parse_outline,
+            )
+            logger.info("Outline generation successful")
+            return outline_data
+        except Exception as e:
+            logger.error(f"Error during API call: {e}")
+            raise e
 
-        final_prompt = PROMPT_TEMPLATE.format(user_prompt=user_prompt.strip())
+    @staticmethod
+    def generate_outline_with_details(outline: GenerateOutlineResponse, use_cache: bool = True):
+        try:
+            return generate_json(
+                OUTLINE_MODEL, detail_config(outline), build_detail_prompt(outline), use_cache,
+                parse=parse_presentation,
+                finalize=lambda presentation: OutlineClass.complete_presentation(outline, presentation),
+            )
+        except Exception as e:
+            logger.error(f"Error during API call: {e}")
+            raise e
 
+    @staticmethod
+    async def agenerate_outline(user_prompt: str, use_cache: bool = True) -> GenerateOutlineResponse:
+        """
+        Async counterpart of `generate_outline`. Uses the SDK's native async
+        client so the call waits on the event loop instead of a threadpool slot.
+        """
         try:
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",  # or gemini-2.5-flash
-                contents=[
-                    {
-                        "role": "user",
-                        "parts": [{"text": final_prompt}],
-                    },
-                ],
-                config={
-                    "system_instruction": SYSTEM_INSTRUCTION,
-                    "temperature": 0.0,
-                    "max_output_tokens": 10000,
-                    "response_mime_type": "application/json",
-                },
+            outline_data = await agenerate_json(
+                OUTLINE_MODEL, OUTLINE_CONFIG, build_outline_prompt(user_prompt), use_cache,
+                op="outline", parse=parse_outline,
             )
-            
-        # Access the text content and parse it as JSON
-            try:
-                outline_data = json.loads(response.text)
-                logger.info("Outline generation successful")
-                return outline_data
-            except json.JSONDecodeError as json_err:
-                logger.error(f"JSON decoding error: {json_err}")
-                raise ValueError(f"Failed to parse JSON: {json_err}\nResponse Text: {response.text}")
+            logger.info("Outline generation successful")
+            return outline_data
+        except Exception as e:
+            logger.error(f"Error during API call: {e}")
+            raise e
 
+    @staticmethod
+    async def agenerate_outline_with_details(outline: GenerateOutlineResponse, use_cache: bool = True):
+        """
+        Async counterpart of `generate_outline_with_details`.
+        """
+        try:
+            # a full deck is too costly to send twice, so no hedging here
+            return await agenerate_json(
+                OUTLINE_MODEL, detail_config(outline), build_detail_prompt(outline), use_cache,
+                op="detail", hedge=False, parse=parse_presentation,
+                finalize=lambda presentation: OutlineClass.acomplete_presentation(outline, presentation),
+            )
         except Exception as e:
             logger.error(f"Error during API call: {e}")
             raise e
 
     @staticmethod
-    def generate_outline_with_details(outline: GenerateOutlineResponse):
+    def complete_presentation(
+        outline: GenerateOutlineResponse, presentation: Dict[str, Any]
+    ) -> PresentationResponse:
+        """
+        Blocking counterpart of `acomplete_presentation`; missing slides are
+        re-requested one after another.
+        """
+        slides, missing = split_slides(outline, presentation["slides"])
+        for index in missing:
+            slide = generate_json(OUTLINE_MODEL, SLIDE_CONFIG, build_slide_prompt(outline, index))
+            slides[index] = validate_slide(slide, f"slide_{index + 1}")
+        description = presentation.get("description")
+        if needs_description(presentation):
+            description = generate_json(
+                OUTLINE_MODEL, DESCRIPTION_CONFIG, build_description_prompt(outline)
+            ).get("description", "")
+        if missing:
+            output_stats["slides_rerequested"] += len(missing)
+            output_stats["decks_completed"] += 1
+        return {
+            "title": presentation.get("title") or outline["title"],
+            "description": description,
+            "slides": slides,
+        }
 
-        outline_title = outline["title"]
-        outline_points = outline["outlines"]
-        print(outline_title)
-        print(outline_points)
-        
-        detail_prompt = (
-            f"Original Presentation Topic: '{outline_title}'.\n\n"
-            f"Use the following high-level outline points to generate a detailed presentation structure. "
-            f"For each outline point, create a concise, professional slide title and generate 3-5 relevant bullet points ('points').\n"
-            f"Outline Points: {json.dumps(outline_points)}"
-        )
+    @staticmethod
+    async def acomplete_presentation(
+        outline: GenerateOutlineResponse, presentation: Dict[str, Any]
+    ) -> PresentationResponse:
+        """
+        Keep every valid slide of a generated deck and re-request only the
+        missing or invalid ones (and the description, if absent), instead of
+        regenerating the whole deck.
+        """
+        slides, missing = split_slides(outline, presentation["slides"])
+        description = presentation.get("description")
+        if missing or needs_description(presentation):
+            logger.warning(f"Re-requesting {len(missing)} of {len(slides)} slides")
+            regenerated = await gather_fanout(
+                *(OutlineClass.agenerate_slide(outline, index) for index in missing),
+                *([OutlineClass.agenerate_description(outline)] if needs_description(presentation) else []),
+            )
+            for index, slide in zip(missing, regenerated):
+                slides[index] = slide
+            if needs_description(presentation):
+                description = regenerated[-1]
+        if missing:
+            output_stats["slides_rerequested"] += len(missing)
+            output_stats["decks_completed"] += 1
+        return {
+            "title": presentation.get("title") or outline["title"],
+            "description": description,
+            "slides": slides,
+        }
 
+    @staticmethod
+    async def astream_outline_with_details(
+        outline: GenerateOutlineResponse,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of `agenerate_outline_with_details`. Yields
+        `{"event": "slide", "data": slide}` as soon as each slide object is
+        complete in the model output, then a final `{"event": "done"}` carrying
+        the deck title and description. Slides that are missing or invalid
+        (e.g. the output was truncated) are re-requested individually and
+        streamed, out of order, before `done`.
+        """
+        parser = SlideStreamParser()
+        prompt = build_detail_prompt(outline)
+        config = detail_config(outline)
         try:
-            response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=[
-                    {
-                        "role": "user",
-                        "parts": [{"text": detail_prompt}],
-                    }
-                ],
-                config={
-                    "system_instruction": SYSTEM_INSTRUCTION_DETAIL,
-                    "temperature": 0.0,
-                    # "max_output_tokens": 10000,
-                    "response_mime_type": "application/json",
-                }
-            )
+            async with model_scheduler.slot(OUTLINE_MODEL, estimate_tokens(prompt, config)) as ticket:
+                # retried until the stream opens; a broken stream mid-way is not
+                stream = await gemini_upstream.call(
+                    "detail_stream",
+                    lambda: aopen_content_stream(OUTLINE_MODEL, config, prompt, op="detail_stream"),
+                    hedge=False,
+                )
+                position = 0
+                streamed = set()
+                total_tokens = None
+                async for chunk in stream:
+                    total_tokens = usage_tokens(chunk) or total_tokens
+                    for slide in parser.feed(chunk.text or ""):
+                        position += 1
+                        if position > len(outline["outlines"]):
+                            continue
+                        try:
+                            slide = validate_slide(slide, f"slide_{position}")
+                        except ValueError as e:
+                            logger.warning(f"Discarding streamed {e}")
+                            continue
+                        streamed.add(position - 1)
+                        yield {"event": "slide", "data": slide}
+                ticket.record_usage(total_tokens)
 
-            # Access the text content and parse it as JSON
             try:
-                outline_data = json.loads(response.text)
-                print(outline_data)
-                return outline_data
-            except json.JSONDecodeError as json_err:
-                logger.error(f"JSON decoding error: {json_err}")
-                raise ValueError(
-                    f"Failed to parse JSON: {json_err}\nResponse Text: {response.text}"
-                )
+                presentation = parse_json_response(parser.buffer)
+            except ValueError:
+                # the slides already streamed are still good
+                presentation = None
+            if not isinstance(presentation, dict):
+                presentation = {}
+            missing = [index for index in range(len(outline["outlines"])) if index not in streamed]
+            if missing:
+                logger.warning(f"Re-requesting {len(missing)} streamed slides")
+                output_stats["slides_rerequested"] += len(missing)
+                output_stats["decks_completed"] += 1
+                for next_slide in asyncio.as_completed(
+                    [OutlineClass.agenerate_slide(outline, index) for index in missing]
+                ):
+                    yield {"event": "slide", "data": await next_slide}
+            description = presentation.get("description")
+            if needs_description(presentation):
+                description = await OutlineClass.agenerate_description(outline)
+            slide_count = len(outline["outlines"])
+            logger.info(f"Streamed {slide_count} slides")
+            yield {
+                "event": "done",
+                "data": {
+                    "title": presentation.get("title") or outline["title"],
+                    "description": description,
+                    "slide_count": slide_count,
+                },
+            }
+        except Exception as e:
+            logger.error(f"Error during streamed slide generation: {e}")
+            raise e
+
+    @staticmethod
+    async def agenerate_slide(outline: GenerateOutlineResponse, index: int) -> Slide:
+        """
+        Expand a single outline point into one slide. A malformed or failed
+        slide is retried on its own, up to DETAIL_SLIDE_MAX_ATTEMPTS times.
+        """
+        slide_id = f"slide_{index + 1}"
+        prompt = build_slide_prompt(outline, index)
+
+        async def call():
+            async with model_scheduler.slot(OUTLINE_MODEL, estimate_tokens(prompt, SLIDE_CONFIG)) as ticket:
+                response = await agenerate_content(OUTLINE_MODEL, SLIDE_CONFIG, prompt, op="slide")
+                ticket.record_usage(usage_tokens(response))
+            return response
+
+        last_error = None
+        for attempt in range(1, settings.DETAIL_SLIDE_MAX_ATTEMPTS + 1):
+            try:
+                response = await gemini_upstream.call("slide", call)
+                return validate_slide(parse_json_response(response.text), slide_id)
+            except ServiceBusyError:
+                # retrying immediately would only be rejected again
+                raise
+            except Exception as e:
+                if is_transient(e):
+                    # gemini_upstream already spent its retry budget on this
+                    raise
+                last_error = e
+                logger.warning(f"Generating {slide_id} failed (attempt {attempt}): {e}")
+        raise ValueError(f"Failed to generate {slide_id}: {last_error}")
 
+    @staticmethod
+    async def agenerate_description(outline: GenerateOutlineResponse) -> str:
+        prompt = build_description_prompt(outline)
+
+        async def call():
+            async with model_scheduler.slot(OUTLINE_MODEL, estimate_tokens(prompt, DESCRIPTION_CONFIG)) as ticket:
+                response = await agenerate_content(OUTLINE_MODEL, DESCRIPTION_CONFIG, prompt, op="description")
+                ticket.record_usage(usage_tokens(response))
+            return response
+
+        response = await gemini_upstream.call("description", call)
+        return parse_json_response(response.text).get("description", "")
+
+    @staticmethod
+    async def agenerate_outline_with_details_parallel(
+        outline: GenerateOutlineResponse,
+    ) -> PresentationResponse:
+        """
+        Fan-out variant of `agenerate_outline_with_details`: every outline point
+        is expanded by its own request (at most DETAIL_FANOUT_CONCURRENCY at a
+        time), so deck latency tracks the slowest slide instead of the sum.
+        """
+        try:
+            description, *slides = await gather_fanout(
+                OutlineClass.agenerate_description(outline),
+                *(
+                    OutlineClass.agenerate_slide(outline, index)
+                    for index in range(len(outline["outlines"]))
+                ),
+            )
+            logger.info(f"Generated {len(slides)} slides in parallel")
+            return {
+                "title": outline["title"],
+                "description": description,
+                "slides": slides,
+            }
         except Exception as e:
-            logger.error(f"Error during API call: {e}")
+            logger.error(f"Error during parallel slide generation: {e}")
             raise e
 
     @staticmethod
     def generate_image(prompt: str):
+        start = time.monotonic()
         try:
             response = client.models.generate_content(
                 model="gemini-2.5-flash-image",
@@ -113,6 +748,13 @@ class OutlineClass:
                     "temperature": 0.7,  # Creativity level
                 },
             )
+            model_usage.record_call(
+                model="gemini-2.5-flash-image",
+                op="image",
+                outcome=call_outcome(response),
+                latency_seconds=time.monotonic() - start,
+                usage=response.usage_metadata,
+            )
             logger.info("Image generation successful")
             image_part = response.candidates[0].content.parts[0].inline_data
             return image_part
@@ -122,45 +764,120 @@ class OutlineClass:
 
     @staticmethod
     async def generate_image_with_cloudfare_worker(prompt: str):
+        """
+        Concurrent requests for the same prompt share one worker call.
+        """
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return await inflight.do(
+            f"cloudflare:{key}",
+            lambda: image_worker_upstream.call(
+                "image", lambda: OutlineClass._call_cloudflare_worker(prompt)
+            ),
+        )
+
+    @staticmethod
+    async def _call_cloudflare_worker(prompt: str, timeout: float | None = None):
         try:
-            endpoint = "https://text-to-image-template.manev7780.workers.dev"
+            endpoint = settings.IMAGE_WORKER_URL
             api_key = settings.CLOUDFLARE_API_TOKEN
             headers = {"Content-Type": "application/json", "x-api-key": api_key}
             json = {"prompt": prompt}
 
             logger.info("Cloudflare Worker image generation started")
 
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                try:
-                    response = await client.post(endpoint, headers=headers, json=json)
-                    response.raise_for_status()
-
-                    # The Worker returns the raw binary image data (PNG)
-                    if response.content:
-                        logger.info("Cloudflare Worker image generation successful")
-                        return response.content
-                    else:
-                        logger.error("Cloudflare Worker returned an empty response.")
-                        raise ValueError(
-                            "Cloudflare Worker returned an empty response."
-                        )
-
-                except httpx.HTTPStatusError as e:
-                    # Log and raise a specific error for API issues
-                    error_detail = response.text or "Unknown API Error"
-                    logger.error(
-                        f"Worker API Error ({e.response.status_code}): {error_detail}"
+            http_client = get_http_client()
+            try:
+                response = await http_client.post(
+                    endpoint,
+                    headers=headers,
+                    json=json,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+                response.raise_for_status()
+
+                # The Worker returns the raw binary image data (PNG)
+                if response.content:
+                    logger.info("Cloudflare Worker image generation successful")
+                    return response.content
+                else:
+                    logger.error("Cloudflare Worker returned an empty response.")
+                    raise ValueError(
+                        "Cloudflare Worker returned an empty response."
                     )
-                    raise ValueError(f"Image generation failed: {error_detail}")
 
-                except Exception as e:
-                    logger.error(f"Error during Cloudflare Worker call: {e}")
-                    raise e
+            except httpx.HTTPStatusError as e:
+                # Log and raise a specific error for API issues
+                error_detail = response.text or "Unknown API Error"
+                logger.error(
+                    f"Worker API Error ({e.response.status_code}): {error_detail}"
+                )
+                raise UpstreamStatusError(
+                    f"Image generation failed: {error_detail}", e.response.status_code
+                )
+
+            except Exception as e:
+                logger.error(f"Error during Cloudflare Worker call: {e}")
+                raise e
 
         except Exception as e:
             logger.error(f"Error saving image: {e}")
             raise e
 
+    @staticmethod
+    async def _stream_cloudflare_worker_to_store(prompt: str, timeout: float | None = None) -> str:
+        endpoint = settings.IMAGE_WORKER_URL
+        headers = {"Content-Type": "application/json", "x-api-key": settings.CLOUDFLARE_API_TOKEN}
+
+        logger.info("Cloudflare Worker image generation started")
+        http_client = get_http_client()
+        async with http_client.stream(
+            "POST",
+            endpoint,
+            headers=headers,
+            json={"prompt": prompt},
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                error_detail = response.text or "Unknown API Error"
+                logger.error(f"Worker API Error ({response.status_code}): {error_detail}")
+                raise UpstreamStatusError(f"Image generation failed: {error_detail}", response.status_code)
+            image_name = await image_store.save_stream(
+                response.aiter_bytes(), response.headers.get("content-type")
+            )
+        logger.info("Cloudflare Worker image generation successful")
+        return image_name
+
+    @staticmethod
+    async def generate_image_to_store(prompt: str, timeout: float | None = None) -> str:
+        """
+        Generate an image into the content-addressed store and return its name.
+        A prompt that was generated before is served from the store without
+        calling the worker; concurrent identical prompts share one call.
+        """
+        try:
+            image_name = await asyncio.to_thread(image_store.lookup_prompt, prompt)
+            if image_name:
+                logger.info(f"Image for prompt served from store: {image_name}")
+                return image_name
+
+            async def generate():
+                name = await image_worker_upstream.call(
+                    "image_stream",
+                    lambda: OutlineClass._stream_cloudflare_worker_to_store(prompt, timeout),
+                )
+                await asyncio.to_thread(image_store.record_prompt, prompt, name)
+                if settings.IMAGE_DERIVATIVE_PREWARM:
+                    task = asyncio.create_task(derivative_builder.prewarm(name))
+                    background_tasks.add(task)
+                    task.add_done_callback(background_tasks.discard)
+                return name
+
+            return await inflight.do(f"image:{prompt_hash(prompt)}", generate)
+        except Exception as e:
+            logger.error(f"Error saving image: {e}")
+            raise e
+
     @staticmethod
     async def generate_image_and_save(prompt: str, file_path: str):
         try:
@@ -169,8 +886,7 @@ class OutlineClass:
             )
 
             if image_bytes:
-                with open(file_path, "wb") as img_file:
-                    img_file.write(image_bytes)
+                await asyncio.to_thread(OutlineClass._write_file, file_path, image_bytes)
                 logger.info(f"Image saved successfully at {file_path}")
                 return file_path
             else:
@@ -181,22 +897,75 @@ class OutlineClass:
             raise e
 
     @staticmethod
-    def get_generated_image(image_name: str):
+    async def generate_slide_image(slide: Slide) -> Slide:
+        """
+        Generate and save the image for one slide within IMAGE_DEADLINE_SECONDS.
+        Retries, hedging and circuit breaking belong to `image_worker_upstream`;
+        a slide whose image still fails keeps an empty image_url instead of
+        failing the whole deck.
+        """
         try:
-            if "/" in image_name or ".." in image_name:
-                raise ValueError("Invalid image name")
+            image_name = await asyncio.wait_for(
+                OutlineClass.generate_image_to_store(
+                    slide["image_gen_prompt"], timeout=settings.IMAGE_REQUEST_TIMEOUT_SECONDS
+                ),
+                timeout=settings.IMAGE_DEADLINE_SECONDS,
+            )
+            slide["image_url"] = f"/generate/get-generated-image?image_name={image_name}"
+        except Exception as e:
+            logger.warning(f"Image for {slide.get('id')} failed: {e!r}")
+            slide["image_url"] = ""
+        return slide
+
+    @staticmethod
+    async def generate_deck_images(presentation: PresentationResponse) -> PresentationResponse:
+        """
+        Generate images for every slide with `image_required: true`, at most
+        IMAGE_BATCH_CONCURRENCY at a time, so deck image time tracks the
+        slowest image rather than the sum.
+        """
+        batch = asyncio.Semaphore(settings.IMAGE_BATCH_CONCURRENCY)
 
-            file_path = f"generated_images/{image_name}"
+        async def bounded(slide):
+            async with batch:
+                return await OutlineClass.generate_slide_image(slide)
 
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"{file_path} does not exist")
+        slides = [
+            slide
+            for slide in presentation.get("slides", [])
+            if slide.get("image_required") and slide.get("image_gen_prompt")
+        ]
+        await asyncio.gather(*(bounded(slide) for slide in slides))
+        generated = sum(1 for slide in slides if slide["image_url"])
+        logger.info(f"Generated {generated}/{len(slides)} deck images")
+        return presentation
 
-            return FileResponse(file_path)
+    @staticmethod
+    def _write_file(file_path: str, data: bytes) -> None:
+        with open(file_path, "wb") as f:
+            f.write(data)
 
+    @staticmethod
+    async def generate_presentation(
+        presentation: PresentationResponse,
+        export_format: ExportFormat = "pptx",
+        aspect_ratio: AspectRatio = "16:9",
+    ) -> AsyncIterator[bytes]:
+        """
+        Export a generated deck, returning an async byte stream of the file.
+        The first chunk is produced before returning, so failures surface
+        here rather than halfway through an HTTP response.
+        """
+        try:
+            stream = presentation_exporter.stream_export(presentation, export_format, aspect_ratio)
+            first_chunk = await anext(stream)
         except Exception as e:
-            logger.error(f"Error getting generated image: {e}")
+            logger.error(f"Error exporting presentation: {e}")
             raise e
 
-    @staticmethod
-    def generate_presentation(request: GeneratePresentationRequest):
-        pass
+        async def chained():
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+
+        return chained()
@@ -0,0 +1,405 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, ImageDraw, ImageFont
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+from app.lib.pdf_stream import StreamingPdfWriter
+from app.lib.zip_stream import StreamingZipWriter
+from app.schemas.content_generation import AspectRatio, ExportFormat, PresentationResponse
+from app.services.image_store import image_store
+from app.settings import settings
+
+logger = logging.getLogger("app")
+
+# slide size in inches for each supported aspect ratio
+SLIDE_SIZES = {
+    "16:9": (13.333, 7.5),
+    "4:3": (10.0, 7.5),
+    "9:16": (7.5, 13.333),
+}
+
+TITLE_LAYOUT = 0
+TITLE_AND_CONTENT_LAYOUT = 1
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# raster width in pixels for PDF pages and images_zip entries
+RASTER_WIDTH = 1920
+
+EXPORT_EXTENSIONS = {"pptx": "pptx", "pdf": "pdf", "images_zip": "zip"}
+
+
+def export_cache_key(presentation: PresentationResponse, export_format: str, aspect_ratio: str) -> str:
+    """Hash of the deck content plus every option that affects the output."""
+    payload = json.dumps(
+        {
+            "presentation": presentation,
+            "format": export_format,
+            "aspect_ratio": aspect_ratio,
+            "raster_width": RASTER_WIDTH,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def resolve_slide_image(slide: Dict[str, Any]) -> Optional[str]:
+    """
+    Map a slide's `image_url` (as produced by the image endpoints) back to a
+    local file in the image store. Returns None when there is no usable image.
+    """
+    image_url = slide.get("image_url") or ""
+    if not image_url:
+        return None
+    image_name = parse_qs(urlparse(image_url).query).get("image_name", [None])[0]
+    if not image_name:
+        return None
+    try:
+        path = image_store.path_for(image_name)
+    except ValueError:
+        return None
+    return path if path and os.path.exists(path) else None
+
+
+def render_pptx(presentation: PresentationResponse, aspect_ratio: AspectRatio, dst_path: str) -> str:
+    """
+    Render a presentation to a .pptx file. Runs in the export process pool, so
+    it takes plain data and writes straight to disk instead of returning bytes.
+    """
+    width, height = SLIDE_SIZES[aspect_ratio]
+    prs = Presentation()
+    prs.slide_width = Inches(width)
+    prs.slide_height = Inches(height)
+    margin = Inches(0.5)
+
+    title_slide = prs.slides.add_slide(prs.slide_layouts[TITLE_LAYOUT])
+    title_slide.shapes.title.text = presentation.get("title", "")
+    title_slide.placeholders[1].text = presentation.get("description", "")
+
+    for slide_data in presentation.get("slides", []):
+        slide = prs.slides.add_slide(prs.slide_layouts[TITLE_AND_CONTENT_LAYOUT])
+        slide.shapes.title.text = slide_data.get("title", "")
+
+        body = slide.placeholders[1]
+        image_path = resolve_slide_image(slide_data)
+        body.left, body.top = margin, Inches(1.6)
+        body.height = prs.slide_height - body.top - margin
+        body.width = prs.slide_width - 2 * margin
+        if image_path:
+            body.width = (prs.slide_width - 3 * margin) // 2
+
+        text_frame = body.text_frame
+        for index, point in enumerate(slide_data.get("points", [])):
+            paragraph = text_frame.paragraphs[0] if index == 0 else text_frame.add_paragraph()
+            paragraph.text = point
+            paragraph.font.size = Pt(20)
+
+        if image_path:
+            slide.shapes.add_picture(
+                image_path,
+                left=body.left + body.width + margin,
+                top=body.top,
+                width=body.width,
+            )
+
+    prs.save(dst_path)
+    return dst_path
+
+
+def _wrap_text(text: str, font, max_width: int) -> list[str]:
+    lines, current = [], ""
+    for word in text.split():
+        candidate = f"{current} {word}".strip()
+        if current and font.getlength(candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+
+def render_slide_image(
+    slide: Dict[str, Any],
+    aspect_ratio: AspectRatio,
+    image_format: str,
+) -> tuple[bytes, int, int]:
+    """
+    Rasterize one slide (title, bullets and optional image) with Pillow. Runs
+    in the export process pool; returns (encoded bytes, width, height).
+    """
+    ratio_w, ratio_h = SLIDE_SIZES[aspect_ratio]
+    width = RASTER_WIDTH
+    height = int(RASTER_WIDTH * ratio_h / ratio_w)
+    margin = width // 26
+
+    canvas = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(canvas)
+    title_font = ImageFont.load_default(size=width // 28)
+    body_font = ImageFont.load_default(size=width // 54)
+
+    draw.text((margin, margin), slide.get("title", ""), fill=(20, 20, 20), font=title_font)
+
+    image_path = resolve_slide_image(slide)
+    text_width = width - 2 * margin
+    if image_path:
+        text_width = (width - 3 * margin) // 2
+        with Image.open(image_path) as picture:
+            picture = picture.convert("RGB")
+            picture.thumbnail((text_width, height - 4 * margin), Image.Resampling.LANCZOS)
+            canvas.paste(picture, (width - margin - picture.width, 3 * margin))
+
+    indent = body_font.size
+    line_height = int(body_font.size * 1.4)
+    y = 3 * margin
+    for point in slide.get("points", []):
+        dot = body_font.size // 4
+        dot_y = y + body_font.size // 2
+        draw.ellipse((margin, dot_y - dot, margin + 2 * dot, dot_y + dot), fill=(50, 50, 50))
+        for line in _wrap_text(point, body_font, text_width - indent):
+            draw.text((margin + indent, y), line, fill=(50, 50, 50), font=body_font)
+            y += line_height
+        y += body_font.size // 2
+
+    buf = io.BytesIO()
+    if image_format == "jpeg":
+        canvas.save(buf, format="JPEG", quality=85)
+    else:
+        canvas.save(buf, format="PNG")
+    return buf.getvalue(), width, height
+
+
+class PresentationExporter:
+    """
+    Renders decks in a ProcessPoolExecutor so large exports never block the
+    event loop. Finished exports are cached under EXPORT_DIR by a hash of the
+    deck content and export options, so an unchanged deck is served from disk.
+
+    The disk cache is LRU by mtime (a hit touches the file): every new export
+    triggers a sweep that deletes files older than `cache_ttl` and then the
+    least recently used ones until the total is under `cache_max_bytes`.
+    """
+
+    def __init__(self, export_dir: str, max_workers: int, cache_max_bytes: int, cache_ttl: int):
+        self.export_dir = export_dir
+        self.max_workers = max_workers
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_ttl = cache_ttl
+        self._pool: Optional[ProcessPoolExecutor] = None
+        os.makedirs(export_dir, exist_ok=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def cache_path(self, key: str, export_format: str) -> str:
+        return os.path.join(self.export_dir, key[:2], f"{key}.{EXPORT_EXTENSIONS[export_format]}")
+
+    @staticmethod
+    def _cache_hit(path: str) -> bool:
+        """True if `path` is cached; a hit bumps its mtime for LRU eviction."""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def sweep(self) -> None:
+        """Evict expired exports, then the least recently used over the size cap."""
+        now = time.time()
+        entries = []
+        for dirpath, _, filenames in os.walk(self.export_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                # .tmp files are in-progress renders; only reap ones left by a crash
+                if filename.endswith(".tmp"):
+                    if now - stat.st_mtime > self.cache_ttl:
+                        self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.cache_ttl and total <= self.cache_max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cached exports, {total} bytes remain")
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Failed to evict cached export {path}: {e}")
+            return False
+
+    async def _sweep_after_write(self) -> None:
+        try:
+            await asyncio.to_thread(self.sweep)
+        except Exception as e:
+            logger.warning(f"Export cache sweep failed: {e}")
+
+    async def export_pptx(self, presentation: PresentationResponse, aspect_ratio: AspectRatio = "16:9") -> str:
+        """Render (or reuse) the cached .pptx for a deck and return its path."""
+        dst_path = self.cache_path(export_cache_key(presentation, "pptx", aspect_ratio), "pptx")
+        if await asyncio.to_thread(self._cache_hit, dst_path):
+            logger.info("Serving pptx export from cache")
+            return dst_path
+
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst_path), suffix=".tmp")
+        os.close(fd)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._get_pool(), render_pptx, presentation, aspect_ratio, tmp_path
+            )
+            os.replace(tmp_path, dst_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        logger.info(f"Exported {len(presentation.get('slides', []))} slides to pptx")
+        await self._sweep_after_write()
+        return dst_path
+
+    async def _render_slides(
+        self, presentation: PresentationResponse, aspect_ratio: AspectRatio, image_format: str
+    ) -> AsyncIterator[tuple[bytes, int, int]]:
+        """
+        Rasterize slides in parallel across the pool and yield them in deck
+        order. At most twice the pool size is in flight, bounding memory.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        slides = iter(presentation.get("slides", []))
+        pending: deque = deque()
+        window = self.max_workers * 2
+        try:
+            while True:
+                while len(pending) < window:
+                    slide = next(slides, None)
+                    if slide is None:
+                        break
+                    pending.append(
+                        loop.run_in_executor(pool, render_slide_image, slide, aspect_ratio, image_format)
+                    )
+                if not pending:
+                    return
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def _stream_pdf(self, presentation: PresentationResponse, aspect_ratio: AspectRatio) -> AsyncIterator[bytes]:
+        width, height = SLIDE_SIZES[aspect_ratio]
+        writer = StreamingPdfWriter(round(width * 72, 2), round(height * 72, 2))
+        header = writer.header()
+        async for jpeg, pixel_width, pixel_height in self._render_slides(presentation, aspect_ratio, "jpeg"):
+            yield header + writer.add_jpeg_page(jpeg, pixel_width, pixel_height)
+            header = b""
+        yield header + writer.close()
+
+    async def _stream_images_zip(self, presentation: PresentationResponse, aspect_ratio: AspectRatio) -> AsyncIterator[bytes]:
+        writer = StreamingZipWriter()
+        index = 0
+        async for png, _, _ in self._render_slides(presentation, aspect_ratio, "png"):
+            index += 1
+            yield writer.add(f"slide_{index:03d}.png", png)
+        yield writer.close()
+
+    async def stream_export(
+        self,
+        presentation: PresentationResponse,
+        export_format: ExportFormat,
+        aspect_ratio: AspectRatio = "16:9",
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream an export to the caller. Cached exports are read back from disk;
+        otherwise pdf/images_zip bytes are sent as pages are rendered while
+        being teed into the cache, which is only committed once complete.
+        """
+        if export_format == "pptx":
+            path = await self.export_pptx(presentation, aspect_ratio)
+            async for chunk in aiter_file(path):
+                yield chunk
+            return
+
+        if export_format == "pdf":
+            render = self._stream_pdf
+        elif export_format == "images_zip":
+            render = self._stream_images_zip
+        else:
+            raise ValueError(f"Export format '{export_format}' is not supported")
+
+        dst_path = self.cache_path(export_cache_key(presentation, export_format, aspect_ratio), export_format)
+        if await asyncio.to_thread(self._cache_hit, dst_path):
+            logger.info(f"Serving {export_format} export from cache")
+            async for chunk in aiter_file(dst_path):
+                yield chunk
+            return
+
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst_path), suffix=".tmp")
+        tmp_file = os.fdopen(fd, "wb")
+        try:
+            async for chunk in render(presentation, aspect_ratio):
+                await asyncio.to_thread(tmp_file.write, chunk)
+                yield chunk
+            tmp_file.close()
+            os.replace(tmp_path, dst_path)
+            logger.info(f"Exported {len(presentation.get('slides', []))} slides to {export_format}")
+        finally:
+            tmp_file.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        await self._sweep_after_write()
+
+
+async def aiter_file(path: str) -> AsyncIterator[bytes]:
+    """Stream a file in fixed-size chunks, reading off the event loop."""
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(f.read, EXPORT_CHUNK_SIZE):
+            yield chunk
+    finally:
+        f.close()
+
+
+presentation_exporter = PresentationExporter(
+    export_dir=settings.EXPORT_DIR,
+    max_workers=settings.EXPORT_WORKERS,
+    cache_max_bytes=settings.EXPORT_CACHE_MAX_BYTES,
+    cache_ttl=settings.EXPORT_CACHE_TTL_SECONDS,
+)
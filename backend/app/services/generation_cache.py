@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+from app.db import SessionLocal
+from app.repositories.generation_cache import GenerationCacheRepo
+from app.settings import settings
+
+logger = logging.getLogger("app")
+
+
+def make_cache_key(model: str, config: Dict[str, Any], prompt: str) -> str:
+    """
+    Content address for a generation: sha256 over the model name, the full
+    request config (which carries the system instruction) and the rendered prompt.
+    """
+    payload = json.dumps(
+        {"model": model, "config": config, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Two-tier cache for deterministic (temperature 0) generations: an in-process
+    LRU+TTL tier in front of the `generation_cache` Postgres table, which is
+    shared by every uvicorn worker.
+
+    The memory tier holds serialized JSON, so every caller gets its own copy
+    and mutating a returned outline cannot corrupt the cached one. Expired
+    rows are purged on write, at most once per `purge_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: int,
+        persistent_ttl: int,
+        persist: bool,
+        purge_interval: int,
+        purge_batch: int,
+    ):
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.persistent_ttl = persistent_ttl
+        self.persist = persist
+        self.purge_interval = purge_interval
+        self.purge_batch = purge_batch
+        self._next_purge = 0.0
+        self.stats = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "purged": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def record_bypass(self) -> None:
+        self._count("bypassed")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_size"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["memory_hits"] + stats["persistent_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            raw = self._memory.get(key)
+        if raw is None:
+            return None
+        self._count("memory_hits")
+        return json.loads(raw)
+
+    def _set_memory(self, key: str, value: Dict[str, Any]) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._memory[key] = raw
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+
+        if self.persist:
+            value = self._get_persistent(key)
+            if value is not None:
+                self._set_memory(key, value)
+                self._count("persistent_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, model: str, value: Dict[str, Any]) -> None:
+        self._set_memory(key, value)
+        if self.persist:
+            self._set_persistent(key, model, value)
+            self._maybe_purge()
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, model: str, value: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.set, key, model, value)
+
+    def _get_persistent(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with SessionLocal() as db:
+                entry = GenerationCacheRepo.get(db, key, datetime.now(timezone.utc))
+                return entry.response if entry else None
+        except Exception as e:
+            logger.warning(f"Generation cache read failed: {e}")
+            return None
+
+    def _set_persistent(self, key: str, model: str, value: Dict[str, Any]) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.persistent_ttl)
+        try:
+            with SessionLocal() as db:
+                GenerationCacheRepo.upsert(
+                    db, key=key, model=model, response=value, expires_at=expires_at
+                )
+        except Exception as e:
+            logger.warning(f"Generation cache write failed: {e}")
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.purge_interval
+        try:
+            with SessionLocal() as db:
+                purged = GenerationCacheRepo.delete_expired(
+                    db, datetime.now(timezone.utc), limit=self.purge_batch
+                )
+        except Exception as e:
+            logger.warning(f"Generation cache purge failed: {e}")
+            return
+        if purged:
+            with self._lock:
+                self.stats["purged"] += purged
+            logger.info(f"Purged {purged} expired generation cache rows")
+
+
+generation_cache = GenerationCache(
+    maxsize=settings.GENERATION_CACHE_SIZE,
+    ttl=settings.GENERATION_CACHE_TTL_SECONDS,
+    persistent_ttl=settings.GENERATION_CACHE_PERSISTENT_TTL_SECONDS,
+    persist=settings.GENERATION_CACHE_PERSIST,
+    purge_interval=settings.GENERATION_CACHE_PURGE_INTERVAL_SECONDS,
+    purge_batch=settings.GENERATION_CACHE_PURGE_BATCH,
+)
@@ -0,0 +1,146 @@
+import asyncio
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from PIL import Image, features
+
+from app.lib.single_flight import SingleFlight
+from app.services.image_store import image_store
+from app.settings import settings
+
+logger = logging.getLogger("app")
+
+# max width in pixels for each named size; aspect ratio is preserved
+DERIVATIVE_SIZES = {
+    "thumb": 320,
+    "small": 640,
+    "medium": 1280,
+}
+
+DERIVATIVE_FORMATS = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "png": "image/png",
+    "jpg": "image/jpeg",
+}
+
+PIL_FORMATS = {"avif": "AVIF", "webp": "WEBP", "png": "PNG", "jpg": "JPEG"}
+
+AVIF_SUPPORTED = features.check("avif")
+
+
+def render_derivative(src_path: str, dst_path: str, width: int | None, fmt: str) -> str:
+    """
+    Resize/re-encode one image. Runs inside the process pool, so it must stay a
+    picklable module-level function. Writes to a temp file and renames, so
+    concurrent builders in other processes can never expose a partial file.
+    """
+    with Image.open(src_path) as img:
+        if width and img.width > width:
+            img.thumbnail((width, width * img.height // img.width), Image.Resampling.LANCZOS)
+        if fmt == "jpg" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        tmp_path = f"{dst_path}.{os.getpid()}.tmp"
+        save_kwargs = {"quality": 80} if fmt in ("avif", "webp", "jpg") else {"optimize": True}
+        img.save(tmp_path, format=PIL_FORMATS[fmt], **save_kwargs)
+    os.replace(tmp_path, dst_path)
+    return dst_path
+
+
+def negotiate_format(accept: str | None, fallback: str) -> str:
+    """Pick the best derivative format the client advertises in Accept."""
+    accept = accept or ""
+    if AVIF_SUPPORTED and "image/avif" in accept:
+        return "avif"
+    if "image/webp" in accept:
+        return "webp"
+    return fallback
+
+
+class DerivativeBuilder:
+    """
+    Builds resized / re-encoded variants of content-addressed images on first
+    request and caches them on disk next to the originals. CPU work runs in a
+    ProcessPoolExecutor; concurrent requests for the same variant share one build.
+    """
+
+    def __init__(self, root: str, max_workers: int):
+        self.root = root
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._builds = SingleFlight()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def derivative_path(self, content_hash: str, size: str, fmt: str) -> str:
+        return os.path.join(
+            self.root, content_hash[:2], content_hash[2:4], f"{content_hash}-{size}.{fmt}"
+        )
+
+    async def get_or_build(self, content_hash: str, src_ext: str, size: str, fmt: str) -> str:
+        if size != "original" and size not in DERIVATIVE_SIZES:
+            raise ValueError(f"Unknown image size '{size}'")
+        if fmt not in DERIVATIVE_FORMATS or (fmt == "avif" and not AVIF_SUPPORTED):
+            raise ValueError(f"Unsupported image format '{fmt}'")
+
+        dst_path = self.derivative_path(content_hash, size, fmt)
+        if await asyncio.to_thread(os.path.exists, dst_path):
+            return dst_path
+
+        src_path = image_store.object_path(content_hash, src_ext)
+
+        async def build():
+            loop = asyncio.get_running_loop()
+            path = await loop.run_in_executor(
+                self._get_pool(),
+                render_derivative,
+                src_path,
+                dst_path,
+                DERIVATIVE_SIZES.get(size),
+                fmt,
+            )
+            logger.info(f"Built image derivative {os.path.basename(path)}")
+            return path
+
+        return await self._builds.do(dst_path, build)
+
+    def _remove_derivatives(self, content_hash: str) -> None:
+        pattern = os.path.join(self.root, content_hash[:2], content_hash[2:4], f"{content_hash}-*")
+        for path in glob.glob(pattern):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def forget(self, content_hash: str) -> None:
+        """Delete hook: remove every derivative built from the image."""
+        await asyncio.to_thread(self._remove_derivatives, content_hash)
+
+    async def prewarm(self, image_name: str) -> None:
+        """Build the configured IMAGE_DERIVATIVE_PREWARM variants for a new image."""
+        content_hash, _, src_ext = image_name.partition(".")
+        for variant in settings.IMAGE_DERIVATIVE_PREWARM:
+            size, _, fmt = variant.partition(":")
+            try:
+                await self.get_or_build(content_hash, src_ext, size, fmt)
+            except Exception as e:
+                logger.warning(f"Prewarming derivative {variant} for {image_name} failed: {e}")
+
+
+derivative_builder = DerivativeBuilder(
+    root=os.path.join(settings.IMAGE_STORE_DIR, "derivatives"),
+    max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+)
+image_store.on_delete(derivative_builder.forget)
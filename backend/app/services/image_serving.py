@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import mimetypes
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from app.services.image_store import IMAGE_NAME_RE, image_store
+from app.services.image_derivatives import (
+    DERIVATIVE_FORMATS,
+    derivative_builder,
+    negotiate_format,
+)
+from app.settings import settings
+
+logger = logging.getLogger("app")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class HotImageCache:
+    """
+    Size-bounded LRU of image bytes, keyed by file name. Only content-addressed
+    images and their derivatives are cached, so an entry only goes stale when
+    the image is deleted; `ImageStore.delete` evicts it then.
+    """
+
+    def __init__(self, max_bytes: int, max_item_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._items.get(key)
+        if data is None:
+            self.stats["misses"] += 1
+            return None
+        self._items.move_to_end(key)
+        self.stats["hits"] += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_item_bytes or key in self._items:
+            return
+        self._items[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes and self._items:
+            _, evicted = self._items.popitem(last=False)
+            self._size -= len(evicted)
+
+    def evict(self, content_hash: str) -> None:
+        """Drop an image and all of its derivatives (keys start with the hash)."""
+        for key in [key for key in self._items if key.startswith(content_hash)]:
+            self._size -= len(self._items.pop(key))
+
+
+class KnownImages:
+    """
+    Bounded LRU set of content hashes whose original was seen on disk, so
+    conditional GETs and hot-cache hits need no filesystem check. Entries are
+    dropped by `ImageStore.delete`.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._hashes: OrderedDict[str, None] = OrderedDict()
+
+    def __contains__(self, content_hash: str) -> bool:
+        if content_hash not in self._hashes:
+            return False
+        self._hashes.move_to_end(content_hash)
+        return True
+
+    def add(self, content_hash: str) -> None:
+        self._hashes[content_hash] = None
+        self._hashes.move_to_end(content_hash)
+        while len(self._hashes) > self.max_entries:
+            self._hashes.popitem(last=False)
+
+    def discard(self, content_hash: str) -> None:
+        self._hashes.pop(content_hash, None)
+
+
+hot_images = HotImageCache(
+    max_bytes=settings.IMAGE_HOT_CACHE_MAX_BYTES,
+    max_item_bytes=settings.IMAGE_HOT_CACHE_MAX_ITEM_BYTES,
+)
+known_images = KnownImages(max_entries=settings.IMAGE_KNOWN_MAX_ENTRIES)
+
+
+async def _forget_image(content_hash: str) -> None:
+    known_images.discard(content_hash)
+    hot_images.evict(content_hash)
+
+
+image_store.on_delete(_forget_image)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def _parse_range(range_header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end). Returns None for
+    headers we choose to ignore (multi-range, other units); raises ValueError
+    when the range cannot be satisfied.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
+    try:
+        if start_s == "":
+            suffix = int(end_s)
+            if suffix <= 0:
+                raise ValueError("Unsatisfiable range")
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+    except ValueError:
+        raise ValueError("Unsatisfiable range")
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def serve_image(
+    image_name: str,
+    request: Request,
+    size: str | None = None,
+    fmt: str | None = None,
+) -> Response:
+    """
+    Serve a stored image, optionally as a resized / re-encoded derivative.
+    Content-addressed images get a strong ETag (their hash), an immutable
+    Cache-Control, 304 on If-None-Match (once the file is known to exist;
+    the disk is only checked the first time a hash is seen after startup or
+    a delete),
+    single byte-range support, and are kept in the hot in-memory LRU when
+    small enough. `fmt="auto"` (or a size without a format) negotiates the
+    format from the Accept header.
+    """
+    file_path = image_store.path_for(image_name)
+    match = IMAGE_NAME_RE.match(image_name)
+
+    if match is None:
+        # legacy flat names are mutable, let Starlette handle validators/ranges
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"{file_path} does not exist")
+        return FileResponse(file_path, headers={"Cache-Control": "no-cache"})
+
+    content_hash, ext = match.group(1), match.group(2)
+    # an unknown hash is resolved on disk before answering anything, so a
+    # deleted image (and its derivatives) is a 404 rather than a 304
+    if content_hash not in known_images:
+        if not await asyncio.to_thread(os.path.exists, file_path):
+            raise FileNotFoundError(f"{file_path} does not exist")
+        known_images.add(content_hash)
+    cache_key = image_name
+    etag = f'"{content_hash}"'
+    media_type = mimetypes.guess_type(image_name)[0] or "application/octet-stream"
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+
+    if size is not None or fmt is not None:
+        size = size or "original"
+        if fmt is None or fmt == "auto":
+            fmt = negotiate_format(request.headers.get("accept"), ext)
+            headers["Vary"] = "Accept"
+        if size != "original" or fmt != ext:
+            file_path = await derivative_builder.get_or_build(content_hash, ext, size, fmt)
+            cache_key = os.path.basename(file_path)
+            etag = f'"{content_hash}-{size}-{fmt}"'
+            media_type = DERIVATIVE_FORMATS[fmt]
+
+    headers["ETag"] = etag
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    data = hot_images.get(cache_key)
+    if data is None:
+        try:
+            file_size = await asyncio.to_thread(os.path.getsize, file_path)
+        except OSError:
+            raise FileNotFoundError(f"{file_path} does not exist")
+        if file_size > hot_images.max_item_bytes:
+            return FileResponse(file_path, media_type=media_type, headers=headers)
+        data = await asyncio.to_thread(_read_file, file_path)
+        hot_images.put(cache_key, data)
+
+    range_header = request.headers.get("range")
+    if range_header:
+        try:
+            byte_range = _parse_range(range_header, len(data))
+        except ValueError:
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{len(data)}"},
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            return Response(
+                content=data[start : end + 1],
+                status_code=206,
+                media_type=media_type,
+                headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(data)}"},
+            )
+
+    return Response(content=data, media_type=media_type, headers=headers)
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from app.settings import settings
+
+logger = logging.getLogger("app")
+
+CONTENT_TYPE_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+}
+
+IMAGE_NAME_RE = re.compile(r"^([0-9a-f]{64})\.(png|jpg|webp)$")
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.strip().encode("utf-8")).hexdigest()
+
+
+class ImageStore:
+    """
+    Content-addressed image store on local disk.
+
+    Images are named by the sha256 of their bytes and sharded two levels deep
+    (`objects/ab/cd/<hash>.png`) so no directory grows unbounded; identical
+    bytes are stored once. A small on-disk index maps a prompt hash to the
+    image name so a repeated prompt can skip the worker entirely.
+
+    Anything that caches per-image state (hot bytes, derivatives, "known to
+    exist" markers) registers an `on_delete` hook, so `delete` is the one place
+    that invalidates it.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_dir = os.path.join(root, "index")
+        self.tmp_dir = os.path.join(root, "tmp")
+        for path in (self.objects_dir, self.index_dir, self.tmp_dir):
+            os.makedirs(path, exist_ok=True)
+        self._delete_hooks: list[Callable[[str], Awaitable[None]]] = []
+
+    def on_delete(self, hook: Callable[[str], Awaitable[None]]) -> None:
+        """Register `hook(content_hash)`, awaited after an image is deleted."""
+        self._delete_hooks.append(hook)
+
+    def object_path(self, content_hash: str, ext: str) -> str:
+        return os.path.join(
+            self.objects_dir, content_hash[:2], content_hash[2:4], f"{content_hash}.{ext}"
+        )
+
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.index_dir, key[:2], key)
+
+    def path_for(self, image_name: str) -> Optional[str]:
+        """
+        Resolve an image name to a file path. Content-addressed names map into
+        the shard tree; older flat names are looked up directly under the root.
+        """
+        match = IMAGE_NAME_RE.match(image_name)
+        if match:
+            return self.object_path(match.group(1), match.group(2))
+        if "/" in image_name or ".." in image_name:
+            raise ValueError("Invalid image name")
+        return os.path.join(self.root, image_name)
+
+    def lookup_prompt(self, prompt: str) -> Optional[str]:
+        """Return the stored image name for a prompt, if one exists on disk."""
+        try:
+            with open(self._index_path(prompt_hash(prompt)), "r") as f:
+                image_name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        path = self.path_for(image_name)
+        return image_name if path and os.path.exists(path) else None
+
+    def record_prompt(self, prompt: str, image_name: str) -> None:
+        key = prompt_hash(prompt)
+        path = self._index_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(image_name)
+        os.replace(tmp_path, path)
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], content_type: str | None) -> str:
+        """
+        Write an async byte stream to disk chunk by chunk (file I/O runs in a
+        thread), hashing as it goes, then move it to its content address.
+        Returns the image name (`<sha256>.<ext>`).
+        """
+        ext = CONTENT_TYPE_EXTENSIONS.get((content_type or "").split(";")[0].strip(), "png")
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        tmp_file = os.fdopen(fd, "wb")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                digest.update(chunk)
+                size += len(chunk)
+                await asyncio.to_thread(tmp_file.write, chunk)
+            await asyncio.to_thread(tmp_file.close)
+            if size == 0:
+                raise ValueError("No image data found in the response.")
+
+            content_hash = digest.hexdigest()
+            await asyncio.to_thread(self._commit, tmp_path, content_hash, ext)
+            return f"{content_hash}.{ext}"
+        finally:
+            if not tmp_file.closed:
+                tmp_file.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _commit(self, tmp_path: str, content_hash: str, ext: str) -> None:
+        final_path = self.object_path(content_hash, ext)
+        if os.path.exists(final_path):
+            logger.info(f"Image {content_hash} already stored, deduplicated")
+            return
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        logger.info(f"Image saved successfully at {final_path}")
+
+    async def delete(self, image_name: str) -> bool:
+        """
+        Remove a content-addressed image and run the delete hooks. Returns
+        False when the image was not stored; hooks run either way, so stale
+        cache entries are dropped even then.
+        """
+        match = IMAGE_NAME_RE.match(image_name)
+        if match is None:
+            raise ValueError("Invalid image name")
+        content_hash, ext = match.group(1), match.group(2)
+        try:
+            await asyncio.to_thread(os.remove, self.object_path(content_hash, ext))
+            removed = True
+        except FileNotFoundError:
+            removed = False
+        for hook in self._delete_hooks:
+            try:
+                await hook(content_hash)
+            except Exception as e:
+                logger.warning(f"Delete hook failed for image {content_hash}: {e}")
+        if removed:
+            logger.info(f"Image {content_hash} deleted")
+        return removed
+
+
+image_store = ImageStore(settings.IMAGE_STORE_DIR)
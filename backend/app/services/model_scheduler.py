@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from cachetools import LRUCache
+
+from app.errors import RateLimitedError
+from app.lib.tokens import current_client, current_user
+from app.settings import settings
+
+logger = logging.getLogger("app")
+
+# rough chars-per-token ratio used to size a request before it is sent
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(prompt: str, config: Dict[str, Any]) -> int:
+    """
+    Upper-bound token cost of a call: prompt plus system instruction plus the
+    output budget. Reconciled with the real usage once the response arrives.
+    """
+    system_instruction = config.get("system_instruction") or ""
+    output_budget = config.get("max_output_tokens") or settings.GEMINI_DEFAULT_OUTPUT_TOKENS
+    return (len(prompt) + len(system_instruction)) // CHARS_PER_TOKEN + output_budget
+
+
+def caller_key() -> str:
+    """
+    Budget key of the caller: the user id, else the client address of an
+    anonymous request. Only work with neither (anonymous background jobs)
+    shares the "anonymous" key.
+    """
+    user = current_user.get()
+    if user is not None:
+        return str(user.id)
+    client = current_client.get()
+    return f"anonymous:{client}" if client else "anonymous"
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if it can be taken now)."""
+        self._refill(now)
+        # a single request larger than the whole bucket waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Credit back (positive) or charge (negative) after real usage is known."""
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+@dataclass
+class ModelLimits:
+    concurrency: int
+    rpm: float
+    tpm: float
+
+
+@dataclass
+class _Waiter:
+    user_key: str
+    tokens: int
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class Ticket:
+    """Handed to the caller for the duration of one admitted call."""
+
+    def __init__(self, lane: "_ModelLane", user_key: str, estimated_tokens: int):
+        self._lane = lane
+        self._user_key = user_key
+        self.estimated_tokens = estimated_tokens
+
+    def record_usage(self, total_tokens: int | None) -> None:
+        if total_tokens:
+            self._lane.reconcile(self._user_key, self.estimated_tokens, total_tokens)
+
+
+class _ModelLane:
+    """
+    Admission state for one model: global concurrency plus RPM/TPM buckets,
+    per-user RPM/TPM buckets, and a bounded wait queue. The queue keeps one
+    FIFO per user and serves users round-robin, so a user who fans out forty
+    slide calls cannot starve a user who sent one.
+    """
+
+    def __init__(self, model: str, limits: ModelLimits):
+        now = time.monotonic()
+        self.model = model
+        self.limits = limits
+        self.active = 0
+        self.rpm = TokenBucket(limits.rpm, now)
+        self.tpm = TokenBucket(limits.tpm, now)
+        self.user_buckets: LRUCache = LRUCache(maxsize=settings.GEMINI_USER_BUCKETS_MAX)
+        self.queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self.queued = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {"admitted": 0, "queued": 0, "rejected_user": 0, "rejected_global": 0, "timed_out": 0}
+
+    # ---- per-user budget ----
+
+    def _user_buckets(self, user_key: str, now: float) -> tuple[TokenBucket, TokenBucket]:
+        buckets = self.user_buckets.get(user_key)
+        if buckets is None:
+            buckets = (
+                TokenBucket(settings.GEMINI_USER_RPM, now),
+                TokenBucket(settings.GEMINI_USER_TPM, now),
+            )
+            self.user_buckets[user_key] = buckets
+        return buckets
+
+    def charge_user(self, user_key: str, tokens: int) -> None:
+        now = time.monotonic()
+        rpm, tpm = self._user_buckets(user_key, now)
+        wait = max(rpm.wait_time(1, now), tpm.wait_time(tokens, now))
+        if wait > 0:
+            self.stats["rejected_user"] += 1
+            raise RateLimitedError(f"rate limit exceeded for {self.model}", retry_after_seconds=wait)
+        rpm.take(1, now)
+        tpm.take(tokens, now)
+
+    def refund_user(self, user_key: str, tokens: int) -> None:
+        buckets = self.user_buckets.get(user_key)
+        if buckets is not None:
+            buckets[0].adjust(1)
+            buckets[1].adjust(tokens)
+
+    def reconcile(self, user_key: str, estimated: int, actual: int) -> None:
+        delta = estimated - actual
+        self.tpm.adjust(delta)
+        buckets = self.user_buckets.get(user_key)
+        if buckets is not None:
+            buckets[1].adjust(delta)
+
+    # ---- global budget ----
+
+    def _global_wait(self, tokens: int, now: float) -> float:
+        return max(self.rpm.wait_time(1, now), self.tpm.wait_time(tokens, now))
+
+    def _admit(self, tokens: int, now: float) -> None:
+        self.rpm.take(1, now)
+        self.tpm.take(tokens, now)
+        self.active += 1
+        self.stats["admitted"] += 1
+
+    def try_admit_now(self, tokens: int) -> bool:
+        now = time.monotonic()
+        if self.queued == 0 and self.active < self.limits.concurrency and self._global_wait(tokens, now) == 0:
+            self._admit(tokens, now)
+            return True
+        return False
+
+    def estimated_queue_wait(self, tokens: int) -> float:
+        """Lower bound on how long a new waiter would sit behind the current queue."""
+        now = time.monotonic()
+        ahead = self.queued + 1
+        queued_tokens = sum(w.tokens for q in self.queues.values() for w in q) + tokens
+        return max(self.rpm.wait_time(min(ahead, self.rpm.capacity), now), self.tpm.wait_time(queued_tokens, now))
+
+    def enqueue(self, waiter: _Waiter) -> None:
+        self.queues.setdefault(waiter.user_key, deque()).append(waiter)
+        self.queued += 1
+        self.stats["queued"] += 1
+
+    def dispatch(self) -> None:
+        """Admit queued waiters round-robin while concurrency and budget allow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self.queues and self.active < self.limits.concurrency:
+            user_key, queue = next(iter(self.queues.items()))
+            waiter = queue[0]
+            if waiter.future.done():
+                # timed out or cancelled while waiting
+                self._pop(user_key, queue)
+                continue
+            now = time.monotonic()
+            wait = self._global_wait(waiter.tokens, now)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self.dispatch)
+                return
+            self._pop(user_key, queue)
+            self._admit(waiter.tokens, now)
+            waiter.future.set_result(None)
+
+    def _pop(self, user_key: str, queue: Deque[_Waiter]) -> None:
+        queue.popleft()
+        self.queued -= 1
+        # rotate: this user goes to the back of the line (or leaves it)
+        del self.queues[user_key]
+        if queue:
+            self.queues[user_key] = queue
+
+    def release(self) -> None:
+        self.active -= 1
+        if self.queues:
+            self.dispatch()
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self.rpm._refill(now)
+        self.tpm._refill(now)
+        return {
+            **self.stats,
+            "active": self.active,
+            "waiting": self.queued,
+            "waiting_users": len(self.queues),
+            "rpm_available": round(self.rpm.tokens, 1),
+            "tpm_available": round(self.tpm.tokens),
+            "limits": vars(self.limits),
+        }
+
+
+class ModelScheduler:
+    """
+    Admission control in front of every async Gemini call.
+
+    A call is first charged to the caller's own RPM/TPM bucket; an exhausted
+    user bucket is an immediate RateLimitedError. It is then admitted against
+    the model's global concurrency and RPM/TPM budget, or parked in the fair
+    wait queue. When the queue is full, or the budget could not free up within
+    GEMINI_QUEUE_MAX_WAIT_SECONDS, the call is rejected up front with a
+    Retry-After estimate rather than left to hit upstream quota errors.
+    """
+
+    def __init__(self, model_limits: Dict[str, ModelLimits], default_limits: ModelLimits):
+        self.model_limits = model_limits
+        self.default_limits = default_limits
+        self._lanes: Dict[str, _ModelLane] = {}
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = _ModelLane(model, self.model_limits.get(model, self.default_limits))
+            self._lanes[model] = lane
+        return lane
+
+    @asynccontextmanager
+    async def slot(self, model: str, estimated_tokens: int) -> AsyncIterator[Ticket]:
+        lane = self._lane(model)
+        user_key = caller_key()
+        lane.charge_user(user_key, estimated_tokens)
+        try:
+            if not lane.try_admit_now(estimated_tokens):
+                await self._wait(lane, user_key, estimated_tokens)
+        except BaseException:
+            lane.refund_user(user_key, estimated_tokens)
+            raise
+        try:
+            yield Ticket(lane, user_key, estimated_tokens)
+        finally:
+            lane.release()
+
+    async def _wait(self, lane: _ModelLane, user_key: str, tokens: int) -> None:
+        max_wait = settings.GEMINI_QUEUE_MAX_WAIT_SECONDS
+        if lane.queued >= settings.GEMINI_QUEUE_MAX:
+            lane.stats["rejected_global"] += 1
+            raise RateLimitedError(f"{lane.model} is saturated", retry_after_seconds=1)
+        estimate = lane.estimated_queue_wait(tokens)
+        if estimate > max_wait:
+            lane.stats["rejected_global"] += 1
+            raise RateLimitedError(f"{lane.model} is saturated", retry_after_seconds=estimate)
+
+        waiter = _Waiter(user_key, tokens, asyncio.get_running_loop().create_future())
+        lane.enqueue(waiter)
+        lane.dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                return  # admitted right at the deadline; the slot is ours
+            lane.stats["timed_out"] += 1
+            waiter.future.cancel()
+            lane.dispatch()
+            raise RateLimitedError(f"{lane.model} is saturated", retry_after_seconds=max_wait)
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # admitted in the same tick the caller went away
+                lane.release()
+            else:
+                waiter.future.cancel()
+                lane.dispatch()
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {model: lane.get_stats() for model, lane in self._lanes.items()}
+
+
+_default_limits = ModelLimits(
+    concurrency=settings.GEMINI_MAX_CONCURRENCY,
+    rpm=settings.GEMINI_DEFAULT_RPM,
+    tpm=settings.GEMINI_DEFAULT_TPM,
+)
+
+model_scheduler = ModelScheduler(
+    # per-model entries only override the limits they name
+    model_limits={
+        model: replace(_default_limits, **limits)
+        for model, limits in settings.GEMINI_MODEL_LIMITS.items()
+    },
+    default_limits=_default_limits,
+)
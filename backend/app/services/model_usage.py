@@ -0,0 +1,248 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from cachetools import LRUCache
+from google.genai import errors as genai_errors
+
+from app.lib.db_metrics import Histogram
+from app.services.model_scheduler import caller_key
+from app.settings import settings
+
+logger = logging.getLogger("app")
+
+# model calls run far longer than queries; upper bounds in milliseconds
+MODEL_LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000, float("inf"))
+
+# how many of the heaviest users the snapshot lists
+TOP_USERS = 20
+
+TOKEN_FIELDS = ("prompt_tokens", "candidate_tokens", "thoughts_tokens", "cached_tokens", "total_tokens")
+
+
+def usage_counts(usage: Any) -> Dict[str, int]:
+    """Token counts from a response's usage_metadata (zeros when absent)."""
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+        "candidate_tokens": getattr(usage, "candidates_token_count", None) or 0,
+        "thoughts_tokens": getattr(usage, "thoughts_token_count", None) or 0,
+        "cached_tokens": getattr(usage, "cached_content_token_count", None) or 0,
+        "total_tokens": getattr(usage, "total_token_count", None) or 0,
+    }
+
+
+def call_outcome(response: Any = None, error: Optional[BaseException] = None) -> str:
+    """Low-cardinality outcome label: ok, truncated, a finish reason, or an error class."""
+    if error is not None:
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            return "cancelled"
+        if isinstance(error, genai_errors.APIError):
+            return f"error_{error.code}"
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+            return "timeout"
+        return "error"
+    candidates = getattr(response, "candidates", None)
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    name = getattr(reason, "name", str(reason)).upper() if reason is not None else "STOP"
+    if name in ("STOP", "FINISH_REASON_UNSPECIFIED"):
+        return "ok"
+    return "truncated" if name == "MAX_TOKENS" else name.lower()
+
+
+class RequestUsage:
+    """Model usage of one HTTP request or background job."""
+
+    def __init__(self, endpoint: Optional[str] = None, scope: Optional[Dict[str, Any]] = None):
+        self._endpoint = endpoint
+        # the ASGI scope only learns its route once the router has run
+        self._scope = scope
+        self.calls = 0
+        self.model_seconds = 0.0
+        self.tokens = dict.fromkeys(TOKEN_FIELDS, 0)
+        self.outcomes: Dict[str, int] = {}
+
+    @property
+    def endpoint(self) -> str:
+        if self._endpoint is None and self._scope is not None:
+            route = self._scope.get("route")
+            if route is not None:
+                self._endpoint = f"{self._scope['method']} {route.path}"
+        return self._endpoint or "unrouted"
+
+    def add(self, outcome: str, latency_seconds: float, tokens: Dict[str, int]) -> None:
+        self.calls += 1
+        self.model_seconds += latency_seconds
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        for name, value in tokens.items():
+            self.tokens[name] += value
+
+    def header_value(self) -> str:
+        return (
+            f"calls={self.calls};prompt={self.tokens['prompt_tokens']};"
+            f"output={self.tokens['candidate_tokens']};total={self.tokens['total_tokens']};"
+            f"model_ms={round(self.model_seconds * 1000)}"
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "calls": self.calls,
+            "model_seconds": round(self.model_seconds, 3),
+            "outcomes": self.outcomes,
+            **self.tokens,
+        }
+
+
+# usage accumulator of the request (or job) currently running
+current_request_usage: ContextVar[Optional[RequestUsage]] = ContextVar("current_request_usage", default=None)
+
+
+class _Series:
+    def __init__(self):
+        self.calls = 0
+        self.tokens = dict.fromkeys(TOKEN_FIELDS, 0)
+        self.latency = Histogram(MODEL_LATENCY_BUCKETS_MS)
+        self.ttft = Histogram(MODEL_LATENCY_BUCKETS_MS)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            **self.tokens,
+            "latency": self.latency.snapshot(),
+            **({"ttft": self.ttft.snapshot()} if self.ttft.count else {}),
+        }
+
+
+class ModelUsageMetrics:
+    """
+    Token and latency accounting for every Gemini call.
+
+    Each call is recorded under (endpoint, model, op, outcome) with its
+    usage_metadata token counts, latency and, for streams, time to first
+    token; tokens are also totalled per user. Calls made while a request or
+    job is being tracked (see `track`) are added to that request's summary,
+    which is logged and aggregated per endpoint when it finishes.
+    """
+
+    def __init__(self, max_users: int):
+        self.series: Dict[tuple[str, str, str, str], _Series] = {}
+        self.users: LRUCache = LRUCache(maxsize=max_users)
+        self.requests: Dict[str, Dict[str, Any]] = {}
+
+    def record_call(
+        self,
+        *,
+        model: str,
+        op: str,
+        outcome: str,
+        latency_seconds: float,
+        ttft_seconds: Optional[float] = None,
+        usage: Any = None,
+    ) -> None:
+        request = current_request_usage.get()
+        endpoint = request.endpoint if request is not None else "background"
+        tokens = usage_counts(usage)
+
+        key = (endpoint, model, op, outcome)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = _Series()
+        series.calls += 1
+        series.latency.observe(latency_seconds * 1000)
+        if ttft_seconds is not None:
+            series.ttft.observe(ttft_seconds * 1000)
+        for name, value in tokens.items():
+            series.tokens[name] += value
+
+        user_key = caller_key()
+        user = self.users.get(user_key)
+        if user is None:
+            user = self.users[user_key] = {"calls": 0, **dict.fromkeys(TOKEN_FIELDS, 0)}
+        user["calls"] += 1
+        for name, value in tokens.items():
+            user[name] += value
+
+        if request is not None:
+            request.add(outcome, latency_seconds, tokens)
+
+    @contextmanager
+    def track(self, endpoint: Optional[str] = None, scope: Optional[Dict[str, Any]] = None) -> Iterator[RequestUsage]:
+        """Attribute model calls made inside the block to one request summary."""
+        usage = RequestUsage(endpoint, scope)
+        token = current_request_usage.set(usage)
+        try:
+            yield usage
+        finally:
+            current_request_usage.reset(token)
+            if usage.calls:
+                self.record_request(usage)
+
+    def record_request(self, usage: RequestUsage) -> None:
+        summary = usage.summary()
+        logger.info(f"Model usage for {usage.endpoint}: {summary}")
+        totals = self.requests.get(usage.endpoint)
+        if totals is None:
+            totals = self.requests[usage.endpoint] = {
+                "requests": 0,
+                "calls": 0,
+                "max_total_tokens": 0,
+                **dict.fromkeys(TOKEN_FIELDS, 0),
+                "model_seconds": Histogram(MODEL_LATENCY_BUCKETS_MS),
+            }
+        totals["requests"] += 1
+        totals["calls"] += usage.calls
+        totals["max_total_tokens"] = max(totals["max_total_tokens"], usage.tokens["total_tokens"])
+        for name, value in usage.tokens.items():
+            totals[name] += value
+        totals["model_seconds"].observe(usage.model_seconds * 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        heaviest = sorted(self.users.items(), key=lambda item: item[1]["total_tokens"], reverse=True)
+        return {
+            "calls": [
+                {"endpoint": endpoint, "model": model, "op": op, "outcome": outcome, **series.snapshot()}
+                for (endpoint, model, op, outcome), series in self.series.items()
+            ],
+            "requests": {
+                endpoint: {
+                    **{k: v for k, v in totals.items() if k != "model_seconds"},
+                    "avg_total_tokens": round(totals["total_tokens"] / totals["requests"], 1),
+                    "model_time": totals["model_seconds"].snapshot(),
+                }
+                for endpoint, totals in self.requests.items()
+            },
+            "users_tracked": len(self.users),
+            "top_users": dict(heaviest[:TOP_USERS]),
+        }
+
+
+model_usage = ModelUsageMetrics(max_users=settings.MODEL_USAGE_MAX_USERS)
+
+
+class ModelUsageMiddleware:
+    """
+    ASGI middleware that opens a usage summary per HTTP request. When model
+    calls finished before the response started, the summary is also returned
+    in an X-Model-Usage header; streamed responses are covered to their end.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with model_usage.track(scope=scope) as usage:
+
+            async def send_with_usage(message):
+                if message["type"] == "http.response.start" and usage.calls:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-model-usage", usage.header_value().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_usage)
@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from google.genai import errors as genai_errors
+
+from app.services.model_scheduler import CHARS_PER_TOKEN
+
+logger = logging.getLogger("app")
+
+
+@dataclass
+class _CachedPrefix:
+    name: str
+    # time.monotonic() deadline
+    expires_at: float
+
+
+def is_cache_miss(error: BaseException) -> bool:
+    """The referenced cached content is gone upstream (expired or deleted)."""
+    if not isinstance(error, genai_errors.APIError):
+        return False
+    message = (error.message or "").lower()
+    return error.code == 404 or (error.code in (400, 403) and "cache" in message)
+
+
+class PromptCache:
+    """
+    Gemini context caching for long, static system instructions.
+
+    Each instruction is registered once per model and version (a hash of its
+    text) as a cached content, and call configs are rewritten to reference the
+    cached handle instead of resending the text. Only instructions whose
+    estimated size reaches the model's minimum for cached content are
+    considered; smaller ones are sent inline without any cache API call.
+
+    Handles are created and extended in the background, so a request never
+    waits on the cache API: until a handle exists the instruction is sent
+    inline. When a handle is gone upstream the caller falls back to the inline
+    instruction (see `is_cache_miss`) and the handle is recreated. A create the
+    API rejects as invalid (e.g. under its real token minimum) is not retried
+    for that instruction; other failures are retried after
+    PROMPT_CACHE_RETRY_SECONDS.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        enabled: bool,
+        min_tokens: Dict[str, int],
+        default_min_tokens: int,
+        ttl_seconds: int,
+        refresh_margin_seconds: int,
+        retry_seconds: int,
+    ):
+        self.client = client
+        self.enabled = enabled
+        self.min_tokens = min_tokens
+        self.default_min_tokens = default_min_tokens
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_seconds = retry_seconds
+        self._entries: Dict[str, _CachedPrefix] = {}
+        self._disabled_until: Dict[str, float] = {}
+        self._rejected: set[str] = set()
+        # background create/refresh tasks by key, so each runs once at a time
+        self._background: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            "created": 0,
+            "reused": 0,
+            "refreshed": 0,
+            "create_failures": 0,
+            "create_rejected": 0,
+            "misses": 0,
+            "calls_cached": 0,
+            "calls_inline": 0,
+            "input_tokens_cached_calls": 0,
+            "input_tokens_inline_calls": 0,
+            "cached_tokens": 0,
+        }
+
+    @staticmethod
+    def key(model: str, system_instruction: str) -> str:
+        digest = hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()[:16]
+        return f"{model}-{digest}"
+
+    def min_tokens_for(self, model: str) -> int:
+        return self.min_tokens.get(model, self.default_min_tokens)
+
+    def _eligible(self, model: str, config: Dict[str, Any]) -> bool:
+        instruction = config.get("system_instruction")
+        return (
+            self.enabled
+            and isinstance(instruction, str)
+            and len(instruction) // CHARS_PER_TOKEN >= self.min_tokens_for(model)
+        )
+
+    async def aconfig(self, model: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        `config` with its system instruction swapped for a cached-content
+        handle, or `config` itself when caching does not apply or no handle
+        is ready yet.
+        """
+        if not self._eligible(model, config):
+            return config
+        instruction = config["system_instruction"]
+        key = self.key(model, instruction)
+        now = time.monotonic()
+        if key in self._rejected or self._disabled_until.get(key, 0) > now:
+            return config
+
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= now:
+            self._spawn(key, lambda: self._acreate(model, instruction, key))
+            return config
+        if entry.expires_at - now <= self.refresh_margin_seconds:
+            self._spawn(f"refresh:{key}", lambda: self._arefresh(key, entry))
+
+        cached_config = {k: v for k, v in config.items() if k != "system_instruction"}
+        cached_config["cached_content"] = entry.name
+        return cached_config
+
+    def invalidate(self, model: str, config: Dict[str, Any]) -> None:
+        """Forget the handle for `config`'s instruction after a cache miss."""
+        if self._entries.pop(self.key(model, config["system_instruction"]), None) is not None:
+            self.stats["misses"] += 1
+
+    def record_usage(self, model: str, config: Dict[str, Any], response) -> None:
+        """Count input tokens of one call, split by whether the prefix was cached."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        prompt_tokens = usage.prompt_token_count or 0
+        if "cached_content" in config:
+            cached_tokens = usage.cached_content_token_count or 0
+            self.stats["calls_cached"] += 1
+            self.stats["input_tokens_cached_calls"] += prompt_tokens
+            self.stats["cached_tokens"] += cached_tokens
+            logger.debug(f"Gemini input tokens: {prompt_tokens} ({cached_tokens} from context cache)")
+        elif self._eligible(model, config):
+            self.stats["calls_inline"] += 1
+            self.stats["input_tokens_inline_calls"] += prompt_tokens
+            logger.debug(f"Gemini input tokens: {prompt_tokens} (context cache not used)")
+
+    def _entry(self, cached) -> _CachedPrefix:
+        remaining = float(self.ttl_seconds)
+        if cached.expire_time is not None:
+            remaining = (cached.expire_time - datetime.now(timezone.utc)).total_seconds()
+        return _CachedPrefix(name=cached.name, expires_at=time.monotonic() + remaining)
+
+    async def _afind_existing(self, model: str, display_name: str) -> Optional[_CachedPrefix]:
+        """Another worker process may already have registered this prefix."""
+        try:
+            async for cached in await self.client.aio.caches.list():
+                if cached.display_name == display_name and (cached.model or "").endswith(model):
+                    entry = self._entry(cached)
+                    if entry.expires_at - time.monotonic() > self.refresh_margin_seconds:
+                        return entry
+        except Exception as e:
+            logger.warning(f"Listing context caches failed: {e}")
+        return None
+
+    async def _acreate(self, model: str, instruction: str, key: str) -> None:
+        display_name = f"presently-{key}"
+        try:
+            entry = await self._afind_existing(model, display_name)
+            if entry is not None:
+                self.stats["reused"] += 1
+            else:
+                cached = await self.client.aio.caches.create(
+                    model=model,
+                    config={
+                        "system_instruction": instruction,
+                        "display_name": display_name,
+                        "ttl": f"{self.ttl_seconds}s",
+                    },
+                )
+                entry = self._entry(cached)
+                self.stats["created"] += 1
+                logger.info(f"Created context cache {entry.name} for {display_name}")
+        except genai_errors.ClientError as e:
+            if e.code != 400:
+                self._create_failed(key, display_name, e)
+                return
+            # the instruction is static, so the API would keep rejecting it
+            self.stats["create_rejected"] += 1
+            self._rejected.add(key)
+            logger.warning(f"Context cache for {display_name} rejected, sending it inline: {e}")
+            return
+        except Exception as e:
+            self._create_failed(key, display_name, e)
+            return
+        self._entries[key] = entry
+
+    def _create_failed(self, key: str, display_name: str, error: Exception) -> None:
+        self.stats["create_failures"] += 1
+        self._disabled_until[key] = time.monotonic() + self.retry_seconds
+        logger.warning(f"Context cache for {display_name} unavailable, sending it inline: {error}")
+
+    def _spawn(self, key: str, fn) -> None:
+        """Run `fn` off the request path, at most once per `key` at a time."""
+        if key in self._background:
+            return
+        task = asyncio.ensure_future(fn())
+        self._background[key] = task
+        task.add_done_callback(lambda _: self._background.pop(key, None))
+
+    async def _arefresh(self, key: str, entry: _CachedPrefix) -> None:
+        if self._entries.get(key) is not entry:
+            return  # already refreshed or replaced
+        try:
+            cached = await self.client.aio.caches.update(
+                name=entry.name, config={"ttl": f"{self.ttl_seconds}s"}
+            )
+        except Exception as e:
+            # drop the handle; the next call registers the prefix again
+            logger.warning(f"Refreshing context cache {entry.name} failed: {e}")
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = self._entry(cached)
+        self.stats["refreshed"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        calls_cached = self.stats["calls_cached"]
+        calls_inline = self.stats["calls_inline"]
+        return {
+            **self.stats,
+            "min_tokens": {**self.min_tokens, "default": self.default_min_tokens},
+            "avg_input_tokens_cached": (
+                round(self.stats["input_tokens_cached_calls"] / calls_cached, 1) if calls_cached else None
+            ),
+            "avg_input_tokens_inline": (
+                round(self.stats["input_tokens_inline_calls"] / calls_inline, 1) if calls_inline else None
+            ),
+            "entries": {
+                key: {"name": entry.name, "expires_in_seconds": round(entry.expires_at - now)}
+                for key, entry in self._entries.items()
+            },
+        }
@@ -1,28 +1,62 @@
 from app.repositories.user import UserRepo
-from app.lib.password import verify_password, hash_password
+from app.lib.password import ahash_password, averify_password, needs_rehash
+from app.lib.tokens import REFRESH, InvalidTokenError, issue_token_pair, token_signer
 from app.schemas.user import UserOut, UserSignin, UserCreate, UserUpdate
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
+import logging
+
+logger = logging.getLogger("app")
 
 
 class UserService:
     @staticmethod
-    def signin_user(db, email, raw_password):
-        existing_user = UserRepo.get_by_email(db, email)
+    async def signin_user(db: AsyncSession, email, raw_password):
+        existing_user = await UserRepo.aget_credentials_by_email(db, email)
         if existing_user is None:
             raise ValueError("user not found")
-        hashed = verify_password(raw_password, existing_user.password)
-        if hashed:
-            return existing_user
-        else:
+        hashed = await averify_password(raw_password, existing_user.password)
+        if not hashed:
             raise ValueError("invalid password")
+        if needs_rehash(existing_user.password):
+            # cost parameters changed since this hash was made; upgrade it now
+            # while we still have the raw password
+            new_hash = await ahash_password(raw_password)
+            existing_user = await UserRepo.aupdate(db, existing_user, hashed_password=new_hash)
+            logger.info("Rehashed password with current argon2 parameters")
+        return existing_user
+
+    @staticmethod
+    async def signin_with_tokens(db: AsyncSession, email, raw_password) -> dict:
+        user = await UserService.signin_user(db, email, raw_password)
+        return {
+            **UserOut.model_validate(user).model_dump(),
+            **issue_token_pair(user.id, user.email),
+        }
+
+    @staticmethod
+    async def refresh_tokens(db: AsyncSession, refresh_token: str) -> dict:
+        """
+        Exchange a refresh token for a new pair. Unlike access checks this does
+        look the user up (through the user cache), so deleted accounts cannot
+        keep refreshing.
+        """
+        try:
+            payload = token_signer.verify(refresh_token, REFRESH)
+            user_id = UUID(payload["sub"])
+        except (InvalidTokenError, KeyError, ValueError) as e:
+            raise InvalidTokenError(str(e) or "invalid token")
+        user = await UserRepo.aget(db, user_id)
+        if user is None:
+            raise InvalidTokenError("user not found")
+        return issue_token_pair(user.id, user.email)
 
     @staticmethod
-    def signup_user(db, request: UserCreate):
-        if UserRepo.get_by_email(db, request.email):
+    async def signup_user(db: AsyncSession, request: UserCreate):
+        if await UserRepo.aget_by_email(db, request.email):
             raise ValueError("email already exist")
-        hashed = hash_password(request.password)
-        print("hashed", hashed)
-        return UserRepo.create(
+        hashed = await ahash_password(request.password)
+        return await UserRepo.acreate(
             db,
             email=request.email,
             full_name=request.full_name,
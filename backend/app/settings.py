@@ -1,3 +1,5 @@
+from uuid import UUID
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -6,11 +8,142 @@ class Settings(BaseSettings):
     APP_NAME: str
     APP_VERSION: str
     DATABASE_URL: str
+    # connection pool sizing, applied to both the sync and async engines
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # statements slower than this are logged with their normalized SQL
+    DB_SLOW_QUERY_MS: float = 200.0
     PASSWORD_HASH_SECRET_KEY: str
+    # argon2 cost parameters (passlib defaults); raising them triggers rehash on sign-in
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    # dedicated hashing executor size and how many extra requests may wait
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 16
+    # per-process user lookup cache; the TTL bounds staleness across workers
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 30
+    # sign-in credential entries; also how long another worker may accept a
+    # password that was just changed. 0 reads credentials from the database
+    USER_CREDENTIAL_CACHE_TTL_SECONDS: int = 5
+    # token signing keys as JSON {"kid": "secret"}; only the active kid signs,
+    # every listed kid verifies (rotation). Empty derives one from the app secret
+    TOKEN_SIGNING_KEYS: dict[str, str] = {}
+    TOKEN_ACTIVE_KEY_ID: str | None = None
+    TOKEN_ISSUER: str = "presently"
+    ACCESS_TOKEN_TTL_SECONDS: int = 15 * 60
+    REFRESH_TOKEN_TTL_SECONDS: int = 14 * 24 * 3600
+    # user ids allowed to list/export every user and read cache internals
+    ADMIN_USER_IDS: list[UUID] = []
     
     GEMINI_API_KEY: str
     CLOUDFLARE_API_TOKEN: str
 
+    # default in-flight async Gemini calls per worker process, per model
+    GEMINI_MAX_CONCURRENCY: int = 200
+    # per-model overrides of concurrency / rpm / tpm (JSON in env); any limit
+    # a model does not set comes from GEMINI_MAX_CONCURRENCY /
+    # GEMINI_DEFAULT_RPM / GEMINI_DEFAULT_TPM
+    GEMINI_MODEL_LIMITS: dict[str, dict[str, int]] = {
+        "gemini-2.5-flash": {"rpm": 1000, "tpm": 1_000_000},
+        "gemini-2.5-flash-image": {"concurrency": 20, "rpm": 100, "tpm": 200_000},
+    }
+    GEMINI_DEFAULT_RPM: int = 300
+    GEMINI_DEFAULT_TPM: int = 300_000
+    # per-user budget for each model; anonymous callers share one bucket
+    GEMINI_USER_RPM: int = 120
+    GEMINI_USER_TPM: int = 400_000
+    GEMINI_USER_BUCKETS_MAX: int = 100_000
+    # bounded fair wait queue; over this size or wait the call gets a fast 429
+    GEMINI_QUEUE_MAX: int = 500
+    GEMINI_QUEUE_MAX_WAIT_SECONDS: float = 10.0
+    # output budget assumed for configs without max_output_tokens
+    GEMINI_DEFAULT_OUTPUT_TOKENS: int = 8192
+    # output-token caps derived from the expected size of each response:
+    # thinking budget + fixed part + per outline point / slide
+    GEMINI_THINKING_BUDGET: int = 1024
+    OUTPUT_TOKENS_BASE: int = 400
+    OUTPUT_TOKENS_PER_OUTLINE_POINT: int = 60
+    OUTPUT_TOKENS_PER_SLIDE: int = 250
+    OUTPUT_TOKENS_MAX: int = 32_000
+    # outline points the outline budget is sized for
+    OUTLINE_MAX_POINTS: int = 20
+    # distinct users kept in model usage accounting
+    MODEL_USAGE_MAX_USERS: int = 10_000
+    # per-deck limit and retry budget for the per-slide fan-out mode
+    DETAIL_FANOUT_CONCURRENCY: int = 8
+    DETAIL_SLIDE_MAX_ATTEMPTS: int = 3
+    # Gemini context caching of static system instructions. Only instructions
+    # whose estimated size reaches the model's minimum for cached content are
+    # cached; smaller ones are sent inline without calling the cache API
+    PROMPT_CACHE_ENABLED: bool = True
+    PROMPT_CACHE_MIN_TOKENS: dict[str, int] = {"gemini-2.5-flash": 1024, "gemini-2.5-pro": 4096}
+    PROMPT_CACHE_DEFAULT_MIN_TOKENS: int = 4096
+    PROMPT_CACHE_TTL_SECONDS: int = 3600
+    # extend a cached prefix this long before it expires
+    PROMPT_CACHE_REFRESH_MARGIN_SECONDS: int = 300
+    # after a failed create (other than a rejection), send it inline this long
+    PROMPT_CACHE_RETRY_SECONDS: int = 600
+
+    # content-addressed cache for deterministic outline/detail generations
+    GENERATION_CACHE_SIZE: int = 1024
+    GENERATION_CACHE_TTL_SECONDS: int = 3600
+    GENERATION_CACHE_PERSIST: bool = True
+    GENERATION_CACHE_PERSISTENT_TTL_SECONDS: int = 7 * 24 * 3600
+    # expired rows are deleted on write, at most once per interval, in batches
+    GENERATION_CACHE_PURGE_INTERVAL_SECONDS: int = 300
+    GENERATION_CACHE_PURGE_BATCH: int = 1000
+
+    # background jobs; set JOB_RUN_IN_API=false when running `python -m app.queues.worker`
+    JOB_RUN_IN_API: bool = True
+    JOB_WORKER_CONCURRENCY: int = 4
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_LEASE_SECONDS: int = 600
+    JOB_MAX_ATTEMPTS: int = 3
+    # transient failures (429/5xx/timeouts) are requeued with exponential backoff
+    JOB_RETRY_BACKOFF_SECONDS: float = 5.0
+    JOB_RETRY_BACKOFF_MAX_SECONDS: float = 300.0
+
+    # Cloudflare image worker and the shared HTTP connection pool
+    IMAGE_STORE_DIR: str = "generated_images"
+    IMAGE_HOT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    IMAGE_HOT_CACHE_MAX_ITEM_BYTES: int = 4 * 1024 * 1024
+    # content hashes confirmed on disk; lets 304s and hot hits skip the stat
+    IMAGE_KNOWN_MAX_ENTRIES: int = 100_000
+    IMAGE_DERIVATIVE_WORKERS: int = 2
+    # "size:format" variants built right after an image is stored, e.g. ["thumb:webp"]
+    IMAGE_DERIVATIVE_PREWARM: list[str] = []
+
+    # deck export (pptx rendering runs in a process pool)
+    EXPORT_DIR: str = "exports"
+    EXPORT_WORKERS: int = 2
+    # cached exports are evicted LRU (by mtime) past either limit
+    EXPORT_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    EXPORT_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    IMAGE_WORKER_URL: str = "https://text-to-image-template.manev7780.workers.dev"
+    # per worker call, and for one slide's image across every upstream retry
+    IMAGE_REQUEST_TIMEOUT_SECONDS: float = 60.0
+    IMAGE_DEADLINE_SECONDS: float = 150.0
+    IMAGE_BATCH_CONCURRENCY: int = 6
+    # upstream resilience (Gemini, image worker): retries with jittered
+    # backoff, hedging past a learned latency percentile, circuit breaking
+    UPSTREAM_MAX_ATTEMPTS: int = 3
+    UPSTREAM_BACKOFF_BASE_SECONDS: float = 0.5
+    UPSTREAM_BACKOFF_MAX_SECONDS: float = 8.0
+    UPSTREAM_HEDGE_PERCENTILE: float = 95.0
+    UPSTREAM_HEDGE_MIN_SAMPLES: int = 20
+    UPSTREAM_HEDGE_MAX_RATIO: float = 0.1
+    CIRCUIT_WINDOW: int = 50
+    CIRCUIT_MIN_CALLS: int = 10
+    CIRCUIT_FAILURE_RATIO: float = 0.5
+    CIRCUIT_OPEN_SECONDS: float = 30.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+
     model_config = SettingsConfigDict(env_file='.env', case_sensitive=False)
 
 settings = Settings()
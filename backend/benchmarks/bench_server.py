@@ -0,0 +1,128 @@
+"""
+Serve the API for load tests: the real app, with the fake Gemini client
+installed and a saturation probe mounted at `GET /__bench/saturation`.
+
+The probe samples event-loop lag and the occupancy of both thread pools the
+app uses (AnyIO's, behind sync routes and `run_in_threadpool`, and the
+loop's default executor, behind `asyncio.to_thread`). `?reset=true` starts
+a new measurement window. The image worker URL and every other setting come
+from the environment as usual; `benchmarks.load_test` starts this for you.
+
+    python -m benchmarks.bench_server --port 8787 --gemini-latency lognormal:0.8,0.4
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict
+
+import anyio.to_thread
+import uvicorn
+
+from benchmarks.fake_genai import FakeGenaiClient, install, latency_distribution
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class SaturationProbe:
+    """Samples loop lag and thread pool usage every `interval` seconds."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.monotonic()
+        self.lag: list[float] = []
+        self.anyio_busy: list[int] = []
+        self.anyio_waiting: list[int] = []
+        self.executor_threads: list[int] = []
+        self.executor_queued: list[int] = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lag.append(time.perf_counter() - start - self.interval)
+            stats = limiter.statistics()
+            self.anyio_busy.append(stats.borrowed_tokens)
+            self.anyio_waiting.append(stats.tasks_waiting)
+            executor = getattr(loop, "_default_executor", None)
+            if executor is not None:
+                self.executor_threads.append(len(executor._threads))
+                self.executor_queued.append(executor._work_queue.qsize())
+
+    def snapshot(self) -> Dict[str, Any]:
+        lag_ms = sorted(value * 1000 for value in self.lag)
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+        samples = max(len(self.anyio_busy), 1)
+        return {
+            "window_seconds": round(time.monotonic() - self.started, 3),
+            "event_loop_lag_ms": {
+                "samples": len(lag_ms),
+                "p50": round(_percentile(lag_ms, 50), 3),
+                "p99": round(_percentile(lag_ms, 99), 3),
+                "max": round(lag_ms[-1], 3) if lag_ms else 0.0,
+            },
+            "anyio_threadpool": {
+                "size": limiter.total_tokens,
+                "busy_mean": round(sum(self.anyio_busy) / samples, 2),
+                "busy_max": max(self.anyio_busy, default=0),
+                "utilisation_max": round(max(self.anyio_busy, default=0) / limiter.total_tokens, 3),
+                "waiting_max": max(self.anyio_waiting, default=0),
+            },
+            "default_executor": {
+                "max_workers": executor._max_workers if executor is not None else None,
+                "threads_max": max(self.executor_threads, default=0),
+                "queued_max": max(self.executor_queued, default=0),
+            },
+        }
+
+
+async def serve(args: argparse.Namespace) -> None:
+    from app.main import app
+
+    install(FakeGenaiClient(
+        latency=latency_distribution(args.gemini_latency),
+        error_rate=args.gemini_error_rate,
+        stream_chunk_chars=args.gemini_chunk_chars,
+        ttft_fraction=args.gemini_ttft_fraction,
+    ))
+
+    probe = SaturationProbe()
+
+    async def saturation(reset: bool = False):
+        snapshot = probe.snapshot()
+        if reset:
+            probe.reset()
+        return snapshot
+
+    app.add_api_route("/__bench/saturation", saturation, methods=["GET"])
+
+    server = uvicorn.Server(uvicorn.Config(app, host=args.host, port=args.port, log_level="warning"))
+    probe_task = asyncio.create_task(probe.run())
+    try:
+        await server.serve()
+    finally:
+        probe_task.cancel()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--gemini-latency", default="lognormal:0.8,0.4")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-chunk-chars", type=int, default=64)
+    parser.add_argument("--gemini-ttft-fraction", type=float, default=0.2)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
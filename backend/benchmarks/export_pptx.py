@@ -0,0 +1,107 @@
+"""
+Benchmark PPTX export: wall time and peak RSS for 10, 50 and 200 slide decks.
+
+Each deck is rendered in a fresh process (the same way the export pool runs
+it) so peak RSS is measured per deck size rather than accumulated.
+
+    python -m benchmarks.export_pptx [--with-images] [--output results.json]
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+
+def _make_deck(num_slides: int, image_url: str) -> dict:
+    return {
+        "title": "Benchmark Presentation",
+        "description": "Synthetic deck used to benchmark the export pipeline.",
+        "slides": [
+            {
+                "id": f"slide_{i + 1}",
+                "title": f"Slide {i + 1}: Measuring Export Throughput",
+                "points": [
+                    "Each bullet point is roughly sixty characters long for realism.",
+                    "Rendering cost grows with slides, shapes and embedded images.",
+                    "Peak memory should stay flat as the deck size keeps growing.",
+                    "Export runs in a worker process so the event loop stays free.",
+                ],
+                "image_required": bool(image_url),
+                "image_gen_prompt": "",
+                "image_url": image_url,
+            }
+            for i in range(num_slides)
+        ],
+    }
+
+
+def _run_one(num_slides: int, image_url: str, queue) -> None:
+    from app.services.export import render_pptx
+
+    deck = _make_deck(num_slides, image_url)
+    with tempfile.TemporaryDirectory() as tmp:
+        dst = os.path.join(tmp, "deck.pptx")
+        start = time.perf_counter()
+        render_pptx(deck, "16:9", dst)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(dst)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    queue.put({
+        "slides": num_slides,
+        "seconds": round(elapsed, 4),
+        "peak_rss_mb": round(peak_mb, 1),
+        "file_mb": round(size / (1024 * 1024), 2),
+    })
+
+
+def _store_sample_image() -> str:
+    import asyncio
+    from PIL import Image
+    from app.services.image_store import image_store
+
+    buf = io.BytesIO()
+    Image.new("RGB", (1024, 1024), (40, 90, 160)).save(buf, "PNG")
+
+    async def chunks():
+        yield buf.getvalue()
+
+    image_name = asyncio.run(image_store.save_stream(chunks(), "image/png"))
+    return f"/generate/get-generated-image?image_name={image_name}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--with-images", action="store_true")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    image_url = _store_sample_image() if args.with_images else ""
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for num_slides in args.sizes:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_one, args=(num_slides, image_url, queue))
+        proc.start()
+        result = queue.get()
+        proc.join()
+        results.append(result)
+        print(
+            f"{result['slides']:>4} slides  {result['seconds']:>8.3f} s  "
+            f"peak RSS {result['peak_rss_mb']:>7.1f} MB  file {result['file_mb']:>6.2f} MB"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "export_pptx", "with_images": args.with_images, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+In-process stand-in for `google.genai.Client`, for running the generation
+paths offline.
+
+It implements the parts of the SDK the app uses (`aio.models.generate_content`,
+`aio.models.generate_content_stream`, `models.generate_content` and
+`aio.caches.create/update/list/delete`) and returns real SDK response types,
+with `usage_metadata` computed from the request at roughly four characters
+per token. Context caches behave like the real ones: they expire after their
+TTL, a call that references a missing one fails with a 404, and instructions
+below `min_cache_tokens` are rejected with a 400.
+
+    fake = FakeGenaiClient(latency=latency_distribution("lognormal:0.8,0.4"))
+    install(fake)
+"""
+import asyncio
+import itertools
+import json
+import math
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+from google.genai import errors as genai_errors
+from google.genai import types
+
+from app.prompts.outline import (
+    SYSTEM_INSTRUCTION,
+    SYSTEM_INSTRUCTION_DESCRIPTION,
+    SYSTEM_INSTRUCTION_DETAIL,
+    SYSTEM_INSTRUCTION_SLIDE,
+)
+
+CHARS_PER_TOKEN = 4
+
+POINT = "Each bullet point is roughly sixty characters long for realism."
+
+
+def latency_distribution(spec: str, rng: Optional[random.Random] = None) -> Callable[[], float]:
+    """
+    Sampler for a latency spec, in seconds: `const:0.5`, `uniform:0.2,0.8`,
+    `normal:0.5,0.1` (clipped at 0) or `lognormal:0.5,0.4` (median, sigma),
+    the last being the closest match to real model latency tails.
+    """
+    rng = rng or random.Random(0)
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "const":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"unknown latency distribution '{spec}'")
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def _prompt_text(contents: Any) -> str:
+    if isinstance(contents, str):
+        return contents
+    return "".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+
+
+def _outline_points(prompt: str) -> list[str]:
+    match = re.search(r"Outline Points: (\[.*\])", prompt, re.DOTALL)
+    return json.loads(match.group(1)) if match else ["Introduction", "Details", "Summary"]
+
+
+def default_responder(model: str, system_instruction: str, prompt: str) -> str:
+    """Plausible, valid JSON for each of the app's prompts."""
+    if system_instruction == SYSTEM_INSTRUCTION_DETAIL:
+        points = _outline_points(prompt)
+        return json.dumps({
+            "title": "Benchmark Presentation",
+            "description": "Synthetic deck produced by the fake Gemini client.",
+            "slides": [
+                {
+                    "id": f"slide_{i + 1}",
+                    "title": point[:60],
+                    "points": [POINT] * 4,
+                    "image_required": i % 3 == 0,
+                    "image_gen_prompt": f"Illustration for {point}" if i % 3 == 0 else "",
+                }
+                for i, point in enumerate(points)
+            ],
+        })
+    if system_instruction == SYSTEM_INSTRUCTION_SLIDE:
+        match = re.search(r"slide_\d+", prompt)
+        return json.dumps({
+            "id": match.group(0) if match else "slide_1",
+            "title": "Generated Slide",
+            "points": [POINT] * 4,
+            "image_required": False,
+            "image_gen_prompt": "",
+        })
+    if system_instruction == SYSTEM_INSTRUCTION_DESCRIPTION:
+        return json.dumps({"description": "Synthetic deck produced by the fake Gemini client."})
+    if system_instruction == SYSTEM_INSTRUCTION:
+        return json.dumps({
+            "title": "Benchmark Presentation",
+            "outlines": [f"Outline point {i + 1}" for i in range(8)],
+        })
+    return json.dumps({"text": "ok"})
+
+
+def _api_error(code: int, status: str, message: str) -> genai_errors.APIError:
+    payload = {"error": {"code": code, "status": status, "message": message}}
+    if code >= 500:
+        return genai_errors.ServerError(code, payload)
+    return genai_errors.ClientError(code, payload)
+
+
+class _FakeCaches:
+    def __init__(self, owner: "FakeGenaiClient"):
+        self._owner = owner
+        self._ids = itertools.count(1)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.calls = {"create": 0, "update": 0, "list": 0, "delete": 0}
+
+    def _live(self, name: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(name)
+        if entry is not None and entry["expire_time"] <= datetime.now(timezone.utc):
+            del self.entries[name]
+            return None
+        return entry
+
+    @staticmethod
+    def _ttl(config: Dict[str, Any]) -> timedelta:
+        return timedelta(seconds=float(str(config.get("ttl", "3600s")).rstrip("s")))
+
+    def _as_cached_content(self, name: str, entry: Dict[str, Any]) -> types.CachedContent:
+        return types.CachedContent(
+            name=name,
+            display_name=entry["display_name"],
+            model=f"models/{entry['model']}",
+            expire_time=entry["expire_time"],
+        )
+
+    async def create(self, *, model: str, config: Dict[str, Any]) -> types.CachedContent:
+        self.calls["create"] += 1
+        instruction = config.get("system_instruction") or ""
+        if count_tokens(instruction) < self._owner.min_cache_tokens:
+            raise _api_error(400, "INVALID_ARGUMENT", "Cached content is too small")
+        name = f"cachedContents/fake-{next(self._ids)}"
+        self.entries[name] = {
+            "model": model,
+            "display_name": config.get("display_name"),
+            "system_instruction": instruction,
+            "expire_time": datetime.now(timezone.utc) + self._ttl(config),
+        }
+        return self._as_cached_content(name, self.entries[name])
+
+    async def update(self, *, name: str, config: Dict[str, Any]) -> types.CachedContent:
+        self.calls["update"] += 1
+        entry = self._live(name)
+        if entry is None:
+            raise _api_error(404, "NOT_FOUND", f"CachedContent {name} not found")
+        entry["expire_time"] = datetime.now(timezone.utc) + self._ttl(config)
+        return self._as_cached_content(name, entry)
+
+    async def list(self, *, config: Any = None):
+        self.calls["list"] += 1
+        live = [(name, self._live(name)) for name in list(self.entries)]
+
+        async def pager():
+            for name, entry in live:
+                if entry is not None:
+                    yield self._as_cached_content(name, entry)
+
+        return pager()
+
+    async def delete(self, *, name: str, config: Any = None) -> None:
+        self.calls["delete"] += 1
+        self.entries.pop(name, None)
+
+    def expire_all(self) -> None:
+        """Simulate the provider evicting every cache."""
+        self.entries.clear()
+
+
+class _FakeModels:
+    def __init__(self, owner: "FakeGenaiClient"):
+        self._owner = owner
+
+    async def generate_content(self, *, model: str, contents: Any, config: Dict[str, Any]):
+        await self._owner.wait()
+        return self._owner.response(*self._owner.respond(model, contents, config))
+
+    async def generate_content_stream(self, *, model: str, contents: Any, config: Dict[str, Any]):
+        latency = await self._owner.wait(self._owner.ttft_fraction)
+        text, usage, finish_reason = self._owner.respond(model, contents, config)
+        chunk_chars = self._owner.stream_chunk_chars
+        chunks = [text[i : i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+        rest = latency * (1 - self._owner.ttft_fraction)
+
+        async def stream():
+            for i, chunk in enumerate(chunks):
+                if i:
+                    await asyncio.sleep(rest / len(chunks))
+                last = i == len(chunks) - 1
+                yield self._owner.response(chunk, usage if last else None, finish_reason if last else None)
+
+        return stream()
+
+
+class _FakeSyncModels:
+    def __init__(self, owner: "FakeGenaiClient"):
+        self._owner = owner
+
+    def generate_content(self, *, model: str, contents: Any, config: Dict[str, Any]):
+        time.sleep(self._owner.latency())
+        return self._owner.response(*self._owner.respond(model, contents, config))
+
+
+class FakeGenaiClient:
+    """
+    `latency()` is sampled per call (seconds); `error_rate` of calls fail with
+    a 503 after that latency. `responder(model, system_instruction, prompt)`
+    produces the response text. Streams deliver `ttft_fraction` of the latency
+    before the first chunk and spread the rest over `stream_chunk_chars`-sized
+    chunks.
+    """
+
+    def __init__(
+        self,
+        responder: Callable[[str, str, str], str] = default_responder,
+        latency: Callable[[], float] = lambda: 0.0,
+        error_rate: float = 0.0,
+        min_cache_tokens: int = 0,
+        stream_chunk_chars: int = 64,
+        ttft_fraction: float = 0.2,
+        rng: Optional[random.Random] = None,
+    ):
+        self.responder = responder
+        self.latency = latency
+        self.error_rate = error_rate
+        self.min_cache_tokens = min_cache_tokens
+        self.stream_chunk_chars = stream_chunk_chars
+        self.ttft_fraction = ttft_fraction
+        self.rng = rng or random.Random(0)
+        self.calls = 0
+        self.errors = 0
+        self.aio = SimpleNamespace(models=_FakeModels(self), caches=_FakeCaches(self))
+        self.models = _FakeSyncModels(self)
+
+    async def wait(self, fraction: float = 1.0) -> float:
+        """Sleep for `fraction` of a sampled call latency; returns the full latency."""
+        latency = self.latency()
+        await asyncio.sleep(latency * fraction)
+        return latency
+
+    def respond(self, model: str, contents: Any, config: Dict[str, Any]):
+        self.calls += 1
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise _api_error(503, "UNAVAILABLE", "The model is overloaded")
+        cached_tokens = 0
+        instruction = config.get("system_instruction") or ""
+        if config.get("cached_content"):
+            entry = self.aio.caches._live(config["cached_content"])
+            if entry is None or entry["model"] != model:
+                raise _api_error(404, "NOT_FOUND", f"CachedContent {config['cached_content']} not found")
+            instruction = entry["system_instruction"]
+            cached_tokens = count_tokens(instruction)
+        prompt = _prompt_text(contents)
+        text = self.responder(model, instruction, prompt)
+        prompt_tokens = count_tokens(prompt) + count_tokens(instruction)
+        output_tokens = count_tokens(text)
+        finish_reason = types.FinishReason.STOP
+        limit = config.get("max_output_tokens")
+        if limit and output_tokens > limit:
+            # truncated at the output budget, like the real API
+            text = text[: limit * CHARS_PER_TOKEN]
+            output_tokens = limit
+            finish_reason = types.FinishReason.MAX_TOKENS
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=cached_tokens or None,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+        return text, usage, finish_reason
+
+    @staticmethod
+    def response(text: str, usage, finish_reason=None) -> types.GenerateContentResponse:
+        content = types.Content(role="model", parts=[types.Part(text=text)])
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=content, finish_reason=finish_reason)],
+            usage_metadata=usage,
+        )
+
+
+def install(fake: FakeGenaiClient) -> None:
+    """Point the app's Gemini client (and its context cache) at `fake`."""
+    from app.services import content_generation
+
+    content_generation.client = fake
+    content_generation.prompt_cache.client = fake
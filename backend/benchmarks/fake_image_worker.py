@@ -0,0 +1,87 @@
+"""
+Local stand-in for the Cloudflare image Worker.
+
+Answers `POST /` with a valid PNG of about `--png-bytes` bytes after a sampled
+latency. Every response is unique, so the content-addressed image store
+really writes each one. `--error-rate` of requests get a 503.
+
+    python -m benchmarks.fake_image_worker --port 8788 --png-bytes 300000 --latency lognormal:1.5,0.3
+"""
+import argparse
+import asyncio
+import functools
+import io
+import itertools
+import random
+import struct
+import zlib
+
+import uvicorn
+from PIL import Image
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.fake_genai import latency_distribution
+
+PNG_END = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+@functools.lru_cache(maxsize=1)
+def _base_png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (40, 90, 160)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_png(size: int, serial: int) -> bytes:
+    """A decodable PNG padded to roughly `size` bytes with an ancillary chunk."""
+    base = _base_png()
+    assert base.endswith(PNG_END)
+    head = base[: -len(PNG_END)]
+    padding = max(0, size - len(base) - 12 - 8)
+    # private ancillary chunk, ignored by decoders; the serial makes it unique
+    filler = struct.pack(">Q", serial) + bytes(padding)
+    return head + _chunk(b"beNc", filler) + PNG_END
+
+
+def build_app(png_bytes: int, latency: str, error_rate: float, seed: int = 0) -> Starlette:
+    sample_latency = latency_distribution(latency, random.Random(seed))
+    errors = random.Random(seed + 1)
+    serials = itertools.count(1)
+    stats = {"requests": 0, "errors": 0}
+
+    async def generate(request: Request) -> Response:
+        stats["requests"] += 1
+        await request.body()
+        await asyncio.sleep(sample_latency())
+        if error_rate and errors.random() < error_rate:
+            stats["errors"] += 1
+            return Response("worker overloaded", status_code=503)
+        return Response(make_png(png_bytes, next(serials)), media_type="image/png")
+
+    async def get_stats(request: Request) -> JSONResponse:
+        return JSONResponse(stats)
+
+    return Starlette(routes=[Route("/", generate, methods=["POST"]), Route("/stats", get_stats)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--png-bytes", type=int, default=300_000)
+    parser.add_argument("--latency", default="lognormal:1.5,0.3", help="see benchmarks.fake_genai.latency_distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    app = build_app(args.png_bytes, args.latency, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Offline load test of the API against local stand-ins for its upstreams.
+
+Starts the fake image worker (`benchmarks.fake_image_worker`) and the API with
+the fake Gemini client (`benchmarks.bench_server`) as subprocesses, then, for
+every scenario and concurrency level, keeps that many requests in flight for
+`--duration` seconds. Reports p50/p95/p99 latency, RPS, error counts and the
+server's event-loop lag and thread pool saturation over the same window.
+
+Results go to a JSON file and a CSV file named after the current commit
+(under benchmarks/results/ by default); `--compare` prints the change against
+an earlier JSON file. Sign-in needs DATABASE_URL to point at a real database;
+the benchmark user is created through /users/sign-up.
+
+Gemini admission limits are raised for the server so the app itself is
+measured rather than the scheduler; pass --keep-limits to test with the
+configured ones.
+
+    python -m benchmarks.load_test --scenarios outlines details image signin \\
+        --concurrency 1 10 50 --duration 10 --gemini-latency lognormal:0.8,0.4 \\
+        --compare benchmarks/results/load_test-abc1234.json
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+EMAIL = "load-test@example.com"
+PASSWORD = "load-test-password"
+
+UNLIMITED_GEMINI = {
+    "GEMINI_USER_RPM": "1000000000",
+    "GEMINI_USER_TPM": "1000000000000",
+    "GEMINI_QUEUE_MAX": "100000",
+    "GEMINI_MODEL_LIMITS": json.dumps({
+        "gemini-2.5-flash": {"concurrency": 100000, "rpm": 1000000000, "tpm": 1000000000000},
+        "gemini-2.5-flash-image": {"concurrency": 100000, "rpm": 1000000000, "tpm": 1000000000000},
+    }),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+# ---- scenarios: each sends one request and returns (ok, status label, time to first byte) ----
+
+async def _check_json(response: httpx.Response) -> tuple[bool, str]:
+    if response.status_code >= 400:
+        return False, str(response.status_code)
+    body = response.json()
+    # several generation routes report failures as 200 {"error": ...}
+    if isinstance(body, dict) and "error" in body:
+        return False, "app_error"
+    return True, str(response.status_code)
+
+
+async def outlines(client: httpx.AsyncClient, n: int, run_id: str):
+    response = await client.post(
+        "/generate/outlines", params={"user_prompt": f"Load test topic {run_id}-{n}", "no_cache": True}
+    )
+    return *(await _check_json(response)), None
+
+
+async def details(client: httpx.AsyncClient, n: int, run_id: str):
+    response = await client.post(
+        "/generate/outlines-with-details",
+        params={"user_prompt": f"Load test deck {run_id}-{n}", "no_cache": True},
+    )
+    return *(await _check_json(response)), None
+
+
+async def details_parallel(client: httpx.AsyncClient, n: int, run_id: str):
+    response = await client.post(
+        "/generate/outlines-with-details",
+        params={"user_prompt": f"Load test deck {run_id}-{n}", "no_cache": True, "parallel": True},
+    )
+    return *(await _check_json(response)), None
+
+
+async def details_stream(client: httpx.AsyncClient, n: int, run_id: str):
+    start = time.perf_counter()
+    first_slide = None
+    ok, label = True, "200"
+    async with client.stream(
+        "POST", "/generate/outlines-with-details/stream", params={"user_prompt": f"Load test deck {run_id}-{n}"}
+    ) as response:
+        if response.status_code >= 400:
+            await response.aread()
+            return False, str(response.status_code), None
+        async for line in response.aiter_lines():
+            if line == "event: slide" and first_slide is None:
+                first_slide = time.perf_counter() - start
+            elif line == "event: error":
+                ok, label = False, "stream_error"
+    return ok, label, first_slide
+
+
+async def image(client: httpx.AsyncClient, n: int, run_id: str):
+    response = await client.post("/generate/image", params={"user_prompt": f"Load test image {run_id}-{n}"})
+    return *(await _check_json(response)), None
+
+
+async def signin(client: httpx.AsyncClient, n: int, run_id: str):
+    response = await client.post("/users/sign-in", json={"email": EMAIL, "password": PASSWORD})
+    return *(await _check_json(response)), None
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "outlines": outlines,
+    "details": details,
+    "details-parallel": details_parallel,
+    "details-stream": details_stream,
+    "image": image,
+    "signin": signin,
+}
+
+
+async def run_level(
+    client: httpx.AsyncClient, scenario: str, concurrency: int, duration: float, warmup: float
+) -> Dict[str, Any]:
+    send = SCENARIOS[scenario]
+    run_id = uuid.uuid4().hex[:8]
+    counter = iter(range(10**12))
+    latencies: list[float] = []
+    ttfb: list[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+
+    async def worker(deadline: float, record: bool):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok, label, first = await send(client, next(counter), run_id)
+            except httpx.HTTPError as e:
+                ok, label, first = False, type(e).__name__, None
+            if not record:
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[label] = statuses.get(label, 0) + 1
+            if not ok:
+                errors += 1
+            if first is not None:
+                ttfb.append(first)
+
+    if warmup > 0:
+        await asyncio.gather(*(worker(time.perf_counter() + warmup, False) for _ in range(concurrency)))
+    await client.get("/__bench/saturation", params={"reset": True})
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(start + duration, True) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    saturation = (await client.get("/__bench/saturation", params={"reset": True})).json()
+
+    latencies.sort()
+    ttfb.sort()
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "saturation": saturation,
+    }
+    if ttfb:
+        result["ttfb_p50_ms"] = round(_percentile(ttfb, 50) * 1000, 2)
+        result["ttfb_p95_ms"] = round(_percentile(ttfb, 95) * 1000, 2)
+    return result
+
+
+def _start(module: str, args: list[str], env: Dict[str, str], log) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", module, *args], cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode}; see the server log")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+async def _seed_signin_user(client: httpx.AsyncClient) -> None:
+    response = await client.post(
+        "/users/sign-up", json={"email": EMAIL, "password": PASSWORD, "full_name": "Load Test"}
+    )
+    if response.status_code not in (200, 201, 400):
+        raise RuntimeError(f"could not create the sign-in user: {response.status_code} {response.text}")
+
+
+def _row(result: Dict[str, Any]) -> Dict[str, Any]:
+    saturation = result["saturation"]
+    return {
+        "scenario": result["scenario"],
+        "concurrency": result["concurrency"],
+        "requests": result["requests"],
+        "errors": result["errors"],
+        "rps": result["rps"],
+        "p50_ms": result["p50_ms"],
+        "p95_ms": result["p95_ms"],
+        "p99_ms": result["p99_ms"],
+        "max_ms": result["max_ms"],
+        "ttfb_p50_ms": result.get("ttfb_p50_ms", ""),
+        "loop_lag_p99_ms": saturation["event_loop_lag_ms"]["p99"],
+        "loop_lag_max_ms": saturation["event_loop_lag_ms"]["max"],
+        "anyio_threads_busy_max": saturation["anyio_threadpool"]["busy_max"],
+        "anyio_threads_waiting_max": saturation["anyio_threadpool"]["waiting_max"],
+        "executor_queued_max": saturation["default_executor"]["queued_max"],
+    }
+
+
+def _print_row(row: Dict[str, Any]) -> None:
+    print(
+        f"{row['scenario']:>16}  c={row['concurrency']:<4} {row['rps']:>8} req/s  "
+        f"p50 {row['p50_ms']:>9} ms  p95 {row['p95_ms']:>9} ms  p99 {row['p99_ms']:>9} ms  "
+        f"errors {row['errors']:<5} loop lag p99 {row['loop_lag_p99_ms']:>7} ms  "
+        f"threads busy {row['anyio_threads_busy_max']}/{row['anyio_threads_waiting_max']} waiting"
+    )
+
+
+def compare(base_path: str, results: list[Dict[str, Any]]) -> None:
+    with open(base_path) as f:
+        base = json.load(f)
+    previous = {(r["scenario"], r["concurrency"]): r for r in base["results"]}
+    print(f"\nchange vs {base.get('git_commit', '?')} ({base_path}):")
+    for result in results:
+        old: Optional[Dict[str, Any]] = previous.get((result["scenario"], result["concurrency"]))
+        if old is None:
+            continue
+        deltas = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            if old[key]:
+                deltas.append(f"{key} {(result[key] - old[key]) / old[key] * 100:+.1f}%")
+        print(f"{result['scenario']:>16}  c={result['concurrency']:<4} " + "  ".join(deltas))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=["outlines", "details", "image", "signin"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds before each level")
+    parser.add_argument("--gemini-latency", default="lognormal:0.8,0.4")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-chunk-chars", type=int, default=64)
+    parser.add_argument("--image-latency", default="lognormal:1.5,0.3")
+    parser.add_argument("--image-bytes", type=int, default=300_000)
+    parser.add_argument("--image-error-rate", type=float, default=0.0)
+    parser.add_argument("--keep-limits", action="store_true", help="keep the configured Gemini admission limits")
+    parser.add_argument("--output", help="JSON results file (a CSV is written next to it)")
+    parser.add_argument("--compare", help="earlier JSON results file to compare against")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"load_test-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    log_path = os.path.splitext(output)[0] + ".server.log"
+
+    api_port, worker_port = _free_port(), _free_port()
+    image_dir = tempfile.mkdtemp(prefix="load-test-images-")
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "IMAGE_WORKER_URL": f"http://127.0.0.1:{worker_port}/",
+        "IMAGE_STORE_DIR": image_dir,
+        "JOB_RUN_IN_API": "false",
+    }
+    if not args.keep_limits:
+        env.update({k: v for k, v in UNLIMITED_GEMINI.items() if k not in os.environ})
+
+    with open(log_path, "w") as log:
+        worker = _start(
+            "benchmarks.fake_image_worker",
+            ["--port", str(worker_port), "--png-bytes", str(args.image_bytes),
+             "--latency", args.image_latency, "--error-rate", str(args.image_error_rate)],
+            env, log,
+        )
+        server = _start(
+            "benchmarks.bench_server",
+            ["--port", str(api_port), "--gemini-latency", args.gemini_latency,
+             "--gemini-error-rate", str(args.gemini_error_rate),
+             "--gemini-chunk-chars", str(args.gemini_chunk_chars)],
+            env, log,
+        )
+        try:
+            await _wait_ready(f"http://127.0.0.1:{worker_port}/stats", worker)
+            await _wait_ready(f"http://127.0.0.1:{api_port}/", server)
+            limits = httpx.Limits(max_connections=max(args.concurrency) * 2, max_keepalive_connections=max(args.concurrency))
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{api_port}", timeout=300.0, limits=limits
+            ) as client:
+                if "signin" in args.scenarios:
+                    await _seed_signin_user(client)
+                results = []
+                for scenario in args.scenarios:
+                    for concurrency in args.concurrency:
+                        result = await run_level(client, scenario, concurrency, args.duration, args.warmup)
+                        results.append(result)
+                        _print_row(_row(result))
+                server_stats = {
+                    "model_usage": (await client.get("/generate/usage-stats")).json(),
+                    "generation": (await client.get("/generate/cache-stats")).json(),
+                    "db": (await client.get("/db-stats")).json(),
+                }
+        finally:
+            for process in (server, worker):
+                process.terminate()
+            for process in (server, worker):
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    report = {
+        "benchmark": "load_test",
+        "git_commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "results": results,
+        "server_stats": server_stats,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    csv_path = os.path.splitext(output)[0] + ".csv"
+    with open(csv_path, "w", newline="") as f:
+        rows = [_row(result) for result in results]
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nwrote {output} and {csv_path}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Calibrate argon2 cost parameters on this host.
+
+For every combination of time_cost / memory_cost / parallelism it measures the
+single-hash latency and the aggregate throughput with one hashing thread per
+core, then reports hashes/sec per core. Use it to pick the
+PASSWORD_ARGON2_* settings and to size PASSWORD_HASH_WORKERS.
+
+    python -m benchmarks.password_hashing [--target-ms 250] [--output results.json]
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+PASSWORD = b"calibration-password-0123456789"
+
+
+def _context(time_cost: int, memory_cost: int, parallelism: int) -> CryptContext:
+    # same shape as app.lib.password.build_context, without importing app settings
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+def measure(time_cost: int, memory_cost: int, parallelism: int, cores: int, hashes: int) -> dict:
+    ctx = _context(time_cost, memory_cost, parallelism)
+    ctx.hash(PASSWORD)  # warm up allocator
+
+    start = time.perf_counter()
+    for _ in range(hashes):
+        ctx.hash(PASSWORD)
+    latency = (time.perf_counter() - start) / hashes
+
+    total = hashes * cores
+    with ThreadPoolExecutor(max_workers=cores) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda _: ctx.hash(PASSWORD), range(total)))
+        elapsed = time.perf_counter() - start
+    throughput = total / elapsed
+
+    return {
+        "time_cost": time_cost,
+        "memory_cost": memory_cost,
+        "parallelism": parallelism,
+        "latency_ms": round(latency * 1000, 1),
+        "hashes_per_sec": round(throughput, 2),
+        "hashes_per_sec_per_core": round(throughput / cores, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--time-cost", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--memory-cost", type=int, nargs="+", default=[19456, 65536, 102400])
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--hashes", type=int, default=5, help="hashes per measurement and core")
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--target-ms", type=float, default=250.0,
+                        help="recommend the strongest setting under this single-hash latency")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    print(f"cores={args.cores}")
+    print(f"{'t':>3} {'m (KiB)':>9} {'p':>3} {'latency ms':>11} {'hash/s':>8} {'hash/s/core':>12}")
+    results = []
+    for t, m, p in itertools.product(args.time_cost, args.memory_cost, args.parallelism):
+        r = measure(t, m, p, args.cores, args.hashes)
+        results.append(r)
+        print(f"{t:>3} {m:>9} {p:>3} {r['latency_ms']:>11} {r['hashes_per_sec']:>8} {r['hashes_per_sec_per_core']:>12}")
+
+    eligible = [r for r in results if r["latency_ms"] <= args.target_ms]
+    recommended = max(
+        eligible,
+        key=lambda r: (r["memory_cost"] * r["time_cost"], -r["latency_ms"]),
+        default=None,
+    )
+    if recommended:
+        print(
+            f"\nRecommended under {args.target_ms:.0f} ms: "
+            f"PASSWORD_ARGON2_TIME_COST={recommended['time_cost']} "
+            f"PASSWORD_ARGON2_MEMORY_COST={recommended['memory_cost']} "
+            f"PASSWORD_ARGON2_PARALLELISM={recommended['parallelism']} "
+            f"(~{recommended['hashes_per_sec']} sign-ins/sec with PASSWORD_HASH_WORKERS={args.cores})"
+        )
+    else:
+        print(f"\nNo setting met the {args.target_ms:.0f} ms target")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"benchmark": "password_hashing", "cores": args.cores,
+                 "recommended": recommended, "results": results},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
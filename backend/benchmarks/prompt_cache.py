@@ -0,0 +1,97 @@
+"""
+Input tokens per Gemini call with and without context caching of the static
+system instructions, measured offline against the fake Gemini client.
+
+Runs the same detail and slide calls three ways: with the instruction sent
+inline, through the context cache, and through the context cache while the
+provider evicts every cache partway through (exercising the inline fallback
+and re-registration).
+
+The app's instructions are below gemini-2.5-flash's real 1,024-token minimum
+for cached content, so by default nothing is cached in production; the fake
+accepts prefixes from 256 tokens and `--min-tokens` lowers the app's
+threshold to match, to measure what caching would save.
+
+    python -m benchmarks.prompt_cache [--calls 50] [--min-tokens 256] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+
+from benchmarks.fake_genai import FakeGenaiClient, install
+from app.services import content_generation as cg
+
+OUTLINE = {"title": "Benchmark Presentation", "outlines": [f"Outline point {i + 1}" for i in range(10)]}
+
+
+async def run_mode(mode: str, calls: int, min_tokens: int) -> dict:
+    fake = FakeGenaiClient(min_cache_tokens=256)
+    install(fake)
+    cache = cg.prompt_cache
+    cache.enabled = mode != "inline"
+    cache.min_tokens = {cg.OUTLINE_MODEL: min_tokens}
+    cache._entries.clear()
+    cache._disabled_until.clear()
+    cache._rejected.clear()
+    for key in cache.stats:
+        cache.stats[key] = 0
+
+    requests = [
+        (cg.DETAIL_CONFIG, cg.build_detail_prompt(OUTLINE)),
+        (cg.SLIDE_CONFIG, cg.build_slide_prompt(OUTLINE, 0)),
+    ]
+    per_call = []
+    for i in range(calls):
+        if mode == "evicted" and i == calls // 2:
+            fake.aio.caches.expire_all()
+        config, prompt = requests[i % len(requests)]
+        response = await cg.agenerate_content(cg.OUTLINE_MODEL, config, prompt)
+        usage = response.usage_metadata
+        cached = usage.cached_content_token_count or 0
+        per_call.append({
+            "op": "detail" if config is cg.DETAIL_CONFIG else "slide",
+            "prompt_tokens": usage.prompt_token_count,
+            "cached_tokens": cached,
+            "uncached_input_tokens": usage.prompt_token_count - cached,
+        })
+
+    uncached = [c["uncached_input_tokens"] for c in per_call]
+    return {
+        "mode": mode,
+        "calls": calls,
+        "provider_calls": fake.calls,
+        "cache_api_calls": fake.aio.caches.calls,
+        "mean_uncached_input_tokens": round(statistics.mean(uncached), 1),
+        "total_uncached_input_tokens": sum(uncached),
+        "total_cached_tokens": sum(c["cached_tokens"] for c in per_call),
+        "prompt_cache": {k: v for k, v in cache.get_stats().items() if k != "entries"},
+        "per_call": per_call,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--min-tokens", type=int, default=256, help="minimum cached prefix, in tokens")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for mode in ("inline", "cached", "evicted"):
+        r = await run_mode(mode, args.calls, args.min_tokens)
+        results.append(r)
+        print(
+            f"{mode:>8}  provider calls {r['provider_calls']:>4}  "
+            f"uncached input/call {r['mean_uncached_input_tokens']:>8}  "
+            f"cached tokens {r['total_cached_tokens']:>7}  "
+            f"cache misses {r['prompt_cache']['misses']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "prompt_cache", "min_tokens": args.min_tokens, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""
+Compare sign-in throughput between the sync and async database paths.
+
+sync  : SessionLocal + UserRepo.get_credentials_by_email, run on the AnyIO threadpool the
+        way a plain `def` route would be.
+async : AsyncSessionLocal + UserRepo.aget_credentials_by_email on the event loop.
+
+By default only the database lookup is measured so the argon2 cost does not
+mask the difference; pass --with-verify to include password verification
+through the hashing executor. Needs DATABASE_URL to point at a real database.
+The credential cache is off unless USER_CREDENTIAL_CACHE_TTL_SECONDS is set,
+so every lookup reaches the database.
+
+    python -m benchmarks.signin_db_modes --seed --concurrency 10 50 200 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import anyio.to_thread
+
+# settings are read at import time
+os.environ.setdefault("USER_CREDENTIAL_CACHE_TTL_SECONDS", "0")
+
+from app.db import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.lib.password import averify_password, hash_password
+from app.repositories.user import UserRepo
+
+EMAIL = "signin-benchmark@example.com"
+PASSWORD = "benchmark-password"
+
+
+def _seed() -> None:
+    with SessionLocal() as db:
+        if UserRepo.get_by_email(db, EMAIL) is None:
+            UserRepo.create(db, email=EMAIL, full_name="Benchmark", hashed_password=hash_password(PASSWORD))
+
+
+def _sync_lookup() -> str:
+    with SessionLocal() as db:
+        return UserRepo.get_credentials_by_email(db, EMAIL).password
+
+
+async def sync_signin(with_verify: bool) -> None:
+    stored = await anyio.to_thread.run_sync(_sync_lookup)
+    if with_verify:
+        await averify_password(PASSWORD, stored)
+
+
+async def async_signin(with_verify: bool) -> None:
+    async with AsyncSessionLocal() as db:
+        user = await UserRepo.aget_credentials_by_email(db, EMAIL)
+    if with_verify:
+        await averify_password(PASSWORD, user.password)
+
+
+async def run_mode(signin, concurrency: int, total: int, with_verify: bool) -> dict:
+    latencies: list[float] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            await signin(with_verify)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--with-verify", action="store_true")
+    parser.add_argument("--seed", action="store_true", help="create the benchmark user if missing")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.seed:
+        _seed()
+
+    results = []
+    for concurrency in args.concurrency:
+        for mode, signin in (("sync", sync_signin), ("async", async_signin)):
+            await signin(args.with_verify)  # warm the pool
+            r = await run_mode(signin, concurrency, args.requests, args.with_verify)
+            r["mode"] = mode
+            results.append(r)
+            print(
+                f"{mode:>5}  c={concurrency:<4} {r['rps']:>8} req/s  "
+                f"p50 {r['p50_ms']:>7} ms  p95 {r['p95_ms']:>7} ms  p99 {r['p99_ms']:>7} ms"
+            )
+
+    await async_engine.dispose()
+    engine.dispose()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"benchmark": "signin_db_modes", "with_verify": args.with_verify, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+import os
+
+# settings are read from the environment at import time; give the required
+# ones harmless defaults so the app can be imported without a .env file
+for name, value in {
+    "APP_ENV": "test",
+    "APP_NAME": "presently",
+    "APP_VERSION": "test",
+    "DATABASE_URL": "postgresql+psycopg://postgres@localhost/postgres",
+    "PASSWORD_HASH_SECRET_KEY": "test-secret",
+    "GEMINI_API_KEY": "test-key",
+    "CLOUDFLARE_API_TOKEN": "test-token",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.db import SessionLocal
+
+
+@pytest.fixture
+def db():
+    """A session on DATABASE_URL; tests using it are skipped when it is unreachable."""
+    session = SessionLocal()
+    try:
+        session.execute(text("SELECT 1"))
+    except OperationalError:
+        session.close()
+        pytest.skip("database not reachable")
+    yield session
+    session.close()
@@ -0,0 +1,59 @@
+import pytest
+
+from app.lib.json_repair import loads_lenient, repair_json
+
+
+def test_valid_json_needs_no_repair():
+    result = loads_lenient('{"a": [1, 2]}')
+
+    assert result.value == {"a": [1, 2]}
+    assert result.repairs == []
+    assert not result.truncated
+
+
+def test_code_fence_is_stripped():
+    result = repair_json('```json\n{"title": "Deck"}\n```')
+
+    assert result.value == {"title": "Deck"}
+    assert "code_fence" in result.repairs
+
+
+def test_trailing_commas_are_dropped():
+    result = repair_json('{"slides": [{"t": "a"}, {"t": "b"},],}')
+
+    assert result.value == {"slides": [{"t": "a"}, {"t": "b"}]}
+    assert "trailing_comma" in result.repairs
+
+
+def test_fenced_document_with_trailing_comma():
+    result = loads_lenient('```json\n{"a": [1, 2,],}\n```')
+
+    assert result.value == {"a": [1, 2]}
+    assert result.repairs == ["code_fence", "trailing_comma"]
+
+
+def test_truncated_document_is_closed_and_flagged():
+    result = repair_json('{"slides": [{"t": "a"}, {"t": "b')
+
+    assert result.value == {"slides": [{"t": "a"}, {"t": "b"}]}
+    assert result.truncated
+    assert result.partial_tail
+
+
+def test_truncated_after_a_complete_element():
+    result = repair_json('{"slides": [{"t": "a"},')
+
+    assert result.value == {"slides": [{"t": "a"}]}
+    assert result.truncated
+
+
+def test_prose_and_comments_around_the_value():
+    result = repair_json('Here it is: {"a": 1, // note\n "b": 2} hope it helps')
+
+    assert result.value == {"a": 1, "b": 2}
+    assert {"leading_text", "comment", "trailing_text"} <= set(result.repairs)
+
+
+def test_unrepairable_text_raises_value_error():
+    with pytest.raises(ValueError):
+        repair_json("no json here")
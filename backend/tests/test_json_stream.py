@@ -0,0 +1,40 @@
+from app.lib.json_stream import SlideStreamParser
+
+DOCUMENT = '{"title": "Deck", "slides": [{"t": "a", "body": "x}"}, {"t": "b"}], "notes": [{"n": 1}]}'
+
+
+def _feed_in_chunks(text: str, size: int) -> list:
+    parser = SlideStreamParser()
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start : start + size]))
+    return items
+
+
+def test_slides_are_emitted_regardless_of_chunking():
+    for size in (1, 3, 7, len(DOCUMENT)):
+        assert _feed_in_chunks(DOCUMENT, size) == [{"t": "a", "body": "x}"}, {"t": "b"}]
+
+
+def test_slide_is_emitted_as_soon_as_it_closes():
+    parser = SlideStreamParser()
+
+    assert parser.feed('{"slides": [{"t": "a"}') == [{"t": "a"}]
+    assert parser.feed(', {"t": "b') == []
+    assert parser.feed('"}]}') == [{"t": "b"}]
+
+
+def test_fenced_stream_with_trailing_commas_is_repaired():
+    text = '```json\n{"slides": [{"t": "a", "points": [1, 2,],}, {"t": "b",}]}\n```'
+
+    assert _feed_in_chunks(text, 5) == [{"t": "a", "points": [1, 2]}, {"t": "b"}]
+
+
+def test_truncated_stream_emits_only_closed_slides():
+    assert _feed_in_chunks('{"slides": [{"t": "a"}, {"t": "b", "body": "cut', 4) == [{"t": "a"}]
+
+
+def test_unparsable_slide_keeps_its_position():
+    items = _feed_in_chunks('{"slides": [{"t": "a"}, {"t": }, {"t": "c"}]}', 6)
+
+    assert items == [{"t": "a"}, None, {"t": "c"}]
@@ -0,0 +1,49 @@
+import uuid
+
+import pytest
+
+from app.errors import RateLimitedError
+from app.lib.tokens import TokenUser, current_client, current_user
+from app.services.model_scheduler import ModelLimits, _ModelLane, caller_key
+from app.settings import settings
+
+
+@pytest.fixture
+def as_caller():
+    tokens = []
+
+    def set_caller(user=None, client=None):
+        tokens.append((current_user.set(user), current_client.set(client)))
+
+    yield set_caller
+    for user_token, client_token in reversed(tokens):
+        current_client.reset(client_token)
+        current_user.reset(user_token)
+
+
+def test_anonymous_callers_are_keyed_by_client_address(as_caller):
+    as_caller(client="10.0.0.1")
+    first = caller_key()
+    as_caller(client="10.0.0.2")
+
+    assert first != caller_key()
+
+
+def test_user_key_ignores_client_address(as_caller):
+    user = TokenUser(id=uuid.uuid4())
+    as_caller(user=user, client="10.0.0.1")
+
+    assert caller_key() == str(user.id)
+
+
+def test_one_anonymous_client_cannot_exhaust_another_clients_budget(as_caller, monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_USER_RPM", 1)
+    lane = _ModelLane("test-model", ModelLimits(concurrency=10, rpm=100, tpm=1_000_000))
+
+    as_caller(client="10.0.0.1")
+    lane.charge_user(caller_key(), 10)
+    with pytest.raises(RateLimitedError):
+        lane.charge_user(caller_key(), 10)
+
+    as_caller(client="10.0.0.2")
+    lane.charge_user(caller_key(), 10)
@@ -0,0 +1,39 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.lib.tokens import issue_token_pair
+from app.main import app
+from app.settings import settings
+
+client = TestClient(app)
+
+STATS_PATHS = ["/generate/cache-stats", "/generate/usage-stats", "/db-stats"]
+
+
+@pytest.mark.parametrize("path", STATS_PATHS)
+def test_stats_routes_require_a_token(path):
+    response = client.get(path)
+
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("path", STATS_PATHS)
+def test_stats_routes_are_admin_only(path):
+    token = issue_token_pair(uuid.uuid4(), "someone@example.com")["access_token"]
+
+    response = client.get(path, headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("path", STATS_PATHS)
+def test_stats_routes_serve_admins(path, monkeypatch):
+    admin_id = uuid.uuid4()
+    monkeypatch.setattr(settings, "ADMIN_USER_IDS", [admin_id])
+    token = issue_token_pair(admin_id, "admin@example.com")["access_token"]
+
+    response = client.get(path, headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
@@ -0,0 +1,69 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.lib.tokens import ACCESS, InvalidTokenError, token_signer
+from app.main import app
+
+
+def _b64(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def _signed(header, payload) -> str:
+    signing_input = f"{_b64(header)}.{_b64(payload)}"
+    kid = token_signer.active_kid
+    signature = hmac.new(token_signer.keys[kid], signing_input.encode(), hashlib.sha256).digest()
+    return signing_input + "." + base64.urlsafe_b64encode(signature).decode().rstrip("=")
+
+
+def _payload(**overrides):
+    payload = {
+        "iss": token_signer.issuer,
+        "sub": str(uuid.uuid4()),
+        "email": "a@example.com",
+        "typ": ACCESS,
+        "exp": int(time.time()) + 60,
+    }
+    payload.update(overrides)
+    return payload
+
+
+HEADER = {"alg": "HS256", "typ": "JWT", "kid": token_signer.active_kid}
+
+MALFORMED = [
+    "not-a-token",
+    f"{_b64([1])}.{_b64({})}.sig",
+    f"{_b64({'alg': 'HS256', 'kid': ['default']})}.{_b64({})}.sig",
+    f"{_b64(HEADER)}.{_b64({})}.sïg",
+    _signed(HEADER, [1]),
+    _signed(HEADER, _payload(exp="tomorrow")),
+    _signed(HEADER, _payload(exp=None)),
+    _signed(HEADER, _payload(sub=123)),
+]
+
+
+@pytest.mark.parametrize("token", MALFORMED)
+def test_malformed_tokens_raise_invalid_token_error(token):
+    with pytest.raises(InvalidTokenError):
+        token_signer.verify(token, ACCESS)
+
+
+# HTTP headers are latin-1 on the wire; the non-ASCII case is covered above
+@pytest.mark.parametrize("token", [token for token in MALFORMED if token.isascii()])
+def test_malformed_bearer_tokens_get_401(token):
+    response = TestClient(app).get("/users/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 401
+
+
+def test_well_formed_token_verifies():
+    payload = _payload()
+
+    assert token_signer.verify(_signed(HEADER, payload), ACCESS)["sub"] == payload["sub"]
@@ -0,0 +1,63 @@
+import uuid
+
+from sqlalchemy import inspect
+
+from app.db import SessionLocal
+from app.lib.user_cache import UserCache, user_cache
+from app.models.user import User
+from app.repositories.user import UserRepo
+from app.schemas.user import UserUpdate
+from app.services.user import UserService
+
+
+def test_cached_snapshot_leaves_out_the_password_hash():
+    cache = UserCache(maxsize=10, ttl=60, credentials_ttl=5)
+    user = User(id=uuid.uuid4(), email="a@example.com", full_name="A", password="argon2-hash")
+
+    cache.put(user, cache.generation())
+    cached = cache.get(user.id)
+
+    assert cached.full_name == "A"
+    assert "password" in inspect(cached).unloaded
+
+
+def test_credential_entries_carry_the_hash_until_invalidated():
+    cache = UserCache(maxsize=10, ttl=60, credentials_ttl=5)
+    user = User(id=uuid.uuid4(), email="a@example.com", full_name="A", password="argon2-hash")
+
+    cache.put_credentials(user, cache.generation())
+    assert cache.get_credentials("a@example.com").password == "argon2-hash"
+
+    cache.invalidate(user.id, user.email)
+    assert cache.get_credentials("a@example.com") is None
+
+
+def test_credential_entries_are_off_with_zero_ttl():
+    cache = UserCache(maxsize=10, ttl=60, credentials_ttl=0)
+    user = User(id=uuid.uuid4(), email="a@example.com", full_name="A", password="argon2-hash")
+
+    cache.put_credentials(user, cache.generation())
+
+    assert cache.get_credentials("a@example.com") is None
+
+
+def test_profile_update_is_visible_on_next_read(db):
+    user = UserRepo.create(
+        db,
+        email=f"cache-{uuid.uuid4().hex}@example.com",
+        full_name="Before",
+        hashed_password="hash",
+    )
+    try:
+        # one session per step, like separate requests
+        with SessionLocal() as session:
+            assert UserRepo.get(session, user.id).full_name == "Before"
+        with SessionLocal() as session:
+            UserService.update_user(session, user.id, UserUpdate(full_name="After"))
+        with SessionLocal() as session:
+            assert UserRepo.get(session, user.id).full_name == "After"
+            assert UserRepo.get_by_email(session, user.email).full_name == "After"
+    finally:
+        db.delete(db.get(User, user.id))
+        db.commit()
+        user_cache.invalidate(user.id, user.email)
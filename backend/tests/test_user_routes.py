@@ -0,0 +1,25 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.lib.tokens import issue_token_pair
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["/users", "/users/export", "/users/cache-stats"])
+def test_user_listing_routes_require_a_token(path):
+    response = client.get(path)
+
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_cache_stats_is_admin_only():
+    token = issue_token_pair(uuid.uuid4(), "someone@example.com")["access_token"]
+
+    response = client.get("/users/cache-stats", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 403